@@ -0,0 +1,250 @@
+import math
+import numpy as np
+
+
+def wilson_interval(successes, n, z=1.96):
+    """
+    :return: (low, high) Wilson score interval of a binomial proportion
+    """
+    if n == 0:
+        return 0.0, 1.0
+    p = successes / n
+    denom = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denom
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denom
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+
+class Histogram:
+    """
+    Counts of integer values 0..size-1, larger values land in the last bin.
+    """
+
+    def __init__(self, size):
+        self.counts = np.zeros(size, dtype=np.int64)
+
+    def add(self, values):
+        values = np.clip(np.asarray(values, dtype=np.int64).ravel(), 0, len(self.counts) - 1)
+        self.counts += np.bincount(values, minlength=len(self.counts))
+
+    def add_one(self, value):
+        self.counts[min(max(int(value), 0), len(self.counts) - 1)] += 1
+
+    def merge(self, other):
+        self.counts += other.counts
+        return self
+
+    @property
+    def n(self):
+        return int(self.counts.sum())
+
+    def mean(self):
+        n = self.n
+        return float(np.dot(np.arange(len(self.counts)), self.counts) / n) if n else float("nan")
+
+    def quantile(self, q):
+        """
+        :return: smallest value with at least a q fraction of the counts at or below it
+        """
+        n = self.n
+        if n == 0:
+            return float("nan")
+        return int(np.searchsorted(np.cumsum(self.counts), q * n, side="left"))
+
+    def quantiles(self, qs=(0.05, 0.25, 0.5, 0.75, 0.95)):
+        return {q: self.quantile(q) for q in qs}
+
+
+class OutcomeAggregator:
+    """
+    Online summary of simulated matches between two teams in constant memory.
+    Aggregators of parallel shards of the same fixture can be merged.
+    """
+
+    def __init__(self, team_1, team_2, max_score=400, max_player_runs=200):
+        """
+        :param team_1: name of the first team
+        :param team_2: name of the second team
+        :param max_score: innings totals above this share the last histogram bin
+        :param max_player_runs: same, for individual batsmen
+        """
+        self.teams = (team_1, team_2)
+        self.max_score = max_score
+        self.max_player_runs = max_player_runs
+
+        self.n = 0
+        self.wins = {team_1: 0, team_2: 0}
+        self.ties = 0
+        self.bat_first_wins = 0
+
+        self.first_innings = Histogram(max_score + 1)
+        self.second_innings = Histogram(max_score + 1)
+        self.scores = {team_1: Histogram(max_score + 1), team_2: Histogram(max_score + 1)}
+        self.runs_margin = Histogram(max_score + 1)
+        self.wickets_margin = Histogram(11)
+
+        # Per player histograms, keyed by name
+        self.player_runs = {}
+        self.player_wickets = {}
+
+    def add_result(self, result):
+        """
+        :param result: MatchResult from SimplisticSimulator.play_match
+        """
+        first, second = result.bat_first.name, result.bat_second.name
+        self.n += 1
+
+        self.first_innings.add_one(result.first_runs)
+        self.second_innings.add_one(result.second_runs)
+        self.scores[first].add_one(result.first_runs)
+        self.scores[second].add_one(result.second_runs)
+
+        if result.winner is None:
+            self.ties += 1
+        else:
+            self.wins[result.winner.name] += 1
+            if result.margin_type == "runs":
+                self.bat_first_wins += 1
+                self.runs_margin.add_one(result.margin)
+            else:
+                self.wickets_margin.add_one(result.margin)
+
+    def add_scorecards(self, scorecards):
+        """
+        :param scorecards: Match.scorecards layout, keyed by Team
+        """
+        for team, cards in scorecards.items():
+            for player, card in cards["Bat"].items():
+                self._player_hist(self.player_runs, player, self.max_player_runs + 1).add_one(card["Runs"])
+            for player, card in cards["Bowl"].items():
+                self._player_hist(self.player_wickets, player, 11).add_one(card["Wickets"])
+
+    def add_batch(self, batch):
+        """
+        :param batch: BatchResult from the batch engine
+        """
+        t1, t2 = batch.team_1, batch.team_2
+        runs_1 = batch.innings[t1].runs
+        runs_2 = batch.innings[t2].runs
+        first = batch.team_1_bats_first
+
+        self.n += batch.n
+        self.first_innings.add(np.where(first, runs_1, runs_2))
+        self.second_innings.add(np.where(first, runs_2, runs_1))
+        self.scores[t1.name].add(runs_1)
+        self.scores[t2.name].add(runs_2)
+
+        self.ties += int((batch.winner == -1).sum())
+        self.wins[t1.name] += int((batch.winner == 0).sum())
+        self.wins[t2.name] += int((batch.winner == 1).sum())
+
+        decided = batch.winner != -1
+        self.bat_first_wins += int((decided & ~batch.chased).sum())
+        self.runs_margin.add(batch.margin[decided & ~batch.chased])
+        self.wickets_margin.add(batch.margin[decided & batch.chased])
+
+        for team, opp in ((t1, t2), (t2, t1)):
+            for j, player in enumerate(team.lineup):
+                self._player_hist(self.player_runs, player, self.max_player_runs + 1) \
+                    .add(batch.innings[team].bat_runs[:, j])
+            for j, player in enumerate(team.bowler_list):
+                self._player_hist(self.player_wickets, player, 11) \
+                    .add(batch.innings[opp].bowl_wkts[:, j])
+
+    @staticmethod
+    def _player_hist(table, player, size):
+        hist = table.get(player)
+        if hist is None:
+            hist = table[player] = Histogram(size)
+        return hist
+
+    def merge(self, other):
+        """
+        Adds the counts of another aggregator of the same fixture.
+        """
+        assert set(self.teams) == set(other.teams)
+        self.n += other.n
+        self.ties += other.ties
+        self.bat_first_wins += other.bat_first_wins
+        for team in self.teams:
+            self.wins[team] += other.wins[team]
+            self.scores[team].merge(other.scores[team])
+
+        self.first_innings.merge(other.first_innings)
+        self.second_innings.merge(other.second_innings)
+        self.runs_margin.merge(other.runs_margin)
+        self.wickets_margin.merge(other.wickets_margin)
+
+        for mine, theirs in ((self.player_runs, other.player_runs),
+                             (self.player_wickets, other.player_wickets)):
+            for player, hist in theirs.items():
+                if player in mine:
+                    mine[player].merge(hist)
+                else:
+                    mine[player] = Histogram(len(hist.counts)).merge(hist)
+        return self
+
+    def arrays(self):
+        """
+        :return: (dict of arrays, dict of JSON metadata) holding the full
+                 state, see from_arrays
+        """
+        arrays = {"first_innings": self.first_innings.counts,
+                  "second_innings": self.second_innings.counts,
+                  "score_1": self.scores[self.teams[0]].counts,
+                  "score_2": self.scores[self.teams[1]].counts,
+                  "runs_margin": self.runs_margin.counts,
+                  "wickets_margin": self.wickets_margin.counts}
+        meta = {"teams": list(self.teams), "n": self.n, "wins": self.wins, "ties": self.ties,
+                "bat_first_wins": self.bat_first_wins, "max_score": self.max_score,
+                "max_player_runs": self.max_player_runs,
+                "player_runs": list(self.player_runs), "player_wickets": list(self.player_wickets)}
+        for prefix, table in (("runs", self.player_runs), ("wickets", self.player_wickets)):
+            if table:
+                arrays[f"player_{prefix}"] = np.stack([hist.counts for hist in table.values()])
+        return arrays, meta
+
+    @staticmethod
+    def from_arrays(arrays, meta):
+        """
+        Rebuilds an aggregator from the output of arrays.
+        """
+        aggregator = OutcomeAggregator(*meta["teams"], max_score=meta["max_score"],
+                                       max_player_runs=meta["max_player_runs"])
+        aggregator.n = meta["n"]
+        aggregator.wins = dict(meta["wins"])
+        aggregator.ties = meta["ties"]
+        aggregator.bat_first_wins = meta["bat_first_wins"]
+
+        aggregator.first_innings.counts[:] = arrays["first_innings"]
+        aggregator.second_innings.counts[:] = arrays["second_innings"]
+        aggregator.scores[aggregator.teams[0]].counts[:] = arrays["score_1"]
+        aggregator.scores[aggregator.teams[1]].counts[:] = arrays["score_2"]
+        aggregator.runs_margin.counts[:] = arrays["runs_margin"]
+        aggregator.wickets_margin.counts[:] = arrays["wickets_margin"]
+
+        for prefix, table, size in (("runs", aggregator.player_runs, meta["max_player_runs"] + 1),
+                                    ("wickets", aggregator.player_wickets, 11)):
+            for player, counts in zip(meta[f"player_{prefix}"], arrays.get(f"player_{prefix}", ())):
+                hist = table[player] = Histogram(size)
+                hist.counts[:] = counts
+        return aggregator
+
+    def win_rate(self, team, z=1.96):
+        """
+        :return: (rate, low, high) for a team name, or "Tie"
+        """
+        successes = self.ties if team == "Tie" else self.wins[team]
+        rate = successes / self.n if self.n else float("nan")
+        return (rate,) + wilson_interval(successes, self.n, z)
+
+    def summary(self):
+        return {"matches": self.n,
+                "win_rates": {team: self.win_rate(team) for team in self.teams + ("Tie",)},
+                "first_innings": {"mean": self.first_innings.mean(), "quantiles": self.first_innings.quantiles()},
+                "second_innings": {"mean": self.second_innings.mean(), "quantiles": self.second_innings.quantiles()},
+                "runs_margin": {"mean": self.runs_margin.mean(), "quantiles": self.runs_margin.quantiles()},
+                "wickets_margin": {"mean": self.wickets_margin.mean(), "quantiles": self.wickets_margin.quantiles()},
+                "players": {player: {"mean_runs": self.player_runs[player].mean() if player in self.player_runs else None,
+                                     "mean_wickets": self.player_wickets[player].mean() if player in self.player_wickets else None}
+                            for player in set(self.player_runs) | set(self.player_wickets)}}
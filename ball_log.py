@@ -0,0 +1,213 @@
+from collections.abc import Mapping
+import numpy as np
+from game_tools import Match
+
+
+class BallLog:
+    """
+    Structure-of-arrays log of deliveries. Each field of Match.template is a
+    growable NumPy column, player and team names are stored as integer IDs.
+    Indexing a row gives a dict-like BallRow with the Match.template keys.
+    """
+
+    columns = {"match_id": np.int32,
+               "inning": np.int8,
+               "over": np.int8,
+               "ball": np.int8,
+               "batting_team": np.int16,
+               "bowling_team": np.int16,
+               "batsman": np.int16,
+               "non_striker": np.int16,
+               "bowler": np.int16,
+               "wide_runs": np.int8,
+               "noball_runs": np.int8,
+               "batsman_runs": np.int8,
+               # Index into Match.valid_dismissals, -1 if nobody was dismissed
+               "dismissal": np.int8,
+               "player_dismissed": np.int16}
+
+    def __init__(self, capacity=256, names=None):
+        self.n = 0
+        self.start = 0
+
+        # Name table, shared by slices of this log
+        self.names = names if names is not None else {"list": [], "ids": {}}
+
+        self.data = {col: np.zeros(capacity, dtype=dtype) for col, dtype in BallLog.columns.items()}
+
+    def name_id(self, name):
+        if name is None:
+            return -1
+        ids = self.names["ids"]
+        i = ids.get(name)
+        if i is None:
+            i = ids[name] = len(self.names["list"])
+            self.names["list"].append(name)
+        return i
+
+    def name(self, i):
+        return self.names["list"][i] if i >= 0 else None
+
+    def reserve(self, capacity):
+        size = len(self.data["match_id"])
+        if capacity <= size:
+            return
+        size = max(capacity, 2 * size)
+        for col, arr in self.data.items():
+            grown = np.zeros(size, dtype=arr.dtype)
+            grown[:self.n] = arr[:self.n]
+            self.data[col] = grown
+
+    def append(self, match_id, inning, over, ball, batting_team, bowling_team, batsman,
+               non_striker, bowler, batsman_runs=0, wide_runs=0, noball_runs=0,
+               dismissal=-1, player_dismissed=None):
+        """
+        Adds one delivery. Names are interned, dismissal is an index into
+        Match.valid_dismissals.
+        """
+        if self.n == len(self.data["match_id"]):
+            self.reserve(self.n + 1)
+
+        i = self.n
+        d = self.data
+        d["match_id"][i] = match_id
+        d["inning"][i] = inning
+        d["over"][i] = over
+        d["ball"][i] = ball
+        d["batting_team"][i] = self.name_id(batting_team)
+        d["bowling_team"][i] = self.name_id(bowling_team)
+        d["batsman"][i] = self.name_id(batsman)
+        d["non_striker"][i] = self.name_id(non_striker)
+        d["bowler"][i] = self.name_id(bowler)
+        d["batsman_runs"][i] = batsman_runs
+        d["wide_runs"][i] = wide_runs
+        d["noball_runs"][i] = noball_runs
+        d["dismissal"][i] = dismissal
+        d["player_dismissed"][i] = self.name_id(player_dismissed)
+        self.n += 1
+
+    def extend(self, other):
+        """
+        Appends every delivery of other, which may use a different name table.
+        """
+        if len(other) == 0:
+            return
+        self.reserve(self.n + len(other))
+
+        remap = None
+        if other.names is not self.names:
+            remap = np.array([self.name_id(name) for name in other.names["list"]] + [-1], dtype=np.int16)
+
+        for col in BallLog.columns:
+            values = other.column(col)
+            if remap is not None and col in BallRow.named:
+                values = remap[values]
+            self.data[col][self.n:self.n + len(other)] = values
+        self.n += len(other)
+
+    def column(self, col):
+        """
+        :return: view of one column over the rows of this log
+        """
+        return self.data[col][:self.n]
+
+    def slice(self, start, stop):
+        """
+        :return: BallLog sharing columns and names with this one, rows start to stop
+        """
+        view = BallLog(0, self.names)
+        view.data = {col: arr[start:stop] for col, arr in self.data.items()}
+        view.n = stop - start
+        view.start = self.start + start
+        return view
+
+    def match(self, match_id):
+        """
+        :return: slice with the deliveries of match_id, matches being logged in order
+        """
+        ids = self.column("match_id")
+        return self.slice(np.searchsorted(ids, match_id, "left"), np.searchsorted(ids, match_id, "right"))
+
+    def innings_split(self):
+        """
+        :return: index of the first second innings delivery, len(self) if none
+        """
+        second = np.flatnonzero(self.column("inning") == 2)
+        return int(second[0]) if len(second) else self.n
+
+    def innings(self, match_id, inning):
+        match = self.match(match_id)
+        split = match.innings_split()
+        return match.slice(0, split) if inning == 1 else match.slice(split, len(match))
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            start, stop, step = i.indices(self.n)
+            assert step == 1
+            return self.slice(start, stop)
+        if i < 0:
+            i += self.n
+        if not 0 <= i < self.n:
+            raise IndexError(i)
+        return BallRow(self, i)
+
+    def __iter__(self):
+        for i in range(self.n):
+            yield BallRow(self, i)
+
+    def index(self, row):
+        if isinstance(row, BallRow) and row.log.names is self.names:
+            i = row.log.start + row.i - self.start
+            if 0 <= i < self.n:
+                return i
+        for i, other in enumerate(self):
+            if other == row:
+                return i
+        raise ValueError("delivery is not in this log")
+
+    def nbytes(self):
+        return sum(arr[:self.n].nbytes for arr in self.data.values())
+
+
+class BallRow(Mapping):
+    """
+    Read-only view of one delivery of a BallLog with the keys of Match.template.
+    """
+
+    __slots__ = ("log", "i")
+
+    named = ("batting_team", "bowling_team", "batsman", "non_striker", "bowler", "player_dismissed")
+
+    def __init__(self, log, i):
+        self.log = log
+        self.i = i
+
+    def __getitem__(self, key):
+        d = self.log.data
+        i = self.i
+
+        if key in BallRow.named:
+            return self.log.name(int(d[key][i]))
+        if key == "dismissal_kind":
+            kind = int(d["dismissal"][i])
+            return Match.valid_dismissals[kind] if kind >= 0 else None
+        if key == "extra_runs":
+            return int(d["wide_runs"][i]) + int(d["noball_runs"][i])
+        if key == "total_runs":
+            return int(d["batsman_runs"][i]) + int(d["wide_runs"][i]) + int(d["noball_runs"][i])
+        if key in d:
+            return int(d[key][i])
+        # Fields the simulator never sets
+        return Match.template[key]
+
+    def __iter__(self):
+        return iter(Match.template)
+
+    def __len__(self):
+        return len(Match.template)
+
+    def __repr__(self):
+        return repr(dict(self))
@@ -0,0 +1,87 @@
+"""
+Latency and throughput of the simulation service under concurrent clients.
+
+    python -m benchmarks.bench_service LINEUPS [--clients 8] [--requests 20] [-n 10000] [--workers N] [--max-age S]
+
+Clients ask for random fixtures of the lineup file, unseeded, over keep-alive
+HTTP connections to a service started in this process.
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+import numpy as np
+from sim_service import SimulationService
+
+
+async def client(port, fixtures, requests, n, rng):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    latencies = []
+    for i in range(requests):
+        team_1, team_2 = rng.choice(fixtures)
+        query = f"/simulate?team_1={team_1}&team_2={team_2}&n={n}".replace(" ", "%20")
+        start = time.perf_counter()
+        writer.write(f"GET {query} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        await writer.drain()
+        length = 0
+        while True:
+            line = await reader.readline()
+            if line == b"\r\n":
+                break
+            if line.lower().startswith(b"content-length:"):
+                length = int(line.split(b":")[1])
+        json.loads(await reader.readexactly(length))
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+    return latencies
+
+
+async def bench_service(service, clients, requests, n, fixtures, seed=0):
+    server = await asyncio.start_server(service.handle, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    rng = random.Random(seed)
+    async with server:
+        start = time.perf_counter()
+        latencies = await asyncio.gather(*(client(port, fixtures, requests, n, random.Random(rng.random()))
+                                           for i in range(clients)))
+        seconds = time.perf_counter() - start
+
+    ms = np.concatenate(latencies) * 1000
+    return {"clients": clients,
+            "requests": len(ms),
+            "matches_per_request": n,
+            "seconds": seconds,
+            "requests_per_sec": len(ms) / seconds,
+            "p50_ms": float(np.percentile(ms, 50)),
+            "p99_ms": float(np.percentile(ms, 99)),
+            "service": service.metrics.summary()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("lineups")
+    parser.add_argument("--deliveries", default="data/deliveries.csv")
+    parser.add_argument("--cache", default="stats_cache")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=20, help="requests per client")
+    parser.add_argument("-n", type=int, default=10_000, help="matches per request")
+    parser.add_argument("--fixtures", type=int, default=4, help="distinct fixtures asked for")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--max-age", type=float, default=1.0)
+    args = parser.parse_args()
+
+    service = SimulationService.from_lineups(args.lineups, args.deliveries, args.cache,
+                                             workers=args.workers, max_age=args.max_age)
+    service.warm_up()
+    names = sorted(service.teams)
+    fixtures = [(a, b) for a in names for b in names if a < b][:args.fixtures]
+    try:
+        result = asyncio.run(bench_service(service, args.clients, args.requests, args.n, fixtures))
+    finally:
+        service.close()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
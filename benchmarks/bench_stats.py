@@ -0,0 +1,147 @@
+"""
+Compares build_player_stats against the per-player loop it replaced.
+
+    python -m benchmarks.bench_stats [--matches N] [--deliveries PATH]
+"""
+import argparse
+import os
+import time
+import numpy as np
+import pandas as pd
+from stats_builder import build_player_stats, bowler_dismissals, dropped_bowler_columns
+from benchmarks.synthetic import synthetic_deliveries
+
+
+def legacy_player_stats(deliveries_df):
+    """
+    The original notebook aggregation, one boolean mask scan per player.
+    """
+    batsmen_names = sorted(set(deliveries_df["batsman"]))
+    batsmen_stats_dict = {}
+
+    for batter in batsmen_names:
+        batter_data = deliveries_df[deliveries_df["batsman"] == batter]
+        innings = len(set(batter_data["match_id"]))
+
+        balls_faced = len(batter_data) - len(batter_data[batter_data["noball_runs"] > 0]) - \
+            len(batter_data[batter_data["wide_runs"] > 0])
+        runs_scored = sum(batter_data["batsman_runs"])
+        dismissals = len(deliveries_df[deliveries_df["player_dismissed"] == batter])
+
+        run_distribution = batter_data["batsman_runs"].value_counts().to_dict()
+        dismissal_distribution = batter_data[batter_data["dismissal_kind"].notna()]["dismissal_kind"].value_counts().to_dict()
+
+        batsmen_stats_dict[batter] = {"Innings": innings,
+                                      "Runs": runs_scored,
+                                      "Balls Faced": balls_faced,
+                                      "Dismissals": dismissals,
+                                      "Run Distribution": run_distribution,
+                                      "Dismissal Distribution": dismissal_distribution}
+
+    batsmen_df = pd.DataFrame(batsmen_stats_dict).T
+    batsmen_df = pd.concat([batsmen_df.drop(["Run Distribution"], axis=1),
+                            batsmen_df["Run Distribution"].apply(pd.Series)], axis=1)
+    batsmen_df = pd.concat([batsmen_df.drop(["Dismissal Distribution"], axis=1),
+                            batsmen_df["Dismissal Distribution"].apply(pd.Series)], axis=1)
+    batsmen_df = batsmen_df.fillna(0).astype(int)
+    batsmen_df.index.name = "Name"
+    batsmen_df.reset_index(inplace=True)
+    batsmen_df["Average"] = batsmen_df["Runs"] / batsmen_df["Dismissals"]
+    batsmen_df["Strike Rate"] = 100 * batsmen_df["Runs"] / batsmen_df["Balls Faced"]
+
+    bowler_names = sorted(set(deliveries_df['bowler']))
+    bowler_stats_dict = {}
+
+    for bowler in bowler_names:
+        bowler_data = deliveries_df[deliveries_df['bowler'] == bowler]
+
+        batter_data = deliveries_df[deliveries_df["batsman"] == bowler]
+        matches = len(set(bowler_data["match_id"]).union(set(batter_data["match_id"])))
+
+        noballs = len(bowler_data[bowler_data["noball_runs"] > 0])
+        wides = len(bowler_data[bowler_data["wide_runs"] > 0])
+
+        runs_conceded = np.sum(bowler_data['batsman_runs']) + np.sum(
+            bowler_data['noball_runs']) + np.sum(bowler_data['wide_runs'])
+        legal_balls_bowled = len(bowler_data) - noballs - wides
+
+        dismissal_distribution = bowler_data[bowler_data["dismissal_kind"].notna()][
+            "dismissal_kind"].value_counts().to_dict()
+        wickets_taken = 0
+        for bd in bowler_dismissals:
+            if bd in dismissal_distribution.keys():
+                wickets_taken += dismissal_distribution[bd]
+
+        run_distribution = bowler_data["batsman_runs"].value_counts().to_dict()
+
+        bowler_stats_dict[bowler] = {"Matches": matches,
+                                     "Wickets": wickets_taken,
+                                     "Balls Bowled": legal_balls_bowled,
+                                     "Runs Conceded": runs_conceded,
+                                     "Dismissal Distribution": dismissal_distribution,
+                                     "Run Distribution": run_distribution,
+                                     "No Balls": noballs,
+                                     "Wides": wides}
+
+    bowlers_df = pd.DataFrame(bowler_stats_dict).T
+    bowlers_df = pd.concat([bowlers_df.drop(["Dismissal Distribution"], axis=1),
+                            bowlers_df["Dismissal Distribution"].apply(pd.Series)], axis=1)
+    bowlers_df = pd.concat([bowlers_df.drop(["Run Distribution"], axis=1),
+                            bowlers_df["Run Distribution"].apply(pd.Series)], axis=1)
+    bowlers_df = bowlers_df.fillna(0).astype(int)
+    bowlers_df.index.name = "Name"
+    bowlers_df.reset_index(inplace=True)
+    bowlers_df["Average"] = bowlers_df["Runs Conceded"] / bowlers_df["Wickets"]
+    bowlers_df["Strike Rate"] = bowlers_df["Balls Bowled"] / bowlers_df["Wickets"]
+    bowlers_df["Economy"] = 6 * bowlers_df["Runs Conceded"] / bowlers_df["Balls Bowled"]
+    bowlers_df = bowlers_df.drop(dropped_bowler_columns, axis=1, errors="ignore")
+
+    return batsmen_df, bowlers_df
+
+
+def load_deliveries(path=None, n_matches=500):
+    if path is not None and os.path.exists(path):
+        return pd.read_csv(path)
+    return synthetic_deliveries(n_matches=n_matches)
+
+
+def bench_stats(deliveries_df, legacy=True):
+    """
+    :return: dict of timings in seconds, and whether both builders agree
+    """
+    result = {"rows": len(deliveries_df)}
+
+    start = time.perf_counter()
+    batsmen_df, bowlers_df = build_player_stats(deliveries_df)
+    result["build_player_stats"] = time.perf_counter() - start
+
+    if legacy:
+        start = time.perf_counter()
+        legacy_batsmen_df, legacy_bowlers_df = legacy_player_stats(deliveries_df)
+        result["legacy_loop"] = time.perf_counter() - start
+        result["speedup"] = result["legacy_loop"] / result["build_player_stats"]
+
+        try:
+            pd.testing.assert_frame_equal(batsmen_df, legacy_batsmen_df[batsmen_df.columns])
+            pd.testing.assert_frame_equal(bowlers_df, legacy_bowlers_df[bowlers_df.columns])
+            result["identical"] = True
+        except AssertionError:
+            result["identical"] = False
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--deliveries", default="data/deliveries.csv")
+    parser.add_argument("--matches", type=int, default=500,
+                        help="synthetic matches, used when the deliveries file is missing")
+    args = parser.parse_args()
+
+    result = bench_stats(load_deliveries(args.deliveries, args.matches))
+    for k, v in result.items():
+        print(f"{k:<20} {v}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Runs every benchmark and writes the results to a JSON file, to compare
+the simulator, stats builder and report writer across commits.
+
+    python -m benchmarks.run_all [--out bench.json] [--matches N] [--deliveries PATH]
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from benchmarks.bench_stats import bench_stats, load_deliveries
+from game_tools import Player, Team
+from matchups import Matchup
+from reports import ReportSink
+from simulators import SimplisticSimulator, simulate_batch
+from stats_builder import build_player_stats
+from stats_store import PlayerStatsStore
+
+
+def timed(fn, repeat=1):
+    """
+    :return: (best seconds per call over repeat runs, last return value)
+    """
+    best = float("inf")
+    value = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        value = fn()
+        best = min(best, time.perf_counter() - start)
+    return best, value
+
+
+def synthetic_teams(store):
+    """
+    Two teams of the synthetic players with the most balls bowled, so both
+    have enough bowlers for 20 overs.
+    """
+    names = sorted(store.bowling_table.names, key=lambda p: -store.bowling(p)["Balls Bowled"])
+    teams = []
+    for k, name in enumerate(("Synthetic XI", "Random XI")):
+        lineup = sorted(names[11 * k:11 * (k + 1)])
+        team = Team(name, lineup, abbrev=name[:3].upper(), captain=lineup[0], wk=lineup[1])
+        team.generate_team(store)
+        teams.append(team)
+    return teams
+
+
+def bench_matches(team_1, team_2, n):
+    """
+    :return: matches/sec and balls/sec of play_match at every telemetry level,
+             and of the batch engine
+    """
+    result = {}
+    for telemetry in SimplisticSimulator.telemetry_levels:
+        sim = SimplisticSimulator(team_1, team_2, telemetry=telemetry, keep_deliveries=False, seed=0)
+        seconds, results = timed(lambda: [sim.play_match() for i in range(n)])
+        balls = sum(r.first_balls + r.second_balls for r in results)
+        result[telemetry] = {"matches": n,
+                             "seconds": seconds,
+                             "matches_per_sec": n / seconds,
+                             "balls_per_sec": balls / seconds}
+
+    batch_n = 20 * n
+    seconds, batch = timed(lambda: simulate_batch(team_1, team_2, batch_n, seed=0))
+    balls = int(sum(inn.balls.sum() for inn in batch.innings.values()))
+    result["batch"] = {"matches": batch_n,
+                       "seconds": seconds,
+                       "matches_per_sec": batch_n / seconds,
+                       "balls_per_sec": balls / seconds}
+    return result
+
+
+def bench_setup(team_1, team_2, store, repeat=20):
+    """
+    :return: seconds per call of the per match and per team setup steps
+    """
+    sim = SimplisticSimulator(team_1, team_2)
+    players = list(team_1.lineup) + list(team_2.lineup)
+
+    def build_team():
+        team = Team(team_1.name, team_1.lineup, abbrev=team_1.abbrev)
+        team.generate_team(store)
+        return team
+
+    return {"compile_matchup": timed(lambda: Matchup(team_1, team_2), repeat)[0],
+            "assign_probabilities": timed(lambda: sim.assign_probabilities(team_1, team_2), repeat)[0],
+            "generate_team": timed(build_team, repeat)[0],
+            "player": timed(lambda: [Player(p, store) for p in players], repeat)[0] / len(players)}
+
+
+def bench_reports(team_1, team_2, n):
+    """
+    :return: reports/sec of Match.write_to_file and of each ReportSink format
+    """
+    sim = SimplisticSimulator(team_1, team_2, keep_deliveries=True, seed=0)
+    matches = []
+    for i in range(n):
+        start = len(sim.deliveries)
+        sim.play_match()
+        sim.match.set_toss_result(sim.bat_first, sim.bat_second, "")
+        matches.append((sim.match, sim.deliveries.slice(start, len(sim.deliveries))))
+
+    result = {"reports": n}
+    with tempfile.TemporaryDirectory() as out:
+        def write_files():
+            folder = tempfile.mkdtemp(dir=out)
+            for match, deliveries in matches:
+                match.write_to_file(folder + "/", deliveries)
+
+        seconds = timed(write_files)[0]
+        result["write_to_file"] = n / seconds
+
+        for archive in (None,) + ReportSink.archive_formats:
+            def write_sink():
+                with ReportSink(tempfile.mkdtemp(dir=out), archive=archive) as sink:
+                    for match, deliveries in matches:
+                        sink.write(match, deliveries)
+
+            seconds = timed(write_sink)[0]
+            result[f"sink_{archive or 'files'}"] = n / seconds
+    return result
+
+
+def current_rss():
+    """
+    :return: resident set size in bytes, the peak where /proc is missing
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        # ru_maxrss is in kilobytes on Linux, bytes on macOS
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+
+
+def probe(kind, matches):
+    """
+    Measurements that need a fresh interpreter, run in a subprocess.
+    """
+    if kind == "cold":
+        start = time.perf_counter()
+        df = load_deliveries(None, 200)
+        store = PlayerStatsStore.from_frames(*build_player_stats(df))
+        team_1, team_2 = synthetic_teams(store)
+        ready = time.perf_counter() - start
+        SimplisticSimulator(team_1, team_2, seed=0).play_match()
+        return {"teams_ready": ready, "first_match": time.perf_counter() - start}
+
+    df = load_deliveries(None, 200)
+    store = PlayerStatsStore.from_frames(*build_player_stats(df))
+    team_1, team_2 = synthetic_teams(store)
+    # RSS can stay flat while freed setup memory is reused, the traced peak cannot
+    before = current_rss()
+    tracemalloc.start()
+    sim = SimplisticSimulator(team_1, team_2, telemetry=kind, seed=0)
+    for i in range(matches):
+        sim.play_match()
+    traced_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    after = current_rss()
+
+    unit = 1 if sys.platform == "darwin" else 1024
+    per_1k = 1000 / matches / 2 ** 20
+    return {"peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit / 2 ** 20,
+            "rss_growth_mb_per_1k_matches": (after - before) * per_1k,
+            "traced_peak_mb_per_1k_matches": traced_peak * per_1k}
+
+
+def run_probe(kind, matches=1000):
+    out = subprocess.run([sys.executable, "-m", "benchmarks.run_all", "--probe", kind,
+                          "--matches", str(matches)],
+                         capture_output=True, text=True, check=True)
+    return json.loads(out.stdout)
+
+
+def cold_start():
+    """
+    :return: wall seconds of fresh interpreters importing the simulator, and
+             going from nothing to a first played match
+    """
+    imports = timed(lambda: subprocess.run([sys.executable, "-c", "import simulators, game_tools"],
+                                           check=True), 3)[0]
+    start = time.perf_counter()
+    inside = run_probe("cold")
+    return {"import": imports, "process_to_first_match": time.perf_counter() - start, **inside}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_all(deliveries=None, matches=200, synthetic_matches=500):
+    """
+    :return: dict of every benchmark result
+    """
+    df = load_deliveries(deliveries, synthetic_matches)
+    stats = bench_stats(df, legacy=False)
+    store = PlayerStatsStore.from_frames(*build_player_stats(df))
+    team_1, team_2 = synthetic_teams(store)
+
+    return {"commit": git_commit(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+            "data": "deliveries" if deliveries is not None and os.path.exists(deliveries) else "synthetic",
+            "stats": stats,
+            "setup": bench_setup(team_1, team_2, store),
+            "matches": bench_matches(team_1, team_2, matches),
+            "reports": bench_reports(team_1, team_2, matches),
+            "memory": {telemetry: run_probe(telemetry) for telemetry in SimplisticSimulator.telemetry_levels},
+            "cold_start": cold_start()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--out", default="bench.json")
+    parser.add_argument("--deliveries", default="data/deliveries.csv")
+    parser.add_argument("--matches", type=int, default=200,
+                        help="matches per simulator benchmark")
+    parser.add_argument("--synthetic-matches", type=int, default=500,
+                        help="synthetic matches, used when the deliveries file is missing")
+    parser.add_argument("--probe", choices=SimplisticSimulator.telemetry_levels + ("cold",),
+                        help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.probe is not None:
+        print(json.dumps(probe(args.probe, args.matches)))
+        return
+
+    result = run_all(args.deliveries, args.matches, args.synthetic_matches)
+    with open(args.out, "w") as f:
+        json.dump(result, f, indent=2)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
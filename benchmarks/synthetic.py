@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+
+
+dismissal_kinds = ['caught', 'bowled', 'run out', 'lbw', 'stumped', 'caught and bowled',
+                   'retired hurt', 'hit wicket', 'obstructing the field']
+dismissal_weights = [0.60, 0.15, 0.10, 0.07, 0.03, 0.02, 0.01, 0.01, 0.01]
+
+# 0 to 6 runs, Out, No Ball, Wide
+outcome_weights = [0.34, 0.33, 0.07, 0.01, 0.11, 0.005, 0.05, 0.05, 0.01, 0.025]
+
+
+def synthetic_deliveries(n_matches=500, n_players=400, seed=0):
+    """
+    Generates a deliveries.csv shaped DataFrame with n_matches two innings
+    matches of random players, for benchmarks when the real data is absent.
+    """
+    rng = np.random.default_rng(seed)
+    names = np.array([f"Player {i:04d}" for i in range(n_players)], dtype=object)
+
+    # 20 overs of 6 balls per innings, extras add balls on top
+    per_innings = 126
+    n_innings = 2 * n_matches
+    n = n_innings * per_innings
+
+    squads = np.argsort(rng.random((n_matches, n_players)), axis=1)[:, :22]
+    match = np.repeat(np.arange(n_matches), 2 * per_innings)
+    inning = np.tile(np.repeat([1, 2], per_innings), n_matches)
+    ball_no = np.tile(np.arange(per_innings), n_innings)
+
+    side = np.where(inning == 1, 0, 11)
+    batsman = squads[match, side + rng.integers(0, 11, n)]
+    non_striker = squads[match, side + rng.integers(0, 11, n)]
+    bowler = squads[match, (11 - side) + 6 + (ball_no // 6) % 5]
+
+    outcome = rng.choice(len(outcome_weights), size=n, p=outcome_weights)
+    out = outcome == 7
+    kind = np.where(out, rng.choice(len(dismissal_kinds), size=n, p=dismissal_weights), -1)
+
+    df = pd.DataFrame({"match_id": match + 1,
+                       "inning": inning,
+                       "batting_team": np.where(inning == 1, "Team A", "Team B"),
+                       "bowling_team": np.where(inning == 1, "Team B", "Team A"),
+                       "over": np.minimum(ball_no // 6 + 1, 20),
+                       "ball": ball_no % 6 + 1,
+                       "batsman": names[batsman],
+                       "non_striker": names[non_striker],
+                       "bowler": names[bowler],
+                       "is_super_over": 0,
+                       "wide_runs": (outcome == 9).astype(int),
+                       "bye_runs": 0,
+                       "legbye_runs": 0,
+                       "noball_runs": (outcome == 8).astype(int),
+                       "penalty_runs": 0,
+                       "batsman_runs": np.where(outcome <= 6, outcome, 0)})
+
+    df["extra_runs"] = df["wide_runs"] + df["noball_runs"]
+    df["total_runs"] = df["batsman_runs"] + df["extra_runs"]
+    df["player_dismissed"] = np.where(out, names[batsman], None)
+    df["dismissal_kind"] = np.where(out, np.array(dismissal_kinds, dtype=object)[kind], None)
+    df["fielder"] = None
+
+    return df
@@ -0,0 +1,325 @@
+import json
+import os
+import numpy as np
+from stats_cache import load_or_rebuild
+from stats_store import PlayerStatsStore, StatsTable, bowler_dismissals, dropped_bowler_columns, shrink_table
+
+
+# Bump whenever the layout of the index changes
+INDEX_VERSION = 1
+
+# Leading count columns of each table, before run values and dismissal kinds
+BATTING_COUNTS = ["Innings", "Deliveries", "No Balls", "Wides", "Runs", "Dismissals"]
+BOWLING_COUNTS = ["Matches", "Deliveries", "No Balls", "Wides", "Runs Conceded"]
+
+
+class ContextTable:
+    """
+    Additive counts of one role, one row per (player, venue, season) cell
+    with any counts. Rows are sorted by player, so a player's cells
+    are contiguous.
+    """
+
+    def __init__(self, keys, player, venue, season, counts):
+        """
+        :param keys: column keys of counts, leading counts then run values and dismissal kinds
+        :param counts: int array, one row per cell
+        """
+        self.keys = list(keys)
+        self.player = player
+        self.venue = venue
+        self.season = season
+        self.counts = counts
+
+    def rows(self, player_ids):
+        """
+        :return: rows of the cells of the given players
+        """
+        player_ids = np.unique(player_ids)
+        starts = np.searchsorted(self.player, player_ids, side="left")
+        ends = np.searchsorted(self.player, player_ids, side="right")
+        if len(starts) == 0:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)])
+
+    def sum(self, rows):
+        """
+        :return: (player ids, counts summed per player) over the given rows
+        """
+        players = self.player[rows]
+        if len(rows) == 0:
+            return players, np.zeros((0, len(self.keys)), dtype=np.int64)
+        starts = np.concatenate(([0], np.flatnonzero(np.diff(players)) + 1))
+        return players[starts], np.add.reduceat(self.counts[rows].astype(np.int64), starts, axis=0)
+
+
+def _cell_frame(counts, keys):
+    # Counts of every cell in keys order, zero where a cell has none
+    return counts.reindex(columns=keys, fill_value=0).fillna(0).to_numpy(dtype=np.int64)
+
+
+def _run_and_kind_columns(columns):
+    runs = sorted(c for c in columns if not isinstance(c, str))
+    kinds = sorted(c for c in columns if isinstance(c, str))
+    return runs, kinds
+
+
+def build_context_index(deliveries_df, matches_df):
+    """
+    Folds deliveries into per (player, venue, season) counts, in the same
+    groupby passes as build_player_stats with the player key replaced by a
+    cell code.
+
+    :param deliveries_df: deliveries.csv as a DataFrame
+    :param matches_df: matches.csv as a DataFrame, for each match_id's venue, city and season
+    :return: ContextIndex
+    """
+    import pandas as pd
+    from stats_builder import batting_counts, bowling_counts
+
+    matches = matches_df.set_index("id")
+    venues = sorted(matches["venue"].astype(str).unique())
+    seasons = sorted(int(s) for s in matches["season"].unique())
+    city_venues = {}
+    for city, venue in zip(matches["city"].fillna("").astype(str), matches["venue"].astype(str)):
+        city_venues.setdefault(city, set()).add(venue)
+
+    df = deliveries_df[deliveries_df["match_id"].isin(matches.index)]
+    match_ids = df["match_id"].to_numpy()
+    match_venue = pd.Series(pd.Categorical(matches["venue"].astype(str), categories=venues).codes,
+                            index=matches.index)
+    match_season = pd.Series(np.searchsorted(seasons, matches["season"].to_numpy()), index=matches.index)
+
+    dismissed_names = df["player_dismissed"].dropna().astype(str)
+    names = sorted(set(df["batsman"].astype(str)) | set(df["bowler"].astype(str)) | set(dismissed_names))
+    n_venues, n_seasons = len(venues), len(seasons)
+
+    def player_ids(column):
+        # -1 where the column is empty
+        return pd.Categorical(df[column].astype(str), categories=names).codes.astype(np.int64)
+
+    def cells(pid, ids):
+        venue = match_venue.reindex(ids).to_numpy(dtype=np.int64)
+        season = match_season.reindex(ids).to_numpy(dtype=np.int64)
+        return (pid * n_venues + venue) * n_seasons + season
+
+    def per_cell(pid, ids):
+        # Distinct matches per cell, a match has one venue and season so these add up
+        pairs = np.unique(np.stack([pid, ids], axis=1), axis=0)
+        return pd.Series(1, index=cells(pairs[:, 0], pairs[:, 1])).groupby(level=0).size()
+
+    bat = player_ids("batsman")
+    bowl = player_ids("bowler")
+    out = player_ids("player_dismissed")
+
+    # Batting
+    counts = batting_counts(df.assign(batsman=cells(bat, match_ids)))
+    dismissals = pd.Series(1, index=cells(out[out >= 0], match_ids[out >= 0])).groupby(level=0).size()
+    # Batsmen run out at the non striker's end may have cells without deliveries
+    counts = counts.reindex(counts.index.union(dismissals.index), fill_value=0)
+    counts["Innings"] = per_cell(bat, match_ids)
+    counts["Dismissals"] = dismissals
+    runs, kinds = _run_and_kind_columns([c for c in counts.columns if c not in BATTING_COUNTS])
+    batting = (BATTING_COUNTS + runs + kinds, counts)
+
+    # Bowling, Matches counts matches a bowler bowled or batted in
+    counts = bowling_counts(df.assign(bowler=cells(bowl, match_ids)))
+    batted = np.isin(bat, np.unique(bowl))
+    matches_played = per_cell(np.concatenate([bowl, bat[batted]]), np.concatenate([match_ids, match_ids[batted]]))
+    counts = counts.reindex(counts.index.union(matches_played.index), fill_value=0)
+    counts["Matches"] = matches_played
+    runs, kinds = _run_and_kind_columns([c for c in counts.columns if c not in BOWLING_COUNTS])
+    bowling = (BOWLING_COUNTS + kinds + runs, counts)
+
+    tables = []
+    for keys, counts in (batting, bowling):
+        cell_codes = np.asarray(counts.index, dtype=np.int64)
+        tables.append(ContextTable(keys,
+                                   (cell_codes // (n_venues * n_seasons)).astype(np.int32),
+                                   (cell_codes // n_seasons % n_venues).astype(np.int16),
+                                   (cell_codes % n_seasons).astype(np.int16),
+                                   _cell_frame(counts, keys).astype(np.int32)))
+
+    return ContextIndex(names, venues, seasons, {city: sorted(v) for city, v in city_venues.items()}, *tables)
+
+
+class ContextIndex:
+    """
+    Player counts split by venue and season, summed over any slice of them
+    into a PlayerStatsStore laid out like the career stats.
+
+        index.store(venues=["M Chinnaswamy Stadium"], seasons=range(2013, 2018))
+    """
+
+    def __init__(self, names, venues, seasons, city_venues, batting, bowling):
+        """
+        :param city_venues: dict of city to the venues played at in it
+        :param batting: ContextTable of batting counts
+        :param bowling: ContextTable of bowling counts
+        """
+        self.names = list(names)
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        self.venues = list(venues)
+        self.venue_ids = {venue: i for i, venue in enumerate(self.venues)}
+        self.seasons = list(seasons)
+        self.city_venues = city_venues
+        self.batting = batting
+        self.bowling = bowling
+
+    def venue_selection(self, venues=None, cities=None):
+        """
+        :return: venue ids to keep, None for all
+        """
+        if venues is None and cities is None:
+            return None
+        selected = set(range(len(self.venues)))
+        if venues is not None:
+            selected &= {self.venue_ids[venue] for venue in venues}
+        if cities is not None:
+            selected &= {self.venue_ids[venue] for city in cities for venue in self.city_venues[city]}
+        return np.asarray(sorted(selected), dtype=np.int16)
+
+    def select(self, table, venues=None, cities=None, seasons=None, players=None):
+        """
+        :return: rows of table in the given context
+        """
+        if players is None:
+            rows = np.arange(len(table.player))
+        else:
+            rows = table.rows([self.ids[p] for p in players if p in self.ids])
+
+        venue_ids = self.venue_selection(venues, cities)
+        mask = np.ones(len(rows), dtype=bool)
+        if venue_ids is not None:
+            mask &= np.isin(table.venue[rows], venue_ids)
+        if seasons is not None:
+            season_ids = [i for i, season in enumerate(self.seasons) if season in set(seasons)]
+            mask &= np.isin(table.season[rows], season_ids)
+        return rows[mask]
+
+    def batting_table(self, rows):
+        players, sums = self.batting.sum(rows)
+        col = {key: sums[:, i] for i, key in enumerate(self.batting.keys)}
+        keep = col["Deliveries"] > 0
+        col = {key: values[keep] for key, values in col.items()}
+        runs, kinds = _run_and_kind_columns(self.batting.keys[len(BATTING_COUNTS):])
+
+        columns = {"Name": np.asarray([self.names[p] for p in players[keep]], dtype=str),
+                   "Innings": col["Innings"],
+                   "Runs": col["Runs"],
+                   # Balls Faced = Total balls on strike - no balls - wide balls
+                   "Balls Faced": col["Deliveries"] - col["No Balls"] - col["Wides"],
+                   "Dismissals": col["Dismissals"]}
+        columns.update({key: col[key] for key in runs + kinds})
+        with np.errstate(divide="ignore", invalid="ignore"):
+            columns["Average"] = columns["Runs"] / columns["Dismissals"]
+            columns["Strike Rate"] = 100 * columns["Runs"] / columns["Balls Faced"]
+        return StatsTable(columns["Name"].tolist(), columns)
+
+    def bowling_table(self, rows):
+        players, sums = self.bowling.sum(rows)
+        col = {key: sums[:, i] for i, key in enumerate(self.bowling.keys)}
+        keep = col["Deliveries"] > 0
+        col = {key: values[keep] for key, values in col.items()}
+        runs, kinds = _run_and_kind_columns(self.bowling.keys[len(BOWLING_COUNTS):])
+
+        columns = {"Name": np.asarray([self.names[p] for p in players[keep]], dtype=str),
+                   "Matches": col["Matches"],
+                   "Wickets": sum((col[d] for d in bowler_dismissals if d in kinds),
+                                  np.zeros(int(keep.sum()), dtype=np.int64)),
+                   # Num balls = balls bowled - no balls - wides
+                   "Balls Bowled": col["Deliveries"] - col["No Balls"] - col["Wides"],
+                   "Runs Conceded": col["Runs Conceded"],
+                   "No Balls": col["No Balls"],
+                   "Wides": col["Wides"]}
+        columns.update({key: col[key] for key in kinds if key not in dropped_bowler_columns})
+        columns.update({key: col[key] for key in runs})
+        with np.errstate(divide="ignore", invalid="ignore"):
+            columns["Average"] = columns["Runs Conceded"] / columns["Wickets"]
+            columns["Strike Rate"] = columns["Balls Bowled"] / columns["Wickets"]
+            columns["Economy"] = 6 * columns["Runs Conceded"] / columns["Balls Bowled"]
+        return StatsTable(columns["Name"].tolist(), columns)
+
+    def store(self, venues=None, cities=None, seasons=None, players=None, strength=60.0):
+        """
+        Stats of every player (or of players only) over the matches played at
+        venues, in cities, and in seasons. None keeps every value.
+
+        Counts of a slice are shrunk towards each player's stats over every
+        context with shrink_table, so players with few or no balls in the
+        slice keep their career rates instead of empty rows.
+
+        :param strength: prior weight of the career rates, in balls, 0 for the
+                         raw counts of the slice
+        :return: PlayerStatsStore
+        """
+        context = {"venues": venues, "cities": cities, "seasons": seasons, "players": players}
+        store = PlayerStatsStore(self.batting_table(self.select(self.batting, **context)),
+                                 self.bowling_table(self.select(self.bowling, **context)))
+        if strength == 0 or (venues is None and cities is None and seasons is None):
+            return store
+
+        # Innings and Matches shrink too, so bowler weights stay defined
+        career = self.store(players=players)
+        return PlayerStatsStore(shrink_table(store.batting_table, career.batting_table, "Balls Faced", strength),
+                                shrink_table(store.bowling_table, career.bowling_table, "Balls Bowled", strength))
+
+    def save(self, path, sources=None):
+        """
+        :param sources: dict of source name to fingerprint, kept in the metadata
+        """
+        arrays = {}
+        meta = {"version": INDEX_VERSION, "names": self.names, "venues": self.venues,
+                "seasons": self.seasons, "city_venues": self.city_venues,
+                "sources": sources or {}, "keys": {}}
+        for table_name, table in (("batting", self.batting), ("bowling", self.bowling)):
+            for attr in ("player", "venue", "season", "counts"):
+                arrays[f"{table_name}_{attr}"] = getattr(table, attr)
+            # JSON keys are strings, run columns are ints
+            meta["keys"][table_name] = [{"key": key, "key_type": type(key).__name__} for key in table.keys]
+
+        arrays["meta"] = np.array(json.dumps(meta))
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, **arrays)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def read_meta(path):
+        try:
+            with np.load(path) as data:
+                return json.loads(data["meta"].item())
+        except (OSError, ValueError, KeyError):
+            return None
+
+    @staticmethod
+    def load(path):
+        with np.load(path) as data:
+            meta = json.loads(data["meta"].item())
+            tables = []
+            for table_name in ("batting", "bowling"):
+                keys = [int(k["key"]) if k["key_type"] == "int" else k["key"] for k in meta["keys"][table_name]]
+                tables.append(ContextTable(keys, *(data[f"{table_name}_{attr}"]
+                                                   for attr in ("player", "venue", "season", "counts"))))
+        return ContextIndex(meta["names"], meta["venues"], meta["seasons"], meta["city_venues"], *tables)
+
+
+def load_context_index(deliveries_path="data/deliveries.csv", matches_path="data/matches.csv",
+                       cache_dir="stats_cache"):
+    """
+    Loads the context index from cache_dir, rebuilding it when missing or
+    built from different deliveries or matches files.
+
+    :return: ContextIndex
+    """
+    def build():
+        # Only pay for pandas when the index has to be rebuilt
+        import pandas as pd
+        from ingest import delivery_dtypes
+
+        deliveries_df = pd.read_csv(deliveries_path, usecols=list(delivery_dtypes), dtype=delivery_dtypes)
+        matches_df = pd.read_csv(matches_path, usecols=["id", "season", "city", "venue"])
+        return build_context_index(deliveries_df, matches_df)
+
+    return load_or_rebuild(os.path.join(cache_dir, "context_index.npz"),
+                           {"deliveries": deliveries_path, "matches": matches_path},
+                           INDEX_VERSION, ContextIndex.read_meta, ContextIndex.load, build)
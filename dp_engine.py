@@ -0,0 +1,196 @@
+import numpy as np
+from matchups import compile_matchup, bowler_weights
+
+
+def default_plan(team, weights=None):
+    """
+    Deterministic 20 over plan of team.bowler_list: every over goes to the
+    highest weighted bowler with overs left who did not bowl the previous one.
+
+    :return: list of 20 bowler_list positions
+    """
+    if weights is None:
+        weights = bowler_weights(team)
+    n = len(team.bowler_list)
+    overs = [0] * n
+    plan = []
+    prev = -1
+    for over in range(20):
+        eligible = [b for b in range(n) if b != prev and overs[b] < 4] or \
+                   [b for b in range(n) if b != prev] or list(range(n))
+        b = max(eligible, key=lambda j: (weights[j], -overs[j]))
+        plan.append(b)
+        overs[b] += 1
+        prev = b
+    return plan
+
+
+class InningsDP:
+    """
+    Exact innings score distribution of the SimplisticSimulator model for a
+    fixed batting order and bowling plan, by propagating probability mass over
+    (wickets, striker, non-striker) x runs one legal ball at a time.
+
+    Wides and no balls before each legal ball add a geometric number of runs,
+    truncated at max_extras. Totals above max_runs share the last bin.
+    """
+
+    def __init__(self, probs, max_runs=400, max_extras=8, over_phase=None):
+        """
+        :param probs: (phases, batsmen, bowlers, outcomes) ball distributions,
+                      batsmen in batting order, e.g. Matchup.probs, or
+                      (batsmen, bowlers, outcomes) for one phase
+        :param over_phase: phase of each of the 20 overs, all 0 if None
+        """
+        if probs.ndim == 3:
+            probs = probs[None]
+        self.probs = probs
+        self.over_phase = np.zeros(20, dtype=np.int8) if over_phase is None else over_phase
+        self.max_runs = max_runs
+        self.max_extras = max_extras
+
+        # Live states: wickets w, batsmen at crease are w + 1 and one of 0..w
+        configs = []
+        for w in range(10):
+            for a in range(w + 1):
+                configs.append((w, a, w + 1))
+                configs.append((w, w + 1, a))
+        self.configs = configs
+        index = {c: i for i, c in enumerate(configs)}
+
+        self.wickets = np.array([c[0] for c in configs])
+        self.striker = np.array([c[1] for c in configs])
+        self.swap = np.array([index[(w, t, s)] for w, s, t in configs])
+        # Striker out: next batsman w + 2 takes strike, -1 when all out
+        self.out = np.array([index[(w + 1, w + 2, t)] if w + 1 < 10 else -1 for w, s, t in configs])
+
+    def shift(self, mass, k):
+        """
+        :return: mass with every total moved k runs up, clamped at max_runs
+        """
+        if k == 0:
+            return mass
+        shifted = np.zeros_like(mass)
+        shifted[:, k:] = mass[:, :-k]
+        shifted[:, -1] += mass[:, -k:].sum(axis=1)
+        return shifted
+
+    def initial_state(self):
+        """
+        :return: (live, all_out) mass before the first ball
+        """
+        live = np.zeros((len(self.configs), self.max_runs + 1))
+        live[self.configs.index((0, 0, 1)), 0] = 1.0
+        return live, np.zeros(self.max_runs + 1)
+
+    def play_over(self, state, bowler, over=0):
+        """
+        :param state: (live, all_out) mass before the over, left unchanged
+        :param bowler: bowler position (third axis of probs)
+        :param over: over index 0 to 19, selecting the phase of probs
+        :return: (live, all_out) mass after the over
+        """
+        live, all_out = state
+        all_out = all_out.copy()
+        valid = self.out >= 0
+
+        p = self.probs[self.over_phase[over], self.striker, bowler]
+
+        legal = p[:, :8].sum(axis=1)
+        extra = p[:, 8] + p[:, 9]
+        q = extra / (extra + legal)
+        p_legal = p[:, :8] / legal[:, None]
+
+        # P(k wides or no balls before the legal ball)
+        coef = (1 - q)[None, :] * q[None, :] ** np.arange(self.max_extras + 1)[:, None]
+        coef[-1] += q ** (self.max_extras + 1)
+
+        for ball in range(6):
+            mass = coef[0][:, None] * live
+            for k in range(1, self.max_extras + 1):
+                mass += coef[k][:, None] * self.shift(live, k)
+
+            nxt = np.zeros_like(live)
+            for runs in range(7):
+                moved = self.shift(mass * p_legal[:, runs][:, None], runs)
+                if runs % 2 == 1:
+                    nxt[self.swap] += moved
+                else:
+                    nxt += moved
+
+            outs = mass * p_legal[:, 7][:, None]
+            np.add.at(nxt, self.out[valid], outs[valid])
+            all_out += outs[~valid].sum(axis=0)
+
+            live = nxt
+
+        # Post over processing
+        return live[self.swap], all_out
+
+    def score_distribution(self, plan, start=0, state=None, checkpoints=None):
+        """
+        :param plan: bowler position (third axis of probs) for each of the 20 overs
+        :param start: first over to play, resuming from state
+        :param state: (live, all_out) mass before over start, e.g. a checkpoint
+                      of an earlier plan with the same first start overs
+        :param checkpoints: list extended with the state before every over played
+        :return: P(total == r) for r in 0..max_runs
+        """
+        if state is None:
+            assert start == 0
+            state = self.initial_state()
+
+        for over in range(start, 20):
+            if checkpoints is not None:
+                checkpoints.append(state)
+            state = self.play_over(state, plan[over], over)
+
+        live, all_out = state
+        return all_out + live.sum(axis=0)
+
+
+def innings_distribution(bat_team, bowl_team, plan=None, order=None, max_runs=400):
+    """
+    :param plan: bowl_team.bowler_list positions per over, default_plan if None
+    :param order: batting order as lineup names, bat_team.lineup if None
+    :return: P(total == r) for r in 0..max_runs
+    """
+    matchup = compile_matchup(bat_team, bowl_team)
+    probs = matchup.probs
+    if order is not None:
+        probs = probs[:, [matchup.bat_ids[name] for name in order]]
+    if plan is None:
+        plan = default_plan(bowl_team, matchup.weights)
+    return InningsDP(probs, max_runs, over_phase=matchup.over_phase).score_distribution(plan)
+
+
+def chase_probabilities(first, second):
+    """
+    The chase stops once the target is reached, and runs never go down, so it
+    succeeds exactly when the uninterrupted second innings total beats the first.
+
+    :param first: first innings score distribution
+    :param second: second innings score distribution, without a target
+    :return: (P(chasing side wins), P(tie), P(side batting first wins))
+    """
+    at_least = np.cumsum(second[::-1])[::-1]
+    beats = np.append(at_least[1:], 0.0)
+    chase = float(np.dot(first, beats))
+    tie = float(np.dot(first, second))
+    return chase, tie, 1.0 - chase - tie
+
+
+def match_probabilities(bat_first, bat_second, plan_first=None, plan_second=None, max_runs=400):
+    """
+    :param plan_first: plan of bat_second's bowlers in the first innings
+    :param plan_second: plan of bat_first's bowlers in the second innings
+    :return: dict of both innings distributions and the result probabilities
+    """
+    first = innings_distribution(bat_first, bat_second, plan_first, max_runs=max_runs)
+    second = innings_distribution(bat_second, bat_first, plan_second, max_runs=max_runs)
+    chase, tie, defend = chase_probabilities(first, second)
+    return {"first_innings": first,
+            "second_innings": second,
+            bat_first.name: defend,
+            bat_second.name: chase,
+            "Tie": tie}
@@ -1,28 +1,28 @@
 from itertools import count
 import os
+from context_index import ContextIndex
+from stats_store import PlayerStatsStore
 
 class Player:
 
-    def __init__(self, name, batsmen_df, bowlers_df):
-        self.name = name
-
-        bat_srs = batsmen_df[batsmen_df["Name"] == name]
-        bowl_srs = bowlers_df[bowlers_df["Name"] == name]
+    __slots__ = ("name", "batting_stats", "bowling_stats")
 
-        self.batting_stats = bat_srs.to_dict()
-        self.bowling_stats = bowl_srs.to_dict()
+    def __init__(self, name, batsmen_df, bowlers_df=None):
+        """
+        :param name: player name
+        :param batsmen_df: batsmen DataFrame, or a PlayerStatsStore
+        :param bowlers_df: bowlers DataFrame, unused when batsmen_df is a store
+        """
+        self.name = name
 
-        for k, v in self.batting_stats.items():
-            if v == {}:
-                self.batting_stats[k] = 0
-            else:
-                self.batting_stats[k] = list(v.values())[0]
+        if isinstance(batsmen_df, PlayerStatsStore):
+            store = batsmen_df
+        else:
+            store = PlayerStatsStore.for_frames(batsmen_df, bowlers_df)
 
-        for k, v in self.bowling_stats.items():
-            if v == {}:
-                self.bowling_stats[k] = 0
-            else:
-                self.bowling_stats[k] = list(v.values())[0]
+        # Read-only views into the store, every column reads 0 for unknown players
+        self.batting_stats = store.batting(name)
+        self.bowling_stats = store.bowling(name)
 
 class Team:
 
@@ -33,6 +33,11 @@ class Team:
         self.captain = captain
         self.wk = wk
         self.players = {}
+        # PhaseStats the compiled matchups split overs by, None for one table per innings
+        self.phases = None
+
+        # Bumped whenever player stats are (re)loaded, compiled matchups check it
+        self.stats_version = 0
 
         assert len(lineup) == 11
 
@@ -43,18 +48,51 @@ class Team:
             assert wk in lineup
 
 
-    def set_bowlers(self, cutoff=60):
+    def set_bowlers(self, cutoff=60, store=None):
+        """
+        :param store: PlayerStatsStore to pick bowlers by, the players' own stats if None
+        """
         self.bowler_list = []
         for player in self.lineup:
-            if self.players[player].bowling_stats["Balls Bowled"] >= cutoff:
+            stats = self.players[player].bowling_stats if store is None else store.bowling(player)
+            if stats["Balls Bowled"] >= cutoff:
                 self.bowler_list.append(player)
 
 
-    def generate_team(self, batsmen_df, bowlers_df):
+    def set_phases(self, phases):
+        """
+        :param phases: PhaseStats, or None to go back to one table per innings
+        """
+        self.phases = phases
+        self.stats_version += 1
+
+
+    def generate_team(self, batsmen_df, bowlers_df=None, context=None, phases=None):
+        """
+        :param batsmen_df: batsmen DataFrame, a PlayerStatsStore, or a ContextIndex
+        :param bowlers_df: bowlers DataFrame, unused when batsmen_df is a store
+        :param context: ContextIndex.store filters, e.g. {"venues": [...],
+                        "seasons": range(2013, 2018)}, all matches if None
+        :param phases: PhaseStats giving ball outcomes per phase of the innings
+        """
+        selection = None
+        if isinstance(batsmen_df, ContextIndex):
+            # Only the lineup's cells are summed
+            store = batsmen_df.store(players=self.lineup, **(context or {}))
+            if context:
+                # Who bowls does not depend on the slice, a thin one would leave too few bowlers
+                selection = batsmen_df.store(players=self.lineup)
+        elif isinstance(batsmen_df, PlayerStatsStore):
+            store = batsmen_df
+        else:
+            store = PlayerStatsStore.for_frames(batsmen_df, bowlers_df)
+
         for player in self.lineup:
-            self.players[player] = Player(player, batsmen_df, bowlers_df)
+            self.players[player] = Player(player, store)
 
-        self.set_bowlers()
+        self.phases = phases
+        self.stats_version += 1
+        self.set_bowlers(store=selection)
 
 
 
@@ -176,13 +214,30 @@ class Match:
         return file_lines
 
     @staticmethod
-    def write_deliveries(deliveries, bat_team, bowl_team, innings, target=None):
+    def innings_split(deliveries):
+        """
+        :param deliveries: list of delivery dicts or a BallLog
+        :return: index of the first second innings delivery
+        """
+        if hasattr(deliveries, "innings_split"):
+            return deliveries.innings_split()
+        for i, delivery in enumerate(deliveries):
+            if delivery["inning"] == 2:
+                return i
+        return len(deliveries)
+
+    @staticmethod
+    def write_deliveries(deliveries, bat_team, bowl_team, innings, target=None, split=None):
+        """
+        :param split: index of the first second innings delivery, found if None
+        """
         assert innings == 1 or innings == 2
         if innings == 2:
             assert target is not None
 
-        #print(list(filter(lambda x: x["inning"] == 2, deliveries))[0])
-        second_innings_start = deliveries.index(list(filter(lambda x: x["inning"] == 2, deliveries))[0])
+        if split is None:
+            split = Match.innings_split(deliveries)
+        second_innings_start = split
 
         if innings == 1:
             start = 0
@@ -318,23 +373,36 @@ class Match:
         return file_lines
 
 
+    def file_name(self, offset=0):
+        return f"Match_{self.match_id + offset}_{self.team_1.name}_vs_{self.team_2.name}.txt"
+
     def write_to_file(self, prefix, deliveries):
 
-        filename = f"Match_{self.match_id}_{self.team_1.name}_vs_{self.team_2.name}.txt"
+        filename = self.file_name()
         i = 0
-        while filename in os.listdir(prefix):
+        while os.path.exists(prefix + filename):
             i += 1
-            filename = f"Match_{self.match_id + i}_{self.team_1.name}_vs_{self.team_2.name}.txt"
+            filename = self.file_name(i)
 
         filename = prefix + filename
 
+        with open(filename, 'w') as f:
+            f.write(self.render(deliveries))
+
+    def render(self, deliveries):
+        """
+        :return: full match report as one string
+        """
+        split = Match.innings_split(deliveries)
+
         file_lines = [f"Welcome to Match {self.match_id}" +
                       f" between {self.team_1.name} and {self.team_2.name}."]
 
         file_lines.append(Match.separator)
         file_lines.append("First Innings:")
         file_lines.append(Match.separator)
-        lines, bowl_1_order = Match.write_deliveries(deliveries, self.bat_first, self.bat_second, innings=1)
+        lines, bowl_1_order = Match.write_deliveries(deliveries, self.bat_first, self.bat_second,
+                                                     innings=1, split=split)
         file_lines.extend(lines)
         file_lines.append(Match.separator)
         file_lines.append(Match.separator)
@@ -353,7 +421,8 @@ class Match:
         file_lines.append("Second Innings:")
         file_lines.append(Match.separator)
         lines, bowl_2_order = Match.write_deliveries(deliveries, self.bat_second,
-                                                     self.bat_first, innings=2, target=target)
+                                                     self.bat_first, innings=2, target=target,
+                                                     split=split)
         file_lines.extend(lines)
         file_lines.append(Match.separator)
         file_lines.append(Match.separator)
@@ -384,11 +453,9 @@ class Match:
         file_lines.extend(self.print_bowl_scorecard(self.bat_first, bowl_2_order))
         file_lines.append(Match.separator)
         file_lines.append(Match.separator)
+        file_lines.append("")
 
-        with open(filename, 'w') as f:
-            for line in file_lines:
-                f.write(line)
-                f.write("\n")
+        return "\n".join(file_lines)
 
 
 
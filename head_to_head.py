@@ -0,0 +1,236 @@
+import json
+import os
+from itertools import count
+import numpy as np
+from game_tools import Match
+from stats_cache import load_or_rebuild
+
+
+# Bump whenever the layout of the saved matrix changes
+H2H_VERSION = 1
+
+# Ball outcomes counted per pair, indices into Match.ball_choices: 0 to 6 runs, Out, No Ball, Wide
+OUTCOMES = 10
+OUT, NO_BALL, WIDE = 7, 8, 9
+
+
+class HeadToHead:
+    """
+    Ball outcome and dismissal counts of every batsman against every bowler
+    faced, as a block CSR matrix: row i holds the bowlers batsman i faced,
+    each with a dense vector of outcome counts. A CSC permutation of the same
+    blocks gives every bowler's batsmen.
+
+    Both rows and columns are found in O(1) through their pointers, a pair
+    by a binary search within its row.
+    """
+
+    _tokens = count(1)
+
+    def __init__(self, names, indptr, indices, counts, dcounts, strength=30.0):
+        """
+        :param names: player names, ids index into it for batsmen and bowlers alike
+        :param indptr: row pointers, the blocks of batsman i are indptr[i]:indptr[i + 1]
+        :param indices: bowler id of every block, sorted within a row
+        :param counts: (blocks, OUTCOMES) ball outcome counts
+        :param dcounts: (blocks, len(Match.valid_dismissals)) dismissals of the batsman
+        :param strength: prior weight of the marginal probabilities, in balls, when blending
+        """
+        self.names = list(names)
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        self.indptr = indptr
+        self.indices = indices
+        self.counts = counts
+        self.dcounts = dcounts
+        self.strength = strength
+
+        # Batsman of every block, then the blocks reordered by bowler
+        rows = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+        self.col_perm = np.lexsort((rows, indices))
+        self.col_indptr = np.searchsorted(indices[self.col_perm], np.arange(len(self.names) + 1))
+        self.col_rows = rows[self.col_perm]
+
+        # Compiled matchups are rebuilt whenever the counts or the strength differ
+        self.key = (next(HeadToHead._tokens), strength)
+
+    def with_strength(self, strength):
+        """
+        :return: HeadToHead sharing these counts, blending with another prior weight
+        """
+        return HeadToHead(self.names, self.indptr, self.indices, self.counts, self.dcounts, strength)
+
+    def row(self, batsman):
+        """
+        :return: (bowler names, outcome counts) of every bowler batsman faced
+        """
+        i = self.ids.get(batsman)
+        if i is None:
+            return [], np.zeros((0, OUTCOMES), dtype=self.counts.dtype)
+        blocks = slice(self.indptr[i], self.indptr[i + 1])
+        return [self.names[j] for j in self.indices[blocks]], self.counts[blocks]
+
+    def column(self, bowler):
+        """
+        :return: (batsman names, outcome counts) of every batsman bowler bowled to
+        """
+        j = self.ids.get(bowler)
+        if j is None:
+            return [], np.zeros((0, OUTCOMES), dtype=self.counts.dtype)
+        blocks = self.col_perm[self.col_indptr[j]:self.col_indptr[j + 1]]
+        return [self.names[i] for i in self.col_rows[self.col_indptr[j]:self.col_indptr[j + 1]]], \
+            self.counts[blocks]
+
+    def block(self, batsman, bowler):
+        """
+        :return: block index of the pair, -1 if they never met
+        """
+        i, j = self.ids.get(batsman), self.ids.get(bowler)
+        if i is None or j is None:
+            return -1
+        start, end = self.indptr[i], self.indptr[i + 1]
+        k = start + np.searchsorted(self.indices[start:end], j)
+        return int(k) if k < end and self.indices[k] == j else -1
+
+    def pair(self, batsman, bowler):
+        """
+        :return: (outcome counts, dismissal counts) of batsman facing bowler
+        """
+        k = self.block(batsman, bowler)
+        if k < 0:
+            return np.zeros(OUTCOMES, dtype=self.counts.dtype), np.zeros(self.dcounts.shape[1], dtype=self.dcounts.dtype)
+        return self.counts[k], self.dcounts[k]
+
+    def pair_counts(self, batsmen, bowlers):
+        """
+        :return: dense outcome counts (batsmen, bowlers, OUTCOMES) and dismissal
+                 counts (batsmen, bowlers, len(Match.valid_dismissals)) of a lineup
+                 against a bowler list
+        """
+        counts = np.zeros((len(batsmen), len(bowlers), OUTCOMES))
+        dcounts = np.zeros((len(batsmen), len(bowlers), self.dcounts.shape[1]))
+        bowl_ids = np.array([self.ids.get(b, -1) for b in bowlers])
+        for a, batsman in enumerate(batsmen):
+            i = self.ids.get(batsman)
+            if i is None:
+                continue
+            start, end = self.indptr[i], self.indptr[i + 1]
+            row = self.indices[start:end]
+            if len(row) == 0:
+                continue
+            pos = np.minimum(np.searchsorted(row, bowl_ids), len(row) - 1)
+            met = np.flatnonzero(row[pos] == bowl_ids)
+            counts[a, met] = self.counts[start + pos[met]]
+            dcounts[a, met] = self.dcounts[start + pos[met]]
+        return counts, dcounts
+
+    def blend(self, probs, dprobs, batsmen, bowlers):
+        """
+        Shrinks the head to head frequencies of every pair towards the
+        marginal probabilities, as the posterior mean under a Dirichlet prior
+        worth strength balls: (counts + strength * p) / (balls + strength).
+        Dismissal types use the prior's expected dismissals as their weight.
+
+        :param probs: marginal ball probabilities (batsmen, bowlers, len(Match.ball_choices))
+        :param dprobs: marginal dismissal probabilities (batsmen, bowlers, len(Match.valid_dismissals))
+        :return: blended (probs, dprobs), rows still summing to 1
+        """
+        counts, dcounts = self.pair_counts(batsmen, bowlers)
+        prior = self.strength * probs
+        blended = prior.copy()
+        blended[..., :OUTCOMES] += counts
+        total = counts.sum(axis=-1, keepdims=True) + self.strength
+
+        dprior = prior[..., OUT:OUT + 1] * dprobs
+        dtotal = dprior.sum(axis=-1, keepdims=True) + dcounts.sum(axis=-1, keepdims=True)
+
+        # Pairs with neither counts nor prior weight, e.g. strength 0 and never met, keep the marginals
+        with np.errstate(divide="ignore", invalid="ignore"):
+            blended = np.where(total > 0, blended / total, probs)
+            dblended = np.where(dtotal > 0, (dprior + dcounts) / dtotal, dprobs)
+        return blended, dblended
+
+    def save(self, path, sources=None):
+        meta = {"version": H2H_VERSION, "names": self.names, "strength": self.strength, "sources": sources or {}}
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, meta=np.array(json.dumps(meta)), indptr=self.indptr, indices=self.indices,
+                 counts=self.counts, dcounts=self.dcounts)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def read_meta(path):
+        try:
+            with np.load(path) as data:
+                return json.loads(data["meta"].item())
+        except (OSError, ValueError, KeyError):
+            return None
+
+    @staticmethod
+    def load(path, strength=None):
+        with np.load(path) as data:
+            meta = json.loads(data["meta"].item())
+            return HeadToHead(meta["names"], data["indptr"], data["indices"], data["counts"], data["dcounts"],
+                              meta["strength"] if strength is None else strength)
+
+
+def build_head_to_head(deliveries_df, strength=30.0):
+    """
+    Counts every (batsman, bowler, outcome) of deliveries in one pass.
+
+    Wides and no balls count as such, a ball on which the striker is out as
+    Out, any other ball as the runs off the bat. Dismissal types count only
+    the striker's dismissals, as in Match.valid_dismissals.
+
+    :param deliveries_df: deliveries.csv as a DataFrame
+    :return: HeadToHead
+    """
+    import pandas as pd
+
+    batsman = deliveries_df["batsman"].astype(str)
+    bowler = deliveries_df["bowler"].astype(str)
+    names = sorted(set(batsman) | set(bowler))
+    n_players = len(names)
+    bat = pd.Categorical(batsman, categories=names).codes.astype(np.int64)
+    bowl = pd.Categorical(bowler, categories=names).codes.astype(np.int64)
+
+    striker_out = (deliveries_df["player_dismissed"].astype(str) == batsman).to_numpy() & \
+        deliveries_df["dismissal_kind"].notna().to_numpy()
+    outcome = np.minimum(deliveries_df["batsman_runs"].to_numpy(dtype=np.int64), 6)
+    outcome = np.where(striker_out, OUT, outcome)
+    outcome = np.where(deliveries_df["noball_runs"].to_numpy() > 0, NO_BALL, outcome)
+    outcome = np.where(deliveries_df["wide_runs"].to_numpy() > 0, WIDE, outcome)
+
+    # Blocks are the distinct pairs, sorted by batsman then bowler
+    pairs, block = np.unique(bat * n_players + bowl, return_inverse=True)
+    block = block.ravel()
+    counts = np.bincount(block * OUTCOMES + outcome, minlength=len(pairs) * OUTCOMES).reshape(-1, OUTCOMES)
+
+    n_kinds = len(Match.valid_dismissals)
+    # Kinds outside Match.valid_dismissals, e.g. retired hurt, map to -1
+    kind_ids = {kind: i for i, kind in enumerate(Match.valid_dismissals)}
+    kind = deliveries_df["dismissal_kind"].map(kind_ids).fillna(-1).to_numpy(dtype=np.int64)
+    charged = striker_out & (kind >= 0)
+    dcounts = np.bincount(block[charged] * n_kinds + kind[charged],
+                          minlength=len(pairs) * n_kinds).reshape(-1, n_kinds)
+
+    indptr = np.searchsorted(pairs // n_players, np.arange(n_players + 1))
+    return HeadToHead(names, indptr, (pairs % n_players).astype(np.int32),
+                      counts.astype(np.int32), dcounts.astype(np.int32), strength)
+
+
+def load_head_to_head(deliveries_path="data/deliveries.csv", cache_dir="stats_cache", strength=30.0):
+    """
+    Loads the head to head matrix from cache_dir, rebuilding it when missing
+    or built from a different deliveries file.
+
+    :return: HeadToHead blending with the given strength
+    """
+    def build():
+        # Only pay for pandas when the matrix has to be rebuilt
+        import pandas as pd
+        from ingest import delivery_dtypes
+
+        deliveries_df = pd.read_csv(deliveries_path, usecols=list(delivery_dtypes), dtype=delivery_dtypes)
+        return build_head_to_head(deliveries_df, strength)
+
+    return load_or_rebuild(os.path.join(cache_dir, "head_to_head.npz"), {"deliveries": deliveries_path},
+                           H2H_VERSION, HeadToHead.read_meta, lambda path: HeadToHead.load(path, strength), build)
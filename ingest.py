@@ -0,0 +1,200 @@
+import pickle
+import numpy as np
+import pandas as pd
+import stats_builder
+
+
+# Compact dtypes for the columns the stats need, everything else is skipped
+delivery_dtypes = {"match_id": "int32",
+                   "inning": "int8",
+                   "over": "int8",
+                   "ball": "int8",
+                   "batsman": "category",
+                   "bowler": "category",
+                   "wide_runs": "int8",
+                   "noball_runs": "int8",
+                   "batsman_runs": "int8",
+                   "player_dismissed": "category",
+                   "dismissal_kind": "category"}
+
+
+def _add(running, block):
+    if running is None:
+        return block
+    return pd.concat([running, block]).groupby(level=0).sum().fillna(0).astype("int64")
+
+
+def _count_matches(pairs, last):
+    """
+    Counts the matches of every player in one block that were not counted
+    in earlier ones. Deliveries must come ordered by match_id, as
+    StatsAccumulator.fold checks, so a player's match can only have been
+    counted already if it is the last one counted.
+
+    :param pairs: unique (Name, match_id) pairs of the block, in delivery order
+    :param last: last match_id counted per player, None before the first block
+    :return: (new matches per player, last match_id counted per player)
+    """
+    if last is not None:
+        counted = pairs["match_id"].to_numpy() == last.reindex(pairs["Name"]).to_numpy()
+        pairs = pairs[~counted]
+    by_player = pairs.groupby("Name")["match_id"]
+    block_last = by_player.last()
+    if last is not None:
+        block_last = block_last.combine_first(last).astype("int64")
+    return by_player.size(), block_last
+
+
+def _merge_ranges(ranges, match_ids):
+    """
+    :param ranges: (k, 2) array of sorted, disjoint [first, last] match_id runs
+    :return: ranges covering match_ids too, adjacent runs joined
+    """
+    ids = np.unique(np.asarray(match_ids, dtype=np.int64))
+    if len(ids) == 0:
+        return ranges
+    breaks = np.flatnonzero(np.diff(ids) > 1)
+    runs = np.column_stack([ids[np.r_[0, breaks + 1]], ids[np.r_[breaks, len(ids) - 1]]])
+    ranges = np.concatenate([ranges, runs])
+    ranges = ranges[np.argsort(ranges[:, 0], kind="stable")]
+
+    # A run opens a new range when it starts after every earlier run ends
+    ends = np.maximum.accumulate(ranges[:, 1])
+    opens = np.flatnonzero(np.r_[True, ranges[1:, 0] > ends[:-1] + 1])
+    return np.column_stack([ranges[opens, 0], np.maximum.reduceat(ranges[:, 1], opens)])
+
+
+def _in_ranges(ranges, match_ids):
+    match_ids = np.asarray(match_ids, dtype=np.int64)
+    if len(ranges) == 0:
+        return np.zeros(len(match_ids), dtype=bool)
+    i = np.searchsorted(ranges[:, 0], match_ids, side="right") - 1
+    return (i >= 0) & (match_ids <= ranges[np.maximum(i, 0), 1])
+
+
+class StatsAccumulator:
+    """
+    Running per player counters that deliveries are folded into block by block.
+    Memory depends on the number of players, not on the number of deliveries
+    or matches ingested; match_ids seen are kept as runs of consecutive ids.
+    """
+
+    def __init__(self):
+        self.batting = None
+        self.dismissed = None
+        self.bowling = None
+        # Matches batted in, and batted or bowled in, per player
+        self.innings = None
+        self.matches = None
+        self.last_innings = None
+        self.last_match = None
+        self.match_ranges = np.empty((0, 2), dtype=np.int64)
+        # match_id of the last delivery folded in
+        self.last_id = None
+
+    def check_order(self, match_ids):
+        """
+        Raises ValueError unless match_ids are non-decreasing and reopen no
+        match folded in before, other than the one the last block ended in.
+        Matches counted per player rely on this order.
+        """
+        match_ids = np.asarray(match_ids, dtype=np.int64)
+        if (np.diff(match_ids) < 0).any():
+            raise ValueError("deliveries are not ordered by match_id")
+        reopened = self.has_matches(match_ids) & (match_ids != self.last_id)
+        if reopened.any():
+            raise ValueError(f"match {match_ids[reopened][0]} was already folded in")
+
+    def fold(self, deliveries_df):
+        """
+        Adds one block of deliveries to the running counters. Deliveries must
+        be ordered by match_id, a block may continue the match the previous
+        one ended in but not reopen an earlier one.
+        """
+        if len(deliveries_df) == 0:
+            return self
+        self.check_order(deliveries_df["match_id"])
+
+        self.batting = _add(self.batting, stats_builder.batting_counts(deliveries_df))
+        self.bowling = _add(self.bowling, stats_builder.bowling_counts(deliveries_df))
+        self.dismissed = _add(self.dismissed, stats_builder.dismissed_counts(deliveries_df))
+
+        # A match can straddle two blocks, it is counted in the first only
+        innings, self.last_innings = _count_matches(stats_builder.appearances(deliveries_df, "batsman"),
+                                                    self.last_innings)
+        matches, self.last_match = _count_matches(stats_builder.played_pairs(deliveries_df), self.last_match)
+        self.innings = _add(self.innings, innings)
+        self.matches = _add(self.matches, matches)
+
+        self.match_ranges = _merge_ranges(self.match_ranges, deliveries_df["match_id"].unique())
+        self.last_id = int(deliveries_df["match_id"].iloc[-1])
+        return self
+
+    def has_matches(self, match_ids):
+        """
+        :return: boolean array, True for match_ids already folded in
+        """
+        return _in_ranges(self.match_ranges, match_ids)
+
+    def apply_new_matches(self, deliveries_df):
+        """
+        Folds in only the deliveries of match_ids this snapshot has not seen,
+        e.g. a new season appended to deliveries.csv.
+
+        :return: number of new matches applied
+        """
+        new = ~self.has_matches(deliveries_df["match_id"])
+        n_new = deliveries_df.loc[new, "match_id"].nunique()
+        self.fold(deliveries_df[new])
+        return n_new
+
+    def to_frames(self):
+        """
+        :return: (batsmen_df, bowlers_df) in the schema of build_player_stats
+        """
+        return (stats_builder.finalize_batsmen(self.batting, self.dismissed, self.innings),
+                stats_builder.finalize_bowlers(self.bowling, self.matches))
+
+    def save(self, path):
+        with open(path, "wb") as f:
+            pickle.dump(self.__dict__, f)
+
+    @staticmethod
+    def load(path):
+        accumulator = StatsAccumulator()
+        with open(path, "rb") as f:
+            accumulator.__dict__.update(pickle.load(f))
+        return accumulator
+
+
+def read_deliveries(path, chunksize=200_000):
+    """
+    Iterates over deliveries.csv in chunks with compact dtypes.
+    """
+    return pd.read_csv(path, usecols=list(delivery_dtypes), dtype=delivery_dtypes,
+                       chunksize=chunksize)
+
+
+def ingest_csv(path, accumulator=None, chunksize=200_000, new_matches_only=False):
+    """
+    Streams deliveries.csv into an accumulator with bounded memory. The file
+    must be ordered by match_id, as deliveries.csv is.
+
+    :param path: deliveries.csv
+    :param accumulator: existing snapshot to update, a new one if None
+    :param new_matches_only: skip match_ids already in the snapshot, for
+                             applying a new season to an existing snapshot
+    :return: StatsAccumulator
+    """
+    if accumulator is None:
+        accumulator = StatsAccumulator()
+
+    # Fixed before reading, so matches straddling two chunks are kept whole
+    seen = accumulator.match_ranges.copy() if new_matches_only else None
+
+    for chunk in read_deliveries(path, chunksize):
+        if seen is not None:
+            chunk = chunk[~_in_ranges(seen, chunk["match_id"])]
+        accumulator.fold(chunk)
+
+    return accumulator
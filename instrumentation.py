@@ -0,0 +1,131 @@
+import json
+import os
+import sys
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+
+
+_disabled_phase = nullcontext()
+
+
+class Instrumentation:
+    """
+    Opt-in timings and counters for SimplisticSimulator runs.
+
+    Phases (setup, innings, bowler selection, report) accumulate wall time and
+    call counts. Match level phases are also kept as trace events for a Chrome
+    trace (chrome://tracing, Perfetto). Per match counters are taken from the
+    match totals, so nothing is added per ball. A disabled instance hands out a
+    shared no-op context and is never consulted inside the ball loop.
+    """
+
+    def __init__(self, enabled=True, trace_memory=False, memory_every=100, max_events=100_000):
+        """
+        :param trace_memory: run tracemalloc and sample traced memory every
+                             memory_every matches
+        :param max_events: cap on trace events kept, totals are always kept
+        """
+        self.enabled = enabled
+        self.trace_memory = trace_memory and enabled
+        self.memory_every = memory_every
+        self.max_events = max_events
+
+        self.seconds = defaultdict(float)
+        self.calls = Counter()
+        self.counters = Counter()
+        self.events = []
+        self.memory = []
+        self.matches = 0
+
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+        self.blocks = 0
+
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def add(self, name, seconds):
+        """
+        Adds a timing without a trace event, for phases run many times per match.
+        """
+        self.seconds[name] += seconds
+        self.calls[name] += 1
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    @contextmanager
+    def _phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            end = time.perf_counter()
+            self.seconds[name] += end - start
+            self.calls[name] += 1
+            if len(self.events) < self.max_events:
+                self.events.append({"name": name, "ph": "X", "pid": self.pid, "tid": 0,
+                                    "ts": (start - self.origin) * 1e6, "dur": (end - start) * 1e6})
+
+    def phase(self, name):
+        """
+        :return: context manager timing the enclosed block as phase name
+        """
+        if not self.enabled:
+            return _disabled_phase
+        return self._phase(name)
+
+    def begin_match(self):
+        if self.enabled:
+            self.blocks = sys.getallocatedblocks()
+
+    def end_match(self, result, extras=None):
+        """
+        :param result: MatchResult of the match
+        :param extras: wides and no balls of the match, if known
+        """
+        if not self.enabled:
+            return
+        self.matches += 1
+        self.counters["balls"] += result.first_balls + result.second_balls
+        self.counters["wickets"] += result.first_wickets + result.second_wickets
+        self.counters["runs"] += result.first_runs + result.second_runs
+        if extras is not None:
+            self.counters["extras"] += extras
+        # Net allocated blocks left behind by the match
+        self.counters["allocated_blocks"] += sys.getallocatedblocks() - self.blocks
+
+        if self.trace_memory and self.matches % self.memory_every == 0:
+            current, peak = tracemalloc.get_traced_memory()
+            now = time.perf_counter() - self.origin
+            self.memory.append({"match": self.matches, "time": now, "current": current, "peak": peak})
+            if len(self.events) < self.max_events:
+                self.events.append({"name": "memory", "ph": "C", "pid": self.pid, "tid": 0,
+                                    "ts": now * 1e6, "args": {"current": current, "peak": peak}})
+
+    def summary(self):
+        """
+        :return: dict of phase totals, counters with per match rates, and memory samples
+        """
+        per_match = {name: value / self.matches for name, value in self.counters.items()} if self.matches else {}
+        return {"matches": self.matches,
+                "phases": {name: {"seconds": self.seconds[name], "calls": self.calls[name]}
+                           for name in self.seconds},
+                "counters": dict(self.counters),
+                "per_match": per_match,
+                "memory": self.memory}
+
+    def to_json(self, path):
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+
+    def to_chrome_trace(self, path):
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.events, "displayTimeUnit": "ms",
+                       "otherData": {"counters": dict(self.counters)}}, f)
+
+    def close(self):
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
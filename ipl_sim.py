@@ -0,0 +1,214 @@
+"""
+Command line entry point for the simulators.
+
+    python ipl_sim.py fixture LINEUPS TEAM_1 TEAM_2 [-n 1000] [--engine batch]
+    python ipl_sim.py season LINEUPS [--season 2017] [-n 1000]
+    python ipl_sim.py build-stats [--deliveries data/deliveries.csv] [--context]
+    python ipl_sim.py bench [--out bench.json]
+    python ipl_sim.py serve LINEUPS [--port 8765 | --socket PATH] [--workers N]
+
+LINEUPS is a JSON or TOML file of team definitions (see team_bundle.read_lineups),
+compiled once into a cached bundle of player stats and matchup tables. Modules
+are imported by the command that needs them, so a cached fixture run touches
+neither pandas nor the stats builder.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+
+def load_teams(args):
+    from team_bundle import load_teams
+    return load_teams(args.lineups, args.deliveries, args.cache)
+
+
+def print_result(result, as_json):
+    if as_json:
+        print(json.dumps(result, indent=2, default=float))
+        return
+    for key, value in result.items():
+        print(f"{key:<20} {value}")
+
+
+def run_fixture(args):
+    start = time.perf_counter()
+    teams = load_teams(args)
+    team_1, team_2 = teams[args.team_1], teams[args.team_2]
+    loaded = time.perf_counter() - start
+
+    from aggregate import OutcomeAggregator
+    aggregator = OutcomeAggregator(team_1.name, team_2.name)
+
+    cache = None
+    if not args.no_cache:
+        from result_cache import ResultCache
+        cache = ResultCache(os.path.join(args.cache, "results"), args.cache_mb * 2 ** 20)
+
+    head_to_head = None
+    if args.head_to_head is not None:
+        from head_to_head import load_head_to_head
+        head_to_head = load_head_to_head(args.deliveries, args.cache, args.head_to_head)
+
+    if args.phases is not None:
+        from phase_stats import load_phase_stats
+        phases = load_phase_stats(args.deliveries, args.cache, args.phases.split(","), args.phase_strength)
+        team_1.set_phases(phases)
+        team_2.set_phases(phases)
+
+    if args.engine == "batch":
+        assert args.reports is None, "match reports need --engine scalar"
+        # Same results for any number of workers, one runs in process
+        from parallel import ParallelRunner
+        runner = ParallelRunner(args.workers, head_to_head=head_to_head)
+        aggregator.merge(runner.aggregate(team_1, team_2, args.n, args.seed, cache))
+    else:
+        from simulators import SimplisticSimulator
+        telemetry = "full" if args.reports is not None else args.telemetry
+        sim = SimplisticSimulator(team_1, team_2, telemetry=telemetry, keep_deliveries=False, seed=args.seed,
+                                  head_to_head=head_to_head)
+        sim.play_matches(args.n, to_file=args.reports is not None, out_folder=args.reports,
+                         archive=args.archive, aggregator=aggregator, cache=cache)
+
+    summary = aggregator.summary()
+    result = {"matches": summary["matches"],
+              "win_rates": summary["win_rates"],
+              "first_innings_mean": summary["first_innings"]["mean"],
+              "second_innings_mean": summary["second_innings"]["mean"],
+              "load_seconds": loaded,
+              "seconds": time.perf_counter() - start}
+    print_result(result, args.json)
+
+
+def run_season(args):
+    start = time.perf_counter()
+    teams = load_teams(args)
+
+    from season import SeasonSimulator, season_fixtures
+    fixtures = season_fixtures(args.season, args.matches)[0]
+    missing = {name for fixture in fixtures for name in fixture} - set(teams)
+    assert not missing, f"no lineup for {sorted(missing)}"
+    sim = SeasonSimulator(teams, fixtures, workers=args.workers)
+    result = sim.simulate(args.n, seed=args.seed)
+
+    if args.json:
+        print_result({"seasons": result.n, "table": result.points_table(),
+                      "seconds": time.perf_counter() - start}, True)
+        return
+    print(f"{'Team':<30} {'Pts':>6} {'NRR':>7} {'Top 4':>6} {'Final':>6} {'Title':>6}")
+    for row in result.points_table():
+        print(f"{row['Team']:<30} {row['Points']:>6.2f} {row['NRR']:>7.3f} "
+              f"{row['Playoffs']:>6.3f} {row['Final']:>6.3f} {row['Title']:>6.3f}")
+
+
+def build_stats(args):
+    from stats_cache import load_stats
+    start = time.perf_counter()
+    store = load_stats(args.deliveries, args.cache)
+    result = {"batsmen": len(store.batting_table),
+              "bowlers": len(store.bowling_table),
+              "cache": args.cache}
+    if args.context:
+        from context_index import load_context_index
+        index = load_context_index(args.deliveries, args.matches, args.cache)
+        result.update({"venues": len(index.venues), "seasons": len(index.seasons),
+                       "context_cells": len(index.batting.player) + len(index.bowling.player)})
+    result["seconds"] = time.perf_counter() - start
+    print_result(result, args.json)
+
+
+def bench(args):
+    from benchmarks.run_all import run_all
+    result = run_all(args.deliveries, args.n)
+    with open(args.out, "w") as f:
+        json.dump(result, f, indent=2)
+    print(json.dumps(result, indent=2))
+
+
+def serve(args):
+    import asyncio
+    from sim_service import SimulationService
+    service = SimulationService.from_lineups(args.lineups, args.deliveries, args.cache,
+                                             workers=args.workers, window=args.window,
+                                             max_age=args.max_age)
+    service.warm_up()
+    where = args.socket or f"http://{args.host}:{args.port}"
+    print(f"serving {len(service.teams)} teams on {where}", file=sys.stderr)
+    try:
+        asyncio.run(service.serve(args.host, args.port, args.socket))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+def parser():
+    p = argparse.ArgumentParser(prog="ipl-sim", description=__doc__,
+                                formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--deliveries", default="data/deliveries.csv")
+    p.add_argument("--cache", default="stats_cache", help="stats cache and team bundle directory")
+    p.add_argument("--json", action="store_true", help="print results as JSON")
+    sub = p.add_subparsers(dest="command", required=True)
+
+    fixture = sub.add_parser("fixture", help="simulate one fixture many times")
+    fixture.add_argument("lineups")
+    fixture.add_argument("team_1")
+    fixture.add_argument("team_2")
+    fixture.add_argument("-n", type=int, default=1000)
+    fixture.add_argument("--seed", type=int, default=0)
+    fixture.add_argument("--engine", choices=("batch", "scalar"), default="batch")
+    fixture.add_argument("--telemetry", choices=("result", "scorecard", "full"), default="result")
+    fixture.add_argument("--workers", type=int, default=1)
+    fixture.add_argument("--reports", help="write match reports to this folder (scalar engine)")
+    fixture.add_argument("--archive", choices=("tar.gz", "zip", "gz"))
+    fixture.add_argument("--head-to-head", type=float, metavar="STRENGTH",
+                         help="blend batsman v bowler counts in, shrunk towards the marginals with a prior of STRENGTH balls")
+    fixture.add_argument("--phases", metavar="CUTS",
+                         help="ball outcomes per phase of the innings, split after these overs, e.g. 6,15")
+    fixture.add_argument("--phase-strength", type=float, default=60.0,
+                         help="balls of career rates blended into each phase")
+    fixture.add_argument("--no-cache", action="store_true", help="always simulate, skipping the result cache")
+    fixture.add_argument("--cache-mb", type=int, default=256, help="size cap of the result cache")
+    fixture.set_defaults(run=run_fixture)
+
+    season = sub.add_parser("season", help="simulate a season's league and playoffs")
+    season.add_argument("lineups")
+    season.add_argument("--season", type=int, default=2017)
+    season.add_argument("--matches", default="data/matches.csv")
+    season.add_argument("-n", type=int, default=1000)
+    season.add_argument("--seed", type=int, default=0)
+    season.add_argument("--workers", type=int, default=None)
+    season.set_defaults(run=run_season)
+
+    stats = sub.add_parser("build-stats", help="build or refresh the player stats cache")
+    stats.add_argument("--context", action="store_true",
+                       help="also build the venue and season index, joining matches.csv")
+    stats.add_argument("--matches", default="data/matches.csv")
+    stats.set_defaults(run=build_stats)
+
+    benchmark = sub.add_parser("bench", help="run the benchmark suite")
+    benchmark.add_argument("--out", default="bench.json")
+    benchmark.add_argument("-n", type=int, default=200, help="matches per simulator benchmark")
+    benchmark.set_defaults(run=bench)
+
+    service = sub.add_parser("serve", help="serve simulations over HTTP on localhost")
+    service.add_argument("lineups")
+    service.add_argument("--host", default="127.0.0.1")
+    service.add_argument("--port", type=int, default=8765)
+    service.add_argument("--socket", help="listen on this Unix socket instead")
+    service.add_argument("--workers", type=int, default=None, help="worker processes, 0 for a thread")
+    service.add_argument("--window", type=float, default=0.002, help="seconds to gather requests into a batch")
+    service.add_argument("--max-age", type=float, default=1.0,
+                         help="seconds a finished batch keeps answering requests")
+    service.set_defaults(run=serve)
+    return p
+
+
+def main(argv=None):
+    args = parser().parse_args(argv)
+    args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+import copy
+import json
+
+
+class MatchState:
+    """
+    Serializable snapshot of a match in progress, from which the rest of the
+    match can be simulated (see simulators.simulate_from).
+
+    Teams and players are referred to by name. summary and scorecards have the
+    layout of Match.summary and Match.scorecards, keyed by team name. Balls in
+    the batting team's summary count every legal ball bowled so far, so 14.3
+    overs is 87 balls.
+    """
+
+    def __init__(self, bat_first, bat_second, innings, summary, scorecards,
+                 batsmen, striker, non_striker, bowler=None, prev_bowler=None):
+        """
+        :param bat_first: name of the team batting first
+        :param bat_second: name of the team batting second
+        :param innings: innings in progress, 1 or 2
+        :param batsmen: batsmen of the current innings that have come in, in order
+        :param striker: batsman on strike
+        :param non_striker: batsman at the other end
+        :param bowler: bowler of the over in progress, None between overs
+        :param prev_bowler: bowler of the last completed over
+        """
+        assert innings == 1 or innings == 2
+        self.bat_first = bat_first
+        self.bat_second = bat_second
+        self.innings = innings
+        self.summary = summary
+        self.scorecards = scorecards
+        self.batsmen = list(batsmen)
+        self.striker = striker
+        self.non_striker = non_striker
+        self.bowler = bowler
+        self.prev_bowler = prev_bowler
+
+    fields = ["bat_first", "bat_second", "innings", "summary", "scorecards",
+              "batsmen", "striker", "non_striker", "bowler", "prev_bowler"]
+
+    @property
+    def bat_team(self):
+        return self.bat_first if self.innings == 1 else self.bat_second
+
+    @property
+    def bowl_team(self):
+        return self.bat_second if self.innings == 1 else self.bat_first
+
+    @property
+    def target(self):
+        if self.innings == 1:
+            return None
+        return self.summary[self.bat_first]["Runs"] + 1
+
+    @property
+    def balls_in_over(self):
+        return self.summary[self.bat_team]["Balls"] % 6
+
+    @staticmethod
+    def start(bat_first, bat_second):
+        """
+        :param bat_first: Team batting first
+        :param bat_second: Team batting second
+        :return: MatchState before the first ball
+        """
+        summary = {}
+        scorecards = {}
+        for team in (bat_first, bat_second):
+            summary[team.name] = {"Runs": 0, "Wickets": 0, "Balls": 0}
+            scorecards[team.name] = {
+                "Bat": {p: {"Runs": 0, "Balls": 0, "Dismissal type": None} for p in team.lineup},
+                "Bowl": {b: {"Balls": 0, "Dots": 0, "Runs": 0, "Wickets": 0} for b in team.bowler_list}}
+
+        return MatchState(bat_first.name, bat_second.name, 1, summary, scorecards,
+                          bat_first.lineup[:2], bat_first.lineup[0], bat_first.lineup[1])
+
+    @staticmethod
+    def from_match(match, innings, batsmen, striker, non_striker,
+                   bowler=None, prev_bowler=None, legal_balls=0):
+        """
+        Snapshot of a Match being played by SimplisticSimulator.play_innings,
+        which keeps the crease and over state in locals.
+
+        :param match: Match with toss result set
+        :param legal_balls: legal balls of the over in progress, which
+                            play_innings adds to the summary only at the end of the over
+        """
+        summary = {team.name: dict(stats) for team, stats in match.summary.items()}
+        scorecards = {team.name: copy.deepcopy(cards) for team, cards in match.scorecards.items()}
+
+        state = MatchState(match.bat_first.name, match.bat_second.name, innings, summary,
+                           scorecards, batsmen, striker, non_striker, bowler, prev_bowler)
+        state.summary[state.bat_team]["Balls"] += legal_balls
+        return state
+
+    def to_dict(self):
+        return copy.deepcopy({field: getattr(self, field) for field in MatchState.fields})
+
+    @staticmethod
+    def from_dict(d):
+        return MatchState(**{field: copy.deepcopy(d.get(field)) for field in MatchState.fields})
+
+    def to_json(self):
+        return json.dumps(self.to_dict())
+
+    @staticmethod
+    def from_json(s):
+        return MatchState.from_dict(json.loads(s))
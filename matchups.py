@@ -0,0 +1,270 @@
+import weakref
+import numpy as np
+from game_tools import Match
+from phase_stats import over_phases
+
+
+def alias_tables(probs):
+    """
+    Builds Walker/Vose alias tables so one outcome can be drawn in O(1).
+
+    :param probs: array of shape (..., k), each row summing to 1
+    :return: (accept, alias) arrays of the same shape as probs
+    """
+    k = probs.shape[-1]
+    flat = probs.reshape(-1, k)
+    accept = np.ones(flat.shape)
+    alias = np.tile(np.arange(k), (len(flat), 1))
+
+    for row in range(len(flat)):
+        scaled = flat[row] * k
+        small = [i for i in range(k) if scaled[i] < 1.0]
+        large = [i for i in range(k) if scaled[i] >= 1.0]
+
+        while small and large:
+            s = small.pop()
+            l = large.pop()
+            accept[row, s] = scaled[s]
+            alias[row, s] = l
+            scaled[l] = scaled[l] + scaled[s] - 1.0
+            if scaled[l] < 1.0:
+                small.append(l)
+            else:
+                large.append(l)
+
+    return accept.reshape(probs.shape), alias.reshape(probs.shape)
+
+
+def ball_probabilities(bat_team, bowl_team, eps=1e-9, head_to_head=None, phase=None):
+    """
+    Combines batsman and bowler stats of every (batsman, bowler) pair into
+    ball outcome and dismissal distributions.
+
+    :param head_to_head: HeadToHead whose pair counts are blended in, None
+                         for the marginals alone
+    :param phase: phase of the innings whose stats are combined, teams
+                  without PhaseStats use their career stats in every phase
+
+    :return: probs of shape (batsmen, bowlers, len(Match.ball_choices)) and
+             dprobs of shape (batsmen, bowlers, len(Match.valid_dismissals))
+    """
+    if phase is not None and bat_team.phases is not None:
+        bat = [bat_team.phases.batting(phase, name) for name in bat_team.lineup]
+    else:
+        bat = [bat_team.players[name].batting_stats for name in bat_team.lineup]
+    if phase is not None and bowl_team.phases is not None:
+        bowl = [bowl_team.phases.bowling(phase, name) for name in bowl_team.bowler_list]
+    else:
+        bowl = [bowl_team.players[name].bowling_stats for name in bowl_team.bowler_list]
+
+    def column(stats, key):
+        return np.array([s[key] for s in stats], dtype=np.float64)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        balls_faced = column(bat, "Balls Faced")[:, None]
+        balls_bowled = column(bowl, "Balls Bowled")[None, :]
+
+        probs = np.zeros((len(bat), len(bowl), len(Match.ball_choices)))
+
+        # P(dot ball) = P(batsman play defensive) or P(bowler bowls difficult ball) - overlap
+        for i in range(7):
+            # Run probability
+            bat_prob = column(bat, i)[:, None] / balls_faced
+            bowl_prob = column(bowl, i)[None, :] / balls_bowled
+            probs[:, :, i] = bat_prob + bowl_prob - (bat_prob * bowl_prob)
+
+        # Dismissal probability
+        bat_prob = column(bat, "Dismissals")[:, None] / balls_faced
+        bowl_prob = column(bowl, "Wickets")[None, :] / balls_bowled
+        probs[:, :, 7] = bat_prob + bowl_prob - (bat_prob * bowl_prob)
+
+        # No Ball and Wide probability
+        probs[:, :, 8] = column(bowl, "No Balls")[None, :] / balls_bowled
+        probs[:, :, 9] = column(bowl, "Wides")[None, :] / balls_bowled
+
+        dismissals = column(bat, "Dismissals")[:, None]
+        wickets = column(bowl, "Wickets")[None, :]
+
+        dprobs = np.zeros((len(bat), len(bowl), len(Match.valid_dismissals)))
+        for i, d in enumerate(Match.valid_dismissals):
+            if d == "run out":
+                # Double because it relies on nonstriker's risk
+                dprobs[:, :, i] = (column(bat, d)[:, None] / dismissals) * 2
+            else:
+                bat_prob = column(bat, d)[:, None] / dismissals
+                bowl_prob = column(bowl, d)[None, :] / wickets
+                dprobs[:, :, i] = bat_prob + bowl_prob - (bat_prob * bowl_prob)
+
+    # Correction in case missing data, then normalization
+    probs += eps
+    probs /= probs.sum(axis=-1, keepdims=True)
+    dprobs += eps
+    dprobs /= dprobs.sum(axis=-1, keepdims=True)
+
+    if head_to_head is not None:
+        probs, dprobs = head_to_head.blend(probs, dprobs, bat_team.lineup, bowl_team.bowler_list)
+
+    return probs, dprobs
+
+
+def bowler_weights(team, weight_col="Wickets"):
+    """
+    :return: selection weight of every bowler in team.bowler_list
+    """
+    weights = np.ones(len(team.bowler_list))
+    if weight_col is not None:
+        for j, b in enumerate(team.bowler_list):
+            stats = team.players[b].bowling_stats
+            if stats["Matches"] > 0:
+                weights[j] = stats[weight_col] / stats["Matches"]
+            else:
+                weights[j] = 0
+    return weights
+
+
+def innings_phases(bat_team, bowl_team):
+    """
+    :return: PhaseStats of either team, None if neither has any
+    """
+    phases = bat_team.phases if bat_team.phases is not None else bowl_team.phases
+    if bat_team.phases is not None and bowl_team.phases is not None:
+        assert bat_team.phases.cuts == bowl_team.phases.cuts, "both teams need the same phase cut points"
+    return phases
+
+
+class Matchup:
+    """
+    Compiled probability tables of bat_team facing bowl_team. Batsmen are
+    addressed by lineup position and bowlers by bowler_list position.
+
+    Every table has a leading phase axis, one slice per phase of the innings
+    (a single one without PhaseStats), and over_phase maps each of the 20
+    overs to its slice.
+    """
+
+    def __init__(self, bat_team, bowl_team, eps=1e-9, head_to_head=None):
+        self.key = Matchup.key_for(bat_team, bowl_team, eps, head_to_head)
+
+        self.batsmen = list(bat_team.lineup)
+        self.bowlers = list(bowl_team.bowler_list)
+        self.bat_ids = {name: i for i, name in enumerate(self.batsmen)}
+        self.bowl_ids = {name: j for j, name in enumerate(self.bowlers)}
+
+        phases = innings_phases(bat_team, bowl_team)
+        if phases is None:
+            self.over_phase = over_phases(())
+            tables = [ball_probabilities(bat_team, bowl_team, eps, head_to_head)]
+        else:
+            self.over_phase = phases.over_phase
+            tables = [ball_probabilities(bat_team, bowl_team, eps, head_to_head, phase)
+                      for phase in range(len(phases))]
+        # One contiguous (phase, batsman, bowler, outcome) array each
+        self.probs = np.stack([probs for probs, dprobs in tables])
+        self.dprobs = np.stack([dprobs for probs, dprobs in tables])
+        self.weights = bowler_weights(bowl_team)
+        self.derive()
+
+    # Arrays that fully describe a compiled Matchup, see from_arrays
+    array_names = ("probs", "dprobs", "weights", "over_phase", "cdf", "dcdf",
+                   "accept", "alias", "daccept", "dalias")
+
+    @staticmethod
+    def from_arrays(bat_team, bowl_team, arrays, eps=1e-9, head_to_head=None):
+        """
+        Rebuilds a Matchup from saved arrays without recomputing anything.
+
+        :param arrays: dict with every name in Matchup.array_names
+        :param head_to_head: HeadToHead the arrays were compiled with, if any
+        """
+        matchup = Matchup.__new__(Matchup)
+        matchup.key = Matchup.key_for(bat_team, bowl_team, eps, head_to_head)
+        matchup.batsmen = list(bat_team.lineup)
+        matchup.bowlers = list(bowl_team.bowler_list)
+        matchup.bat_ids = {name: i for i, name in enumerate(matchup.batsmen)}
+        matchup.bowl_ids = {name: j for j, name in enumerate(matchup.bowlers)}
+        for name in Matchup.array_names:
+            setattr(matchup, name, arrays[name])
+        return matchup
+
+    def derive(self):
+        # CDFs for vectorized sampling
+        self.cdf = np.cumsum(self.probs, axis=-1)
+        self.cdf[..., -1] = 1.0
+        self.dcdf = np.cumsum(self.dprobs, axis=-1)
+        self.dcdf[..., -1] = 1.0
+
+        # Alias tables for O(1) scalar sampling
+        self.accept, self.alias = alias_tables(self.probs)
+        self.daccept, self.dalias = alias_tables(self.dprobs)
+
+    @staticmethod
+    def key_for(bat_team, bowl_team, eps=1e-9, head_to_head=None):
+        return (tuple(bat_team.lineup), tuple(bowl_team.bowler_list),
+                bat_team.stats_version, bowl_team.stats_version, eps,
+                None if head_to_head is None else head_to_head.key)
+
+    @staticmethod
+    def draw(accept, alias, u):
+        k = len(accept)
+        u *= k
+        i = int(u)
+        if i == k:
+            i -= 1
+        if u - i < accept[i]:
+            return i
+        return int(alias[i])
+
+    def sample(self, batsman, bowler, u, phase=0):
+        """
+        :param batsman: lineup position
+        :param bowler: bowler_list position
+        :param u: uniform random number in [0, 1)
+        :param phase: phase of the innings, over_phase of the current over
+        :return: index into Match.ball_choices
+        """
+        return Matchup.draw(self.accept[phase, batsman, bowler], self.alias[phase, batsman, bowler], u)
+
+    def sample_dismissal(self, batsman, bowler, u, phase=0):
+        """
+        :return: index into Match.valid_dismissals
+        """
+        return Matchup.draw(self.daccept[phase, batsman, bowler], self.dalias[phase, batsman, bowler], u)
+
+    def tables(self, phase=0):
+        """
+        :return: (table, dismissal_table) dicts of one phase keyed by (batsman, bowler) names
+        """
+        table = {}
+        dismissal_table = {}
+        for i, batsman in enumerate(self.batsmen):
+            for j, bowler in enumerate(self.bowlers):
+                table[(batsman, bowler)] = self.probs[phase, i, j]
+                dismissal_table[(batsman, bowler)] = self.dprobs[phase, i, j]
+        return table, dismissal_table
+
+
+_matchups = weakref.WeakKeyDictionary()
+
+
+def compile_matchup(bat_team, bowl_team, eps=1e-9, head_to_head=None):
+    """
+    Returns the compiled Matchup of bat_team facing bowl_team, rebuilding it
+    only when either lineup, bowler list, the underlying stats or the
+    head to head blend changed.
+    """
+    by_bowl_team = _matchups.setdefault(bat_team, weakref.WeakKeyDictionary())
+    matchup = by_bowl_team.get(bowl_team)
+
+    if matchup is None or matchup.key != Matchup.key_for(bat_team, bowl_team, eps, head_to_head):
+        matchup = Matchup(bat_team, bowl_team, eps, head_to_head)
+        by_bowl_team[bowl_team] = matchup
+
+    return matchup
+
+
+def seed_matchup(bat_team, bowl_team, matchup):
+    """
+    Puts an already compiled Matchup, e.g. from a team bundle, in the
+    compile_matchup cache.
+    """
+    _matchups.setdefault(bat_team, weakref.WeakKeyDictionary())[bowl_team] = matchup
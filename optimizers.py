@@ -0,0 +1,204 @@
+import math
+import numpy as np
+from aggregate import wilson_interval
+from dp_engine import InningsDP, chase_probabilities, default_plan, innings_distribution
+from matchups import compile_matchup
+from rng import MatchStreams
+from simulators import BatchSimulator
+
+
+class BattingOrderOptimizer:
+    """
+    Searches batting orders of team.lineup against an opponent with
+    successive halving: every round plays all surviving orders on the same
+    random numbers (common random numbers) and keeps the better half.
+    """
+
+    def __init__(self, team, opponent, budget=200_000, candidates=64, seed=0, orders=None):
+        """
+        :param team: Team whose batting order is searched
+        :param opponent: opposing Team
+        :param budget: total number of simulated matches
+        :param candidates: number of orders to start from, the current
+                           lineup plus random permutations
+        :param seed: seed of the common random numbers
+        :param orders: explicit starting orders (lists of lineup names)
+        """
+        self.team = team
+        self.opponent = opponent
+        self.budget = budget
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+
+        if orders is None:
+            orders = [list(team.lineup)]
+            seen = {tuple(team.lineup)}
+            while len(orders) < candidates:
+                order = [team.lineup[i] for i in self.rng.permutation(11)]
+                if tuple(order) not in seen:
+                    seen.add(tuple(order))
+                    orders.append(order)
+        self.orders = orders
+
+    def evaluate(self, orders, n, stage=0):
+        """
+        Plays n matches for each order with the same random numbers: match i
+        draws from its own (seed, stage, i) stream under every order, so
+        orders losing wickets at different times still share the rest of it.
+
+        :param stage: round of the search, every round plays fresh matches
+        :return: array of wins per order
+        """
+        matchup = compile_matchup(self.team, self.opponent)
+        against = compile_matchup(self.opponent, self.team)
+        setup_against = (against.cdf, against.dcdf, against.weights, against.over_phase)
+
+        wins = np.zeros(len(orders), dtype=np.int64)
+        for k, order in enumerate(orders):
+            # Rows of the compiled tables re-ordered, nothing is recomputed
+            rows = [matchup.bat_ids[name] for name in order]
+            setup = (matchup.cdf[:, rows], matchup.dcdf[:, rows], matchup.weights, matchup.over_phase)
+
+            _, innings, opp_innings = BatchSimulator.play_batch(setup, setup_against, n,
+                                                                MatchStreams.for_range(self.seed, 0, n, stage))
+            wins[k] = int((innings.runs > opp_innings.runs).sum())
+        return wins
+
+    def optimize(self, top=5):
+        """
+        :return: up to top (order, win_rate, low, high) tuples, best first
+        """
+        alive = list(range(len(self.orders)))
+        wins = np.zeros(len(self.orders), dtype=np.int64)
+        played = np.zeros(len(self.orders), dtype=np.int64)
+
+        rounds = max(1, math.ceil(math.log2(len(self.orders))))
+        for r in range(rounds):
+            n = max(1, self.budget // (rounds * len(alive)))
+            round_wins = self.evaluate([self.orders[i] for i in alive], n, stage=r)
+            wins[alive] += round_wins
+            played[alive] += n
+
+            if len(alive) > 1:
+                rates = wins[alive] / played[alive]
+                alive = [alive[i] for i in np.argsort(-rates, kind="stable")[:max(1, len(alive) // 2)]]
+
+        ranked = sorted(range(len(self.orders)), key=lambda i: (-played[i], -wins[i] / max(played[i], 1)))
+        best = []
+        for i in ranked[:top]:
+            low, high = wilson_interval(wins[i], played[i])
+            best.append((self.orders[i], wins[i] / played[i], low, high))
+        return best
+
+
+class BowlingPlanOptimizer:
+    """
+    Local search over the 20 over allocation of team.bowler_list, keeping the
+    4 over cap and the no consecutive overs rule. Plans are scored exactly by
+    the dynamic programming innings engine, so the budget counts plan
+    evaluations; each one replays only the overs from the first changed one.
+    """
+
+    objectives = ("runs", "win")
+
+    def __init__(self, team, opponent, objective="runs", innings=1, budget=200,
+                 seed=0, opponent_plan=None, max_runs=300):
+        """
+        :param team: bowling Team whose plan is searched
+        :param opponent: batting Team
+        :param objective: "runs" to minimize the opponent's expected total,
+                          "win" to maximize team's win probability
+        :param innings: innings in which team bowls, for the "win" objective
+        :param budget: number of plan evaluations
+        :param opponent_plan: plan of the opponent's bowlers when team bats,
+                              default_plan if None
+        """
+        assert objective in BowlingPlanOptimizer.objectives
+        assert innings == 1 or innings == 2
+        assert len(team.bowler_list) >= 5, "20 overs need at least 5 bowlers"
+        self.team = team
+        self.opponent = opponent
+        self.objective = objective
+        self.innings = innings
+        self.budget = budget
+        self.rng = np.random.default_rng(seed)
+        self.n_bowlers = len(team.bowler_list)
+
+        matchup = compile_matchup(opponent, team)
+        self.weights = matchup.weights
+        self.engine = InningsDP(matchup.probs, max_runs, over_phase=matchup.over_phase)
+
+        if objective == "win":
+            # Team's own innings does not depend on the plan
+            self.batting = innings_distribution(team, opponent, opponent_plan, max_runs=max_runs)
+
+    @staticmethod
+    def valid(plan, n_bowlers):
+        counts = np.bincount(plan, minlength=n_bowlers)
+        return counts.max() <= 4 and all(plan[i] != plan[i + 1] for i in range(len(plan) - 1))
+
+    def score(self, distribution):
+        """
+        :return: objective value of the opponent's score distribution, lower is better
+        """
+        if self.objective == "runs":
+            return float(np.dot(distribution, np.arange(len(distribution))))
+        if self.innings == 1:
+            chase, tie, defend = chase_probabilities(distribution, self.batting)
+            return -chase
+        chase, tie, defend = chase_probabilities(self.batting, distribution)
+        return -defend
+
+    def evaluate(self, plan, start=0, checkpoints=None):
+        """
+        :param checkpoints: states before every over of a plan sharing plan[:start]
+        :return: (score, checkpoints of plan)
+        """
+        state = None
+        kept = []
+        if start > 0:
+            kept = checkpoints[:start]
+            state = checkpoints[start]
+        distribution = self.engine.score_distribution(plan, start, state, kept)
+        return self.score(distribution), kept
+
+    def neighbour(self, plan):
+        """
+        :return: (plan with one over reassigned or two overs swapped, first changed over)
+        """
+        counts = np.bincount(plan, minlength=self.n_bowlers)
+        while True:
+            candidate = list(plan)
+            i = int(self.rng.integers(20))
+            if self.rng.random() < 0.5:
+                j = int(self.rng.integers(20))
+                candidate[i], candidate[j] = candidate[j], candidate[i]
+                first = min(i, j)
+            else:
+                free = [b for b in range(self.n_bowlers) if counts[b] < 4 and b != plan[i]]
+                if not free:
+                    continue
+                candidate[i] = free[int(self.rng.integers(len(free)))]
+                first = i
+            if candidate != plan and BowlingPlanOptimizer.valid(candidate, self.n_bowlers):
+                return candidate, first
+
+    def optimize(self, plan=None):
+        """
+        :param plan: starting plan of bowler_list positions, default_plan if None
+        :return: (best plan as bowler names, its objective value), the value being
+                 expected runs conceded or win probability
+        """
+        if plan is None:
+            plan = default_plan(self.team, self.weights)
+        assert BowlingPlanOptimizer.valid(plan, self.n_bowlers)
+
+        best, checkpoints = self.evaluate(plan)
+        for i in range(self.budget - 1):
+            candidate, first = self.neighbour(plan)
+            score, candidate_checkpoints = self.evaluate(candidate, first, checkpoints)
+            if score <= best:
+                plan, best, checkpoints = candidate, score, candidate_checkpoints
+
+        value = best if self.objective == "runs" else -best
+        return [self.team.bowler_list[b] for b in plan], value
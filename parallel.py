@@ -0,0 +1,229 @@
+import hashlib
+import json
+import os
+import weakref
+from collections import OrderedDict
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from aggregate import OutcomeAggregator
+from rng import MatchStreams
+from simulators import BatchSimulator, BatchResult, InningsBatch
+
+
+class SharedTables:
+    """
+    Packs the compiled tables of a fixture into one shared memory block so
+    worker processes attach to them instead of receiving pickled copies.
+    """
+
+    def __init__(self, arrays):
+        self.spec = []
+        offset = 0
+        for arr in arrays:
+            arr = np.ascontiguousarray(arr)
+            self.spec.append((arr.shape, arr.dtype.str, offset))
+            # 64 byte alignment keeps every view aligned
+            offset += -(-arr.nbytes // 64) * 64
+
+        self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        self.name = self.shm.name
+
+        for arr, view in zip(arrays, SharedTables.views(self.shm, self.spec)):
+            view[...] = arr
+
+    @staticmethod
+    def views(shm, spec):
+        return [np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf, offset=offset)
+                for shape, dtype, offset in spec]
+
+    @staticmethod
+    def attach(name, spec):
+        # Workers share the parent's resource tracker, which unlinks the block once
+        shm = shared_memory.SharedMemory(name=name)
+        return shm, SharedTables.views(shm, spec)
+
+    def release(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
+# Per worker process state: tables attached so far, least recently used first
+_attached = OrderedDict()
+_MAX_ATTACHED = 64
+
+
+def _setups(arrays):
+    half = len(arrays) // 2
+    return tuple(arrays[:half]), tuple(arrays[half:])
+
+
+def _attach(name, spec):
+    """
+    :return: setups of the fixture packed in the named block, attached once per worker
+    """
+    if name in _attached:
+        _attached.move_to_end(name)
+    else:
+        _attached[name] = SharedTables.attach(name, spec)
+        while len(_attached) > _MAX_ATTACHED:
+            shm, arrays = _attached.popitem(last=False)[1]
+            # The views must go before the block can close
+            del arrays
+            shm.close()
+    return _setups(_attached[name][1])
+
+
+def fixture_ids(fixtures):
+    """
+    Stream ids of the fixtures of a campaign, from the team names and the
+    number of earlier fixtures between the same pair, so reordering or
+    subsetting a campaign leaves the matches of every fixture unchanged.
+
+    :return: one integer per fixture
+    """
+    seen = {}
+    ids = []
+    for team_1, team_2 in fixtures:
+        pair = (team_1.name, team_2.name)
+        digest = hashlib.sha256(json.dumps([*pair, seen.get(pair, 0)]).encode()).digest()
+        ids.append(int.from_bytes(digest[:8], "little"))
+        seen[pair] = seen.get(pair, 0) + 1
+    return ids
+
+
+def _chunk_streams(seed, fixture, start, size):
+    # Every match draws from its own (seed, fixture id, match index) stream, whichever worker plays it
+    return MatchStreams.for_range(seed, start, size, fixture)
+
+
+def _run_chunk(table, fixture, start, size, seed):
+    setup_1, setup_2 = _attach(*table)
+    return BatchSimulator.play_batch(setup_1, setup_2, size, _chunk_streams(seed, fixture, start, size))
+
+
+class ParallelRunner:
+    """
+    Fans batches of matches of one or more fixtures out over a process pool.
+
+    Matches are split into chunks and merged back in order. Every match draws
+    from its own counter-based stream, so results for a given seed are
+    identical for any number of workers and any chunk size.
+
+    The pool and the shared tables of every fixture are kept between calls,
+    call close() (or use the runner as a context manager) to release them.
+    """
+
+    def __init__(self, workers=None, chunk_size=1000, executor=None, head_to_head=None):
+        """
+        :param executor: process pool to run chunks on, left running by close();
+                         one is started on first use when None
+        :param head_to_head: HeadToHead blended into the compiled tables, if any
+        """
+        self.workers = workers if workers is not None else os.cpu_count()
+        self.chunk_size = chunk_size
+        self.head_to_head = head_to_head
+        self.executor = executor
+        self.owns_executor = executor is None
+
+        # Fixture id -> (arrays packed, SharedTables), reused while the compiled tables are unchanged
+        self.tables = {}
+        self.finalizer = weakref.finalize(self, ParallelRunner.release, self.tables)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if self.owns_executor and self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        ParallelRunner.release(self.tables)
+
+    @staticmethod
+    def release(tables):
+        for arrays, shared in tables.values():
+            shared.release()
+        tables.clear()
+
+    def pool(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self.executor
+
+    def shared(self, fixture, setup_1, setup_2):
+        """
+        :return: SharedTables of the fixture, packed again only when its compiled tables changed
+        """
+        arrays = list(setup_1) + list(setup_2)
+        cached = self.tables.get(fixture)
+        if cached is not None and all(a is b for a, b in zip(cached[0], arrays)):
+            return cached[1]
+
+        if cached is not None:
+            cached[1].release()
+        tables = SharedTables(arrays)
+        self.tables[fixture] = (arrays, tables)
+        return tables
+
+    def chunks(self, n, start=0):
+        """
+        :return: (first match index, size) of every chunk
+        """
+        return [(start + offset, min(self.chunk_size, n - offset)) for offset in range(0, n, self.chunk_size)]
+
+    def run(self, team_1, team_2, n, seed=0):
+        """
+        :return: BatchResult of n matches between team_1 and team_2
+        """
+        return self.run_campaign([(team_1, team_2)], n, seed)[0]
+
+    def aggregate(self, team_1, team_2, n, seed=0, cache=None):
+        """
+        :param cache: ResultCache consulted first, only matches it lacks are played
+        :return: OutcomeAggregator of n matches between team_1 and team_2
+        """
+        def play(done, count):
+            aggregator = OutcomeAggregator(team_1.name, team_2.name)
+            aggregator.add_batch(self.run_campaign([(team_1, team_2)], count, seed, start=done)[0])
+            return aggregator
+
+        if cache is None:
+            return play(0, n)
+        return cache.aggregate(team_1, team_2, n, {"engine": "batch", "seed": seed}, play, self.head_to_head)
+
+    def run_campaign(self, fixtures, n, seed=0, start=0):
+        """
+        :param fixtures: list of (team_1, team_2) pairs
+        :param n: number of matches per fixture
+        :param seed: campaign seed
+        :param start: index of the first match, to continue a campaign
+        :return: list of BatchResult, one per fixture
+        """
+        setups = [BatchSimulator(team_1, team_2, head_to_head=self.head_to_head).setups()
+                  for team_1, team_2 in fixtures]
+        ids = fixture_ids(fixtures)
+        chunks = self.chunks(n, start)
+
+        if self.workers <= 1:
+            parts = [[BatchSimulator.play_batch(*setup, size, _chunk_streams(seed, fixture, first, size))
+                      for first, size in chunks]
+                     for fixture, setup in zip(ids, setups)]
+        else:
+            pool = self.pool()
+            tables = [self.shared(fixture, *setup) for fixture, setup in zip(ids, setups)]
+            futures = [[pool.submit(_run_chunk, (t.name, t.spec), fixture, first, size, seed)
+                        for first, size in chunks]
+                       for fixture, t in zip(ids, tables)]
+            parts = [[future.result() for future in chunk_futures] for chunk_futures in futures]
+
+        results = []
+        for (team_1, team_2), fixture_parts in zip(fixtures, parts):
+            team_1_bats_first = np.concatenate([p[0] for p in fixture_parts])
+            innings = {team_1: InningsBatch.concatenate([p[1] for p in fixture_parts]),
+                       team_2: InningsBatch.concatenate([p[2] for p in fixture_parts])}
+            results.append(BatchResult(team_1, team_2, team_1_bats_first, innings))
+
+        return results
@@ -0,0 +1,153 @@
+import json
+import os
+import numpy as np
+from stats_cache import load_or_rebuild, load_stats
+from stats_store import PlayerStatsStore, StatsTable, shrink_table
+
+
+# Bump whenever the layout of the saved phase tables changes
+PHASE_VERSION = 1
+
+# Last over of the powerplay and of the middle overs, the death overs follow
+DEFAULT_CUTS = (6, 15)
+OVERS = 20
+
+# Columns that are not counts per ball, kept as they are when shrinking
+_RATE_COLUMNS = ("Name", "Innings", "Matches", "Average", "Strike Rate", "Economy")
+
+
+def check_cuts(cuts):
+    """
+    :param cuts: last over (1 based) of every phase but the last
+    :return: cuts as a tuple of ints, strictly increasing within 1..19
+    """
+    cuts = tuple(int(c) for c in cuts)
+    assert all(a < b for a, b in zip((0,) + cuts, cuts + (OVERS,))), \
+        f"cut points {cuts} must increase within 1..{OVERS - 1}"
+    return cuts
+
+
+def phase_of(overs, cuts=DEFAULT_CUTS):
+    """
+    :param overs: over numbers, 1 based as in deliveries.csv
+    :return: phase of every over, 0 for the first
+    """
+    return np.searchsorted(np.asarray(cuts, dtype=np.int64), overs, side="left")
+
+
+def over_phases(cuts=DEFAULT_CUTS):
+    """
+    :return: phase of each of the 20 overs, indexed from 0 like balls // 6
+    """
+    return phase_of(np.arange(1, OVERS + 1), cuts).astype(np.int8)
+
+
+class PhaseStats:
+    """
+    Player stats of every phase of an innings, e.g. powerplay, middle and
+    death overs, as one PlayerStatsStore per phase. Compiled matchups of
+    teams holding them get a ball distribution per phase.
+    """
+
+    def __init__(self, cuts, stores):
+        """
+        :param cuts: last over of every phase but the last, see check_cuts
+        :param stores: PlayerStatsStore of every phase, len(cuts) + 1 of them
+        """
+        self.cuts = check_cuts(cuts)
+        assert len(stores) == len(self.cuts) + 1
+        self.stores = stores
+        self.over_phase = over_phases(self.cuts)
+
+    def __len__(self):
+        return len(self.stores)
+
+    def batting(self, phase, player):
+        return self.stores[phase].batting(player)
+
+    def bowling(self, phase, player):
+        return self.stores[phase].bowling(player)
+
+    @staticmethod
+    def shrunk(career, phases, cuts, strength=60.0):
+        """
+        :param career: PlayerStatsStore over all overs
+        :param phases: PlayerStatsStore of every phase, e.g. from build_phase_stats
+        :param strength: prior weight of the career rates, in balls, 0 for the raw phase counts
+        """
+        return PhaseStats(cuts, [PlayerStatsStore(shrink_table(p.batting_table, career.batting_table,
+                                                               "Balls Faced", strength, _RATE_COLUMNS),
+                                                  shrink_table(p.bowling_table, career.bowling_table,
+                                                               "Balls Bowled", strength, _RATE_COLUMNS))
+                                 for p in phases])
+
+    def save(self, path, sources=None):
+        """
+        :param sources: dict of source name to fingerprint, kept in the metadata
+        """
+        arrays = {}
+        meta = {"version": PHASE_VERSION, "cuts": self.cuts, "sources": sources or {}, "keys": []}
+        for p, store in enumerate(self.stores):
+            keys = {}
+            for table_name, table in (("batting", store.batting_table), ("bowling", store.bowling_table)):
+                for i, (key, values) in enumerate(table.columns.items()):
+                    arrays[f"phase_{p}_{table_name}_{i:03d}"] = np.ascontiguousarray(values)
+                # JSON keys are strings, run columns are ints
+                keys[table_name] = [{"key": key, "key_type": type(key).__name__} for key in table.columns]
+            meta["keys"].append(keys)
+
+        arrays["meta"] = np.array(json.dumps(meta))
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, **arrays)
+        os.replace(tmp, path)
+
+    @staticmethod
+    def read_meta(path):
+        try:
+            with np.load(path) as data:
+                return json.loads(data["meta"].item())
+        except (OSError, ValueError, KeyError):
+            return None
+
+    @staticmethod
+    def load(path):
+        with np.load(path) as data:
+            meta = json.loads(data["meta"].item())
+            stores = []
+            for p, keys in enumerate(meta["keys"]):
+                tables = []
+                for table_name in ("batting", "bowling"):
+                    columns = {}
+                    for i, column in enumerate(keys[table_name]):
+                        key = int(column["key"]) if column["key_type"] == "int" else column["key"]
+                        columns[key] = data[f"phase_{p}_{table_name}_{i:03d}"]
+                    tables.append(StatsTable(columns["Name"].tolist(), columns))
+                stores.append(PlayerStatsStore(*tables))
+        return PhaseStats(meta["cuts"], stores)
+
+
+def load_phase_stats(deliveries_path="data/deliveries.csv", cache_dir="stats_cache", cuts=DEFAULT_CUTS,
+                     strength=60.0):
+    """
+    Loads the raw phase counts for cuts from cache_dir, rebuilding them when
+    missing or built from a different deliveries file, and shrinks them
+    towards the career stats.
+
+    :return: PhaseStats
+    """
+    cuts = check_cuts(cuts)
+    path = os.path.join(cache_dir, "phase_stats_" + "_".join(map(str, cuts)) + ".npz")
+
+    def build():
+        # Only pay for pandas when the tables have to be rebuilt
+        import pandas as pd
+        from ingest import delivery_dtypes
+        from stats_builder import build_phase_stats
+
+        deliveries_df = pd.read_csv(deliveries_path, usecols=list(delivery_dtypes), dtype=delivery_dtypes)
+        return PhaseStats(cuts, [PlayerStatsStore.from_frames(batsmen_df, bowlers_df)
+                                 for batsmen_df, bowlers_df in build_phase_stats(deliveries_df, cuts)])
+
+    raw = load_or_rebuild(path, {"deliveries": deliveries_path}, PHASE_VERSION, PhaseStats.read_meta,
+                          PhaseStats.load, build)
+    return PhaseStats.shrunk(load_stats(deliveries_path, cache_dir), raw.stores, cuts, strength)
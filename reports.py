@@ -0,0 +1,97 @@
+import gzip
+import io
+import os
+import tarfile
+import time
+import zipfile
+
+
+class ReportSink:
+    """
+    Writes many match reports to one output directory or archive.
+
+    The destination is listed once when the sink is opened; free file names are
+    then handed out from memory with the same Match_<id>_<team>_vs_<team>.txt
+    scheme as Match.write_to_file.
+    """
+
+    archive_formats = ("tar.gz", "zip", "gz")
+
+    def __init__(self, prefix, archive=None, archive_name="reports", buffer_size=1 << 16):
+        """
+        :param prefix: output directory
+        :param archive: None to write one file per report, or one of
+                        ReportSink.archive_formats to append every report to a
+                        single compressed archive in prefix
+        :param archive_name: archive file name, without extension
+        """
+        assert archive is None or archive in ReportSink.archive_formats
+        self.prefix = prefix
+        self.archive = archive
+        self.buffer_size = buffer_size
+        self.handle = None
+        self.written = 0
+
+        os.makedirs(prefix, exist_ok=True)
+
+        if archive is None:
+            self.taken = set(os.listdir(prefix))
+        else:
+            self.path = os.path.join(prefix, f"{archive_name}.{archive}")
+            self.taken = set()
+            if archive == "zip":
+                self.handle = zipfile.ZipFile(self.path, "a", compression=zipfile.ZIP_DEFLATED)
+                self.taken = set(self.handle.namelist())
+            elif archive == "tar.gz":
+                # Compressed tars cannot be appended to, each sink starts a new one
+                self.handle = tarfile.open(self.path, "w:gz")
+            else:
+                self.handle = gzip.open(self.path, "at", encoding="utf-8")
+
+    def file_name(self, match):
+        i = 0
+        filename = match.file_name()
+        while filename in self.taken:
+            i += 1
+            filename = match.file_name(i)
+        self.taken.add(filename)
+        return filename
+
+    def write(self, match, deliveries):
+        """
+        Renders match and writes it out.
+
+        :return: file name (or archive member name) of the report
+        """
+        filename = self.file_name(match)
+        text = match.render(deliveries)
+
+        if self.archive is None:
+            with open(os.path.join(self.prefix, filename), "w", buffering=self.buffer_size) as f:
+                f.write(text)
+        elif self.archive == "zip":
+            self.handle.writestr(filename, text)
+        elif self.archive == "tar.gz":
+            data = text.encode("utf-8")
+            info = tarfile.TarInfo(filename)
+            info.size = len(data)
+            info.mtime = time.time()
+            self.handle.addfile(info, io.BytesIO(data))
+        else:
+            # One stream, reports are separated by their file name header
+            self.handle.write(f"=== {filename}\n")
+            self.handle.write(text)
+
+        self.written += 1
+        return filename
+
+    def close(self):
+        if self.handle is not None:
+            self.handle.close()
+            self.handle = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
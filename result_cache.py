@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import numpy as np
+from aggregate import OutcomeAggregator
+from matchups import compile_matchup
+
+
+# Bump whenever the key contents or the stored layout change
+CACHE_VERSION = 2
+
+
+def fixture_key(team_1, team_2, settings, head_to_head=None):
+    """
+    Content hash of everything that decides a seeded simulation: both teams'
+    lineups, captains, keepers and bowler lists, the compiled probabilities
+    they play with (so any change in the stats snapshot shows up), and the
+    simulator settings, which must include the seed.
+
+    :param settings: JSON serializable dict, e.g. engine, seed and start
+    :param head_to_head: HeadToHead the simulation blends in, if any
+    """
+    sha = hashlib.sha256()
+    sha.update(json.dumps({"version": CACHE_VERSION, "settings": settings}, sort_keys=True).encode())
+    for team in (team_1, team_2):
+        sha.update(json.dumps([team.name, list(team.lineup), team.captain, team.wk,
+                               list(team.bowler_list)]).encode())
+    for bat_team, bowl_team in ((team_1, team_2), (team_2, team_1)):
+        matchup = compile_matchup(bat_team, bowl_team, head_to_head=head_to_head)
+        for arr in (matchup.probs, matchup.dprobs, matchup.weights, matchup.over_phase):
+            sha.update(np.ascontiguousarray(arr, dtype=np.float64).tobytes())
+    return sha.hexdigest()[:32]
+
+
+class ResultCache:
+    """
+    Aggregated outcomes of seeded runs on disk, one compressed .npz per key,
+    evicted least recently used first once the directory passes max_bytes.
+
+    An entry holds the first matches of a campaign as consecutive segments,
+    one per run that played them. Asking for n matches merges the segments
+    ending at or before n and plays only the rest, which gives the same
+    counts as one run of all of them since every match has its own stream.
+    Runs that extend the entry add a segment to it.
+    """
+
+    def __init__(self, folder="stats_cache/results", max_bytes=256 * 2 ** 20):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        os.makedirs(folder, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.folder, key + ".npz")
+
+    def get(self, key):
+        """
+        :return: list of OutcomeAggregator segments in match order, None on a miss
+        """
+        path = self.path(key)
+        try:
+            with np.load(path) as data:
+                meta = json.loads(data["meta"].item())
+                segments = []
+                for i, segment in enumerate(meta["segments"]):
+                    prefix = f"s{i:03d}_"
+                    arrays = {name[len(prefix):]: data[name] for name in data.files if name.startswith(prefix)}
+                    segments.append(OutcomeAggregator.from_arrays(arrays, segment))
+        except (OSError, ValueError, KeyError):
+            return None
+        # Modification time doubles as the last use for eviction
+        os.utime(path)
+        return segments
+
+    def put(self, key, segments):
+        """
+        :param segments: OutcomeAggregators of consecutive runs, in match order
+        """
+        arrays = {}
+        meta = {"segments": []}
+        for i, segment in enumerate(segments):
+            segment_arrays, segment_meta = segment.arrays()
+            arrays.update({f"s{i:03d}_{name}": values for name, values in segment_arrays.items()})
+            meta["segments"].append(segment_meta)
+
+        path = self.path(key)
+        tmp = path + ".tmp.npz"
+        np.savez_compressed(tmp, meta=np.array(json.dumps(meta)), **arrays)
+        os.replace(tmp, path)
+        self.evict()
+
+    def evict(self):
+        entries = []
+        for entry in os.scandir(self.folder):
+            if entry.name.endswith(".npz") and not entry.name.endswith(".tmp.npz"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def aggregate(self, team_1, team_2, n, settings, play, head_to_head=None):
+        """
+        :param settings: simulator settings for fixture_key, with the seed
+        :param play: play(done, count) returning an OutcomeAggregator of count
+                     matches, starting after the first done of the campaign
+        :param head_to_head: HeadToHead the simulation blends in, if any
+        :return: OutcomeAggregator of exactly the first n matches, empty for n = 0
+        """
+        assert n >= 0, "n must not be negative"
+        if n == 0:
+            return OutcomeAggregator(team_1.name, team_2.name)
+
+        key = fixture_key(team_1, team_2, settings, head_to_head)
+        segments = self.get(key) or []
+
+        used = []
+        done = 0
+        for segment in segments:
+            if done + segment.n > n:
+                break
+            used.append(segment)
+            done += segment.n
+
+        if done < n:
+            extra = play(done, n - done)
+            if len(used) == len(segments):
+                # Only runs past the end extend the entry
+                self.put(key, segments + [extra])
+            used.append(extra)
+
+        first = used[0]
+        result = OutcomeAggregator(*first.teams, max_score=first.max_score, max_player_runs=first.max_player_runs)
+        for segment in used:
+            result.merge(segment)
+        return result
@@ -0,0 +1,153 @@
+import numpy as np
+
+
+# Philox4x32 multipliers and Weyl key increments (Salmon et al., Random123)
+PHILOX_M = (0xD2511F53, 0xCD9E8D57)
+PHILOX_W = (0x9E3779B9, 0xBB67AE85)
+PHILOX_ROUNDS = 10
+MASK_32 = np.uint64(0xFFFFFFFF)
+
+# Counter lanes of a match: the toss, then each innings
+TOSS_LANE = 0
+
+
+def stream_key(seed, *path):
+    """
+    :return: two 32 bit key words for a campaign seed and e.g. a fixture index
+    """
+    return [int(w) for w in np.random.SeedSequence([seed, *path]).generate_state(2)]
+
+
+def philox4x32(counter, key, rounds=PHILOX_ROUNDS):
+    """
+    Vectorized Philox4x32 block function.
+
+    :param counter: four arrays (or ints) of 32 bit counter words
+    :param key: two 32 bit key words
+    :return: four uint64 arrays holding the 32 bit output words
+    """
+    c0, c1, c2, c3 = (np.asarray(c, dtype=np.uint64) & MASK_32 for c in counter)
+    k0, k1 = int(key[0]) & 0xFFFFFFFF, int(key[1]) & 0xFFFFFFFF
+    m0, m1 = np.uint64(PHILOX_M[0]), np.uint64(PHILOX_M[1])
+    shift = np.uint64(32)
+
+    for r in range(rounds):
+        p0 = m0 * c0
+        p1 = m1 * c2
+        c0, c1, c2, c3 = ((p1 >> shift) ^ c1 ^ np.uint64(k0), p1 & MASK_32,
+                          (p0 >> shift) ^ c3 ^ np.uint64(k1), p0 & MASK_32)
+        k0 = (k0 + PHILOX_W[0]) & 0xFFFFFFFF
+        k1 = (k1 + PHILOX_W[1]) & 0xFFFFFFFF
+
+    return c0, c1, c2, c3
+
+
+def to_unit(hi, lo):
+    """
+    :return: doubles in [0, 1) from 53 bits of two 32 bit words
+    """
+    return ((hi >> np.uint64(5)) * 67108864 + (lo >> np.uint64(6))) / 9007199254740992.0
+
+
+class MatchStreams:
+    """
+    Counter-based random numbers for a set of matches of one campaign.
+
+    Every number is a pure function of (key, match index, lane, draw), so a
+    match gets the same numbers whichever batch, chunk or worker plays it,
+    and can be replayed alone. Lanes separate the toss from each innings.
+    """
+
+    def __init__(self, key, matches):
+        """
+        :param key: stream_key of the campaign (and fixture)
+        :param matches: global match index of every row
+        """
+        self.key = key
+        self.matches = np.asarray(matches, dtype=np.uint64)
+
+    @staticmethod
+    def for_range(seed, start, n, *path):
+        return MatchStreams(stream_key(seed, *path), np.arange(start, start + n))
+
+    def lane(self, lane, rows=None):
+        """
+        :param rows: subset of rows, e.g. the matches of one innings batch
+        :return: LaneStream of the given rows
+        """
+        matches = self.matches if rows is None else self.matches[rows]
+        return LaneStream(self.key, matches, lane)
+
+    def random(self, size=None):
+        """
+        Toss draws, one per match.
+        """
+        assert size is None or size == len(self.matches)
+        return self.lane(TOSS_LANE).random(np.arange(len(self.matches)))
+
+
+class LaneStream:
+    """
+    Per row draw counters of one lane. Each draw of a row consumes one Philox
+    block, i.e. two uniforms, and advances only that row's counter.
+    """
+
+    def __init__(self, key, matches, lane):
+        self.key = key
+        self.match_lo = matches & MASK_32
+        self.match_hi = matches >> np.uint64(32)
+        self.lane = lane
+        self.counter = np.zeros(len(matches), dtype=np.uint64)
+
+    def random2(self, rows):
+        """
+        :param rows: row indices, each drawn once
+        :return: two arrays of uniforms for rows
+        """
+        x0, x1, x2, x3 = philox4x32((self.counter[rows], self.lane,
+                                     self.match_lo[rows], self.match_hi[rows]), self.key)
+        self.counter[rows] += np.uint64(1)
+        return to_unit(x0, x1), to_unit(x2, x3)
+
+    def random(self, rows):
+        return self.random2(rows)[0]
+
+    def advance(self, rows, draws):
+        """
+        Jumps rows ahead by a number of draws without generating them.
+        """
+        self.counter[rows] += np.uint64(draws)
+
+
+class MatchRandom:
+    """
+    Uniforms of one match for the scalar simulators, drawn in blocks from a
+    Philox generator keyed by (campaign seed, match index).
+
+    Block k starts at Philox counter k * block / 4, so any position can be
+    reached directly (seek) without drawing what comes before it.
+    """
+
+    def __init__(self, seed, match_index, block=256):
+        assert block % 4 == 0
+        self.key = int(seed) << 64 | int(match_index)
+        self.block = block
+
+    def uniforms(self, start=0):
+        """
+        :param start: index of the first uniform, to jump ahead
+        :return: iterator over the match's uniforms
+        """
+        k, offset = divmod(start, self.block)
+        while True:
+            # Philox4x64 yields 4 doubles per counter step
+            gen = np.random.Generator(np.random.Philox(key=self.key, counter=k * self.block // 4))
+            yield from gen.random(self.block).tolist()[offset:]
+            k += 1
+            offset = 0
+
+    def stream(self, start=0):
+        """
+        :return: zero argument callable drawing the next uniform, like random.random
+        """
+        return self.uniforms(start).__next__
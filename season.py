@@ -0,0 +1,294 @@
+import csv
+import numpy as np
+from game_tools import Team
+from parallel import ParallelRunner
+from rng import MatchStreams, stream_key
+from simulators import BatchSimulator
+
+
+# Playoff matches at the end of each season, 4 (Qualifier 1, Eliminator,
+# Qualifier 2, Final) from 2011 on
+playoff_matches = {2008: 3, 2009: 3, 2010: 4}
+
+# Stream keys of the standings tie break and the playoff stages, apart from fixture indices
+TIEBREAK_STREAM = 1 << 20
+PLAYOFF_STREAMS = {"Qualifier 1": TIEBREAK_STREAM + 1, "Eliminator": TIEBREAK_STREAM + 2,
+                   "Qualifier 2": TIEBREAK_STREAM + 3, "Final": TIEBREAK_STREAM + 4}
+
+
+def season_fixtures(season, matches_path="data/matches.csv"):
+    """
+    :param season: year of the season
+    :return: (league fixtures as (team1, team2) names in date order, match ids of the season)
+    """
+    with open(matches_path, newline="") as f:
+        rows = [row for row in csv.DictReader(f) if int(row["season"]) == season]
+    assert rows, f"no matches for season {season} in {matches_path}"
+
+    rows.sort(key=lambda row: (row["date"], int(row["id"])))
+    league = rows[:len(rows) - playoff_matches.get(season, 4)]
+    return [(row["team1"], row["team2"]) for row in league], [int(row["id"]) for row in rows]
+
+
+def abbreviation(name):
+    return "".join(word[0] for word in name.split() if word[0].isupper())
+
+
+def season_squads(deliveries_df, match_ids):
+    """
+    Picks each franchise's 11 most capped players of the season from the
+    deliveries, in order of their average first over at the crease, with
+    players who never batted last.
+
+    :param deliveries_df: deliveries DataFrame
+    :param match_ids: match ids of the season
+    :return: dict of team name to lineup
+    """
+    # Only squad building needs pandas, simulating a season does not
+    import pandas as pd
+
+    df = deliveries_df[deliveries_df["match_id"].isin(match_ids)]
+
+    batting = []
+    for col in ("batsman", "non_striker"):
+        batting.append(df[["match_id", "batting_team", "over", col]].rename(
+            columns={"batting_team": "team", col: "player"}))
+    batting = pd.concat(batting, ignore_index=True)
+    first_in = batting.groupby(["team", "player", "match_id"], observed=True)["over"].min()
+
+    bowling = df[["match_id", "bowling_team", "bowler"]].rename(
+        columns={"bowling_team": "team", "bowler": "player"}).drop_duplicates()
+
+    appearances = first_in.reset_index()[["team", "player", "match_id"]]
+    appearances = pd.concat([appearances, bowling], ignore_index=True)
+    caps = appearances.drop_duplicates().groupby(["team", "player"], observed=True).size()
+    position = first_in.groupby(level=["team", "player"], observed=True).mean()
+
+    squads = {}
+    for team, team_caps in caps.groupby(level="team"):
+        players = team_caps.droplevel("team").sort_values(ascending=False, kind="stable").index[:11]
+        lineup = sorted(players, key=lambda p: position.get((team, p), np.inf))
+        squads[team] = list(lineup)
+    return squads
+
+
+def season_keepers(deliveries_df, match_ids, squads):
+    """
+    Takes each franchise's wicket keeper to be the squad player credited with
+    the most stumpings of the season, the fielder on a stumping being the keeper.
+
+    :param squads: dict of team name to lineup, from season_squads
+    :return: dict of team name to keeper, None where no squad player made a stumping
+    """
+    keepers = {team: None for team in squads}
+    if "fielder" not in deliveries_df.columns:
+        return keepers
+
+    df = deliveries_df[deliveries_df["match_id"].isin(match_ids)]
+    stumpings = df[(df["dismissal_kind"] == "stumped") & df["fielder"].notna()]
+    counts = stumpings.groupby(["bowling_team", "fielder"], observed=True).size()
+    for (team, fielder), k in counts.sort_values(ascending=False, kind="stable").items():
+        if team in squads and keepers[team] is None and fielder in squads[team]:
+            keepers[team] = fielder
+    return keepers
+
+
+def season_teams(season, stats, deliveries_df, matches_path="data/matches.csv"):
+    """
+    Builds every franchise of a season once. Keepers come from the season's
+    stumpings (season_keepers); deliveries say nothing of captains, so
+    captain is left unset.
+
+    :param stats: PlayerStatsStore, or (batsmen_df, bowlers_df)
+    :return: dict of team name to Team
+    """
+    fixtures, match_ids = season_fixtures(season, matches_path)
+    if not hasattr(stats, "batting"):
+        from stats_store import PlayerStatsStore
+        stats = PlayerStatsStore.for_frames(*stats)
+
+    squads = season_squads(deliveries_df, match_ids)
+    keepers = season_keepers(deliveries_df, match_ids, squads)
+    teams = {}
+    for name, lineup in squads.items():
+        if len(lineup) < 11:
+            continue
+        team = Team(name, lineup, abbrev=abbreviation(name), wk=keepers[name])
+        team.generate_team(stats)
+        teams[name] = team
+    return teams
+
+
+class SeasonResult:
+    """
+    League tables and playoff outcomes of n replicates of one season.
+    Arrays are indexed by (replicate, team) with teams in self.names order.
+    """
+
+    def __init__(self, names, points, nrr, wins, standings, finalists, champion):
+        self.names = names
+        self.n = len(points)
+        self.points = points
+        self.nrr = nrr
+        self.wins = wins
+        # Team indices ranked by points then net run rate
+        self.standings = standings
+        self.finalists = finalists
+        self.champion = champion
+
+    def title_odds(self):
+        counts = np.bincount(self.champion, minlength=len(self.names))
+        return {name: counts[t] / self.n for t, name in enumerate(self.names)}
+
+    def points_table(self):
+        """
+        :return: list of per team dicts, by mean points then mean net run rate
+        """
+        top_4 = np.zeros(len(self.names))
+        for t in range(len(self.names)):
+            top_4[t] = (self.standings[:, :4] == t).any(axis=1).mean()
+        final = np.bincount(self.finalists.ravel(), minlength=len(self.names)) / self.n
+        titles = self.title_odds()
+
+        table = []
+        for t, name in enumerate(self.names):
+            table.append({"Team": name,
+                          "Won": float(self.wins[:, t].mean()),
+                          "Points": float(self.points[:, t].mean()),
+                          "NRR": float(self.nrr[:, t].mean()),
+                          "Playoffs": float(top_4[t]),
+                          "Final": float(final[t]),
+                          "Title": float(titles[name])})
+        table.sort(key=lambda row: (-row["Points"], -row["NRR"]))
+        return table
+
+
+class SeasonSimulator:
+    """
+    Plays a league stage from a fixture list, then IPL style playoffs between
+    the top four: Qualifier 1 (1st v 2nd), Eliminator (3rd v 4th), Qualifier 2
+    (loser of Q1 v winner of the Eliminator) and the Final.
+
+    Every fixture is played for all replicates at once by the batch engine,
+    spread over cores by ParallelRunner. Compiled tables of each pair of
+    teams are built once and reused for every fixture and replicate.
+    """
+
+    def __init__(self, teams, fixtures, workers=None, chunk_size=4000, block=4000):
+        """
+        :param teams: dict of team name to Team
+        :param fixtures: league fixtures as (team1, team2) names
+        :param block: replicates held in memory at once, larger batches run faster
+                      but every fixture keeps full scorecards until the block is tallied
+        """
+        self.teams = teams
+        self.fixtures = [(a, b) for a, b in fixtures if a in teams and b in teams]
+        self.names = sorted({name for fixture in self.fixtures for name in fixture})
+        self.ids = {name: t for t, name in enumerate(self.names)}
+        self.runner = ParallelRunner(workers, chunk_size)
+        self.block = block
+        self.setups = {}
+
+    @staticmethod
+    def from_matches(season, teams, matches_path="data/matches.csv", **kwargs):
+        return SeasonSimulator(teams, season_fixtures(season, matches_path)[0], **kwargs)
+
+    def setup(self, a, b):
+        """
+        :return: (setup of a batting, setup of b batting), compiled once per pair
+        """
+        if (a, b) not in self.setups:
+            self.setups[(a, b)] = BatchSimulator(self.teams[self.names[a]], self.teams[self.names[b]]).setups()
+        return self.setups[(a, b)]
+
+    def play(self, a, b, streams):
+        """
+        Plays one knockout match per replicate, a and b being team indices per
+        replicate. Ties go to a coin flip, standing in for a super over.
+
+        :param streams: MatchStreams of the stage, one match per replicate
+        :return: winner per replicate
+        """
+        winner = np.empty(len(a), dtype=np.int64)
+        pairs = np.stack([a, b], axis=1)
+        for pair in np.unique(pairs, axis=0):
+            rows = np.flatnonzero((pairs == pair).all(axis=1))
+            pair_streams = MatchStreams(streams.key, streams.matches[rows])
+            _, innings_a, innings_b = BatchSimulator.play_batch(*self.setup(*pair), len(rows), pair_streams)
+            a_wins = innings_a.runs > innings_b.runs
+            tie = np.flatnonzero(innings_a.runs == innings_b.runs)
+            a_wins[tie] = pair_streams.lane(3, tie).random(np.arange(len(tie))) < 0.5
+            winner[rows] = np.where(a_wins, pair[0], pair[1])
+        return winner
+
+    def league(self, n, seed, start=0):
+        """
+        :param start: index of the first replicate
+        :return: (points, net run rate, wins) arrays of shape (n, teams)
+        """
+        n_teams = len(self.names)
+        points = np.zeros((n, n_teams), dtype=np.int64)
+        wins = np.zeros((n, n_teams), dtype=np.int64)
+        runs_for = np.zeros((n, n_teams), dtype=np.int64)
+        balls_for = np.zeros((n, n_teams), dtype=np.int64)
+        runs_against = np.zeros((n, n_teams), dtype=np.int64)
+        balls_against = np.zeros((n, n_teams), dtype=np.int64)
+
+        # Same fixture pairs share compiled tables through compile_matchup's cache
+        fixtures = [(self.teams[a], self.teams[b]) for a, b in self.fixtures]
+        for (a, b), result in zip(self.fixtures, self.runner.run_campaign(fixtures, n, seed, start)):
+            i, j = self.ids[a], self.ids[b]
+            inn_i = result.innings[result.team_1]
+            inn_j = result.innings[result.team_2]
+
+            # All out sides are charged their full 20 overs
+            balls_i = np.where(inn_i.wickets == 10, 120, inn_i.balls)
+            balls_j = np.where(inn_j.wickets == 10, 120, inn_j.balls)
+
+            runs_for[:, i] += inn_i.runs
+            balls_for[:, i] += balls_i
+            runs_against[:, i] += inn_j.runs
+            balls_against[:, i] += balls_j
+            runs_for[:, j] += inn_j.runs
+            balls_for[:, j] += balls_j
+            runs_against[:, j] += inn_i.runs
+            balls_against[:, j] += balls_i
+
+            wins[:, i] += result.winner == 0
+            wins[:, j] += result.winner == 1
+            points[:, i] += np.where(result.winner == 0, 2, np.where(result.winner == -1, 1, 0))
+            points[:, j] += np.where(result.winner == 1, 2, np.where(result.winner == -1, 1, 0))
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            nrr = np.nan_to_num(6 * runs_for / balls_for) - np.nan_to_num(6 * runs_against / balls_against)
+        return points, nrr, wins
+
+    def simulate(self, n, seed=0):
+        """
+        :param n: number of season replicates
+        :return: SeasonResult
+        """
+        # Every replicate has its own streams, so blocks and workers do not change results
+        parts = []
+        for start in range(0, n, self.block):
+            size = min(self.block, n - start)
+            replicates = np.arange(start, start + size)
+            stage = {name: MatchStreams(stream_key(seed, key), replicates) for name, key in PLAYOFF_STREAMS.items()}
+
+            points, nrr, wins = self.league(size, seed, start)
+
+            # Points, then net run rate, then a random draw
+            tiebreak = MatchStreams(stream_key(seed, TIEBREAK_STREAM), replicates).lane(0)
+            draw = np.stack([tiebreak.random(np.arange(size)) for t in range(len(self.names))], axis=1)
+            order = np.lexsort((draw, -nrr, -points), axis=-1)
+            first, second, third, fourth = order[:, 0], order[:, 1], order[:, 2], order[:, 3]
+
+            q1 = self.play(first, second, stage["Qualifier 1"])
+            q1_loser = np.where(q1 == first, second, first)
+            eliminator = self.play(third, fourth, stage["Eliminator"])
+            q2 = self.play(q1_loser, eliminator, stage["Qualifier 2"])
+            champion = self.play(q1, q2, stage["Final"])
+
+            parts.append((points, nrr, wins, order, np.stack([q1, q2], axis=1), champion))
+
+        return SeasonResult(self.names, *[np.concatenate(arrays) for arrays in zip(*parts)])
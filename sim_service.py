@@ -0,0 +1,369 @@
+"""
+Long lived simulation service on localhost.
+
+    python ipl_sim.py serve LINEUPS [--port 8765 | --socket PATH] [--workers N]
+
+    GET /simulate?team_1=...&team_2=...&n=10000[&seed=...]
+    GET /teams
+    GET /metrics
+
+Teams and their compiled matchups are loaded once, in the service and in
+every worker process. Requests for the same fixture arriving within a short
+window, or while a large enough run of it is in flight, share one batch
+simulation and each take their first n matches, as do requests arriving
+up to max_age seconds after it finished, as long as the finished batches
+held stay under max_held matches. Fixtures are keyed on the
+unordered pair of teams, so A v B and B v A coalesce too. Batches run in
+chunks on a process pool, leaving the event loop free to accept requests.
+"""
+import asyncio
+import json
+import os
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlsplit
+import numpy as np
+from aggregate import OutcomeAggregator
+from parallel import ParallelRunner
+from rng import MatchStreams
+from simulators import BatchResult, BatchSimulator, InningsBatch
+from team_bundle import load_teams
+
+
+# Per worker process state, filled by _init_worker
+_teams = {}
+_setups = {}
+
+
+def _init_worker(lineup_path, deliveries_path, cache_dir):
+    # The parent built the bundle already, so this only reads it
+    _teams.update(load_teams(lineup_path, deliveries_path, cache_dir))
+
+
+def _ready():
+    return os.getpid()
+
+
+def _run_chunk(team_1, team_2, seed, start, size):
+    setups = _setups.get((team_1, team_2))
+    if setups is None:
+        setups = _setups[(team_1, team_2)] = BatchSimulator(_teams[team_1], _teams[team_2]).setups()
+    return BatchSimulator.play_batch(*setups, size, MatchStreams.for_range(seed, start, size))
+
+
+class ServiceMetrics:
+    """
+    Request latencies over a sliding window, and running totals.
+    """
+
+    def __init__(self, window=10_000):
+        self.started = time.perf_counter()
+        self.latencies = deque(maxlen=window)
+        self.requests = 0
+        self.errors = 0
+        self.coalesced = 0
+        self.runs = 0
+        self.matches = 0
+        self.run_seconds = 0.0
+
+    def request(self, seconds, coalesced):
+        self.requests += 1
+        self.coalesced += coalesced
+        self.latencies.append(seconds)
+
+    def run(self, matches, seconds):
+        self.runs += 1
+        self.matches += matches
+        self.run_seconds += seconds
+
+    def summary(self):
+        uptime = time.perf_counter() - self.started
+        latency = {}
+        if self.latencies:
+            ms = np.asarray(self.latencies) * 1000
+            latency = {"p50_ms": float(np.percentile(ms, 50)),
+                       "p90_ms": float(np.percentile(ms, 90)),
+                       "p99_ms": float(np.percentile(ms, 99)),
+                       "max_ms": float(ms.max())}
+        return {"uptime": uptime,
+                "requests": self.requests,
+                "errors": self.errors,
+                "coalesced": self.coalesced,
+                "runs": self.runs,
+                "matches": self.matches,
+                "requests_per_sec": self.requests / uptime,
+                "matches_per_sec": self.matches / uptime,
+                "run_seconds": self.run_seconds,
+                "latency": latency}
+
+
+class _Batch:
+    """
+    One batch simulation of a fixture, shared by every request waiting on it.
+    """
+
+    def __init__(self, n, future):
+        self.n = n
+        self.future = future
+        self.finished = None
+        # Summaries of the first n matches, by n
+        self.summaries = {}
+
+    def summary(self, n):
+        summary = self.summaries.get(n)
+        if summary is None:
+            result = self.future.result()
+            aggregator = OutcomeAggregator(result.team_1.name, result.team_2.name)
+            aggregator.add_batch(result.take(slice(0, n)))
+            summary = self.summaries[n] = aggregator.summary()
+        return summary
+
+
+class SimulationService:
+    """
+    Coalesces fixture requests into batch simulations run on an executor.
+    """
+
+    def __init__(self, teams, executor=None, workers=1, seed=None, window=0.002, max_age=1.0,
+                 chunk_size=2500, max_matches=200_000, max_held=1_000_000):
+        """
+        :param teams: dict of team name to Team
+        :param executor: pool running _run_chunk, None runs chunks on one
+                         thread with teams
+        :param workers: workers of the executor, to split batches into chunks
+        :param seed: campaign seed of unseeded requests, random by default
+        :param window: seconds a new fixture request waits for others to join it
+        :param max_age: seconds a finished batch keeps answering requests, 0 to
+                        always simulate afresh
+        :param max_matches: largest n accepted
+        :param max_held: matches of finished batches kept for reuse, oldest dropped first
+        """
+        self.teams = teams
+        if executor is None:
+            _teams.update(teams)
+            executor = ThreadPoolExecutor(1)
+        self.executor = executor
+        self.runner = ParallelRunner(workers, chunk_size)
+        self.seed = seed if seed is not None else np.random.SeedSequence().entropy
+        self.window = window
+        self.max_age = max_age
+        self.max_matches = max_matches
+        self.max_held = max_held
+
+        self.pending = {}
+        self.running = defaultdict(list)
+        # Finished batches by key, oldest first
+        self.finished = {}
+        # Unseeded requests move through the service's stream, so every batch is fresh
+        self.next_match = defaultdict(int)
+        self.metrics = ServiceMetrics()
+
+    @staticmethod
+    def from_lineups(lineup_path, deliveries_path="data/deliveries.csv", cache_dir="stats_cache",
+                     workers=None, **kwargs):
+        """
+        :param workers: worker processes, defaults to the CPU count, 0 runs
+                        batches on a thread of this process
+        """
+        teams = load_teams(lineup_path, deliveries_path, cache_dir)
+        workers = workers if workers is not None else os.cpu_count()
+        if workers == 0:
+            return SimulationService(teams, None, 1, **kwargs)
+        executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                       initargs=(lineup_path, deliveries_path, cache_dir))
+        return SimulationService(teams, executor, workers, **kwargs)
+
+    def warm_up(self):
+        """
+        Starts every worker, so the first requests do not wait for them to load teams.
+        """
+        for future in [self.executor.submit(_ready) for i in range(self.runner.workers)]:
+            future.result()
+
+    def close(self):
+        self.executor.shutdown()
+
+    async def simulate(self, team_1, team_2, n=10_000, seed=None):
+        """
+        :param seed: seed of a reproducible request, the same as
+                     simulate_batch(n, seed, start=0) of the fixture in name order
+        :return: OutcomeAggregator summary of n matches
+        """
+        start = time.perf_counter()
+        self.validate(team_1, team_2, n)
+
+        fixture = tuple(sorted((team_1, team_2)))
+        key = (fixture, seed)
+        batch, coalesced = self.batch(key, n)
+        await asyncio.shield(batch.future)
+
+        summary = batch.summary(n)
+        self.metrics.request(time.perf_counter() - start, coalesced)
+        return summary
+
+    def validate(self, team_1, team_2, n):
+        """
+        :raise KeyError: for an unknown team
+        :raise ValueError: for the same team twice or n out of range
+        """
+        for name in (team_1, team_2):
+            if name not in self.teams:
+                raise KeyError(name)
+        if team_1 == team_2 or not 0 < n <= self.max_matches:
+            raise ValueError(f"need two different teams and 0 < n <= {self.max_matches}")
+
+    def batch(self, key, n):
+        """
+        :return: (batch the request waits on, whether it joined one already requested)
+        """
+        self.evict()
+        batch = self.finished.get(key)
+        if batch is not None and batch.n >= n:
+            return batch, True
+
+        for batch in self.running.get(key, ()):
+            if batch.n >= n:
+                return batch, True
+
+        batch = self.pending.get(key)
+        if batch is not None:
+            batch.n = max(batch.n, n)
+            return batch, True
+
+        loop = asyncio.get_running_loop()
+        batch = self.pending[key] = _Batch(n, loop.create_future())
+        loop.call_later(self.window, self.flush, key)
+        return batch, False
+
+    def evict(self):
+        """
+        Drops finished batches older than max_age, then the oldest ones until
+        at most max_held matches are kept.
+        """
+        now = time.perf_counter()
+        held = sum(batch.n for batch in self.finished.values())
+        for key, batch in list(self.finished.items()):
+            if now - batch.finished <= self.max_age and held <= self.max_held:
+                break
+            del self.finished[key]
+            held -= batch.n
+
+    def flush(self, key):
+        batch = self.pending.pop(key)
+        self.running[key].append(batch)
+        asyncio.get_running_loop().create_task(self.play(key, batch))
+
+    async def play(self, key, batch):
+        (team_1, team_2), seed = key
+        start = 0
+        if seed is None:
+            seed, start = self.seed, self.next_match[key[0]]
+            self.next_match[key[0]] += batch.n
+
+        began = time.perf_counter()
+        loop = asyncio.get_running_loop()
+        try:
+            parts = await asyncio.gather(*(loop.run_in_executor(self.executor, _run_chunk,
+                                                                team_1, team_2, seed, first, size)
+                                           for first, size in self.runner.chunks(batch.n, start)))
+            team_1_bats_first = np.concatenate([p[0] for p in parts])
+            innings = {self.teams[team_1]: InningsBatch.concatenate([p[1] for p in parts]),
+                       self.teams[team_2]: InningsBatch.concatenate([p[2] for p in parts])}
+            batch.future.set_result(BatchResult(self.teams[team_1], self.teams[team_2],
+                                                team_1_bats_first, innings))
+            batch.finished = time.perf_counter()
+            self.metrics.run(batch.n, batch.finished - began)
+            # Reinserted so the dict stays ordered by finishing time
+            self.finished.pop(key, None)
+            self.finished[key] = batch
+            self.evict()
+        except Exception as e:
+            batch.future.set_exception(e)
+        finally:
+            self.running[key].remove(batch)
+            if not self.running[key]:
+                del self.running[key]
+
+    async def route(self, method, target, body):
+        """
+        :return: (HTTP status, JSON payload)
+        """
+        url = urlsplit(target)
+        if method != "GET" and not (method == "POST" and url.path == "/simulate"):
+            return 405, {"error": f"{method} not allowed"}
+        if url.path == "/teams":
+            return 200, sorted(self.teams)
+        if url.path == "/metrics":
+            return 200, {**self.metrics.summary(),
+                         "pending": len(self.pending),
+                         "running": sum(len(batches) for batches in self.running.values())}
+        if url.path != "/simulate":
+            return 404, {"error": f"no route {url.path}"}
+
+        # Only the request itself is checked here, errors raised while it runs are the service's
+        params = dict(parse_qsl(url.query))
+        try:
+            if body:
+                params.update(json.loads(body))
+            team_1, team_2 = params["team_1"], params["team_2"]
+            n = int(params.get("n", 10_000))
+            seed = params.get("seed")
+            seed = None if seed is None else int(seed)
+            self.validate(team_1, team_2, n)
+        except KeyError as e:
+            self.metrics.errors += 1
+            return 404, {"error": f"unknown team or missing parameter {e}"}
+        except (ValueError, TypeError) as e:
+            self.metrics.errors += 1
+            return 400, {"error": str(e)}
+
+        try:
+            return 200, await self.simulate(team_1, team_2, n, seed)
+        except Exception as e:
+            # e.g. a worker failing, the client still gets an answer
+            self.metrics.errors += 1
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+
+    async def handle(self, reader, writer):
+        """
+        Serves HTTP/1.1 requests of one connection, kept alive unless asked otherwise.
+        """
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                method, target, version = line.decode("latin-1").split()
+
+                headers = {}
+                while True:
+                    header = await reader.readline()
+                    if header in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = header.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                status, payload = await self.route(method, target, body)
+                data = json.dumps(payload, default=float).encode()
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                writer.write(f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                             f"Content-Type: application/json\r\n"
+                             f"Content-Length: {len(data)}\r\n"
+                             f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host="127.0.0.1", port=8765, unix_socket=None):
+        if unix_socket is not None:
+            server = await asyncio.start_unix_server(self.handle, unix_socket)
+        else:
+            server = await asyncio.start_server(self.handle, host, port)
+        async with server:
+            await server.serve_forever()
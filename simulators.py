@@ -1,8 +1,40 @@
 import numpy as np
 import random
+import time
 import copy
 from abc import ABC, abstractmethod
+from collections import namedtuple
+from aggregate import OutcomeAggregator
 from game_tools import Match
+from matchups import compile_matchup, bowler_weights
+from ball_log import BallLog
+from instrumentation import Instrumentation
+from match_state import MatchState
+from reports import ReportSink
+from rng import LaneStream, MatchRandom, MatchStreams
+
+
+# Compact outcome of one match, winner is None for a tie
+MatchResult = namedtuple("MatchResult", ["bat_first", "bat_second",
+										 "first_runs", "first_wickets", "first_balls",
+										 "second_runs", "second_wickets", "second_balls",
+										 "winner", "margin", "margin_type"])
+
+
+def match_result(bat_first, bat_second, first, second):
+	"""
+	:param first: (runs, wickets, balls) of the first innings
+	:param second: (runs, wickets, balls) of the second innings
+	:return: MatchResult, with the same verdict as Match.declare_result
+	"""
+	if second[0] > first[0]:
+		winner, margin, margin_type = bat_second, 10 - second[1], "wickets"
+	elif second[0] == first[0]:
+		winner, margin, margin_type = None, 0, None
+	else:
+		winner, margin, margin_type = bat_first, first[0] - second[0], "runs"
+
+	return MatchResult(bat_first, bat_second, *first, *second, winner, margin, margin_type)
 
 
 class AbstractSimulator(ABC):
@@ -14,39 +46,129 @@ class AbstractSimulator(ABC):
 	@staticmethod
 	def random_weighted_pick(match, team, prev_bowler, weight_col="Wickets"):
 
-		bowler_list = copy.deepcopy(team.bowler_list)
+		bowler_list = [b for b in team.bowler_list if b != prev_bowler and
+					   match.scorecards[team]["Bowl"][b]["Balls"] < 24]
 
-		if prev_bowler in bowler_list:
-			bowler_list.remove(prev_bowler)
+		if weight_col is not None:
+			weighter = []
+			for b in bowler_list:
+				stats = team.players[b].bowling_stats
+				weighter.append(stats[weight_col] / stats["Matches"] if stats["Matches"] > 0 else 0)
 
-		for bowler, stats in match.scorecards[team]["Bowl"].items():
-			if stats["Balls"] >= 24 and bowler in bowler_list:
-				bowler_list.remove(bowler)
+			if sum(weighter) > 0:
+				return random.choices(bowler_list, weights=weighter)[0]
 
-		weighter = []
-		for b in bowler_list:
-			weighter.append(team.players[b].bowling_stats[weight_col] /
-							team.players[b].bowling_stats["Matches"])
-
-		if weight_col is not None:
-			return random.choices(bowler_list, weights=weighter)[0]
-		else:
-			return random.choices(bowler_list)[0]
+		return random.choices(bowler_list)[0]
 
+	@staticmethod
+	def pick_bowler_id(weights, bowled, prev_bowler, u=None):
+		"""
+		random_weighted_pick on bowler_list positions.
+
+		:param weights: selection weight per bowler
+		:param bowled: legal balls bowled so far per bowler
+		:param prev_bowler: position of the previous over's bowler, -1 if none
+		:param u: uniform draw to pick with, from the random module if None
+		"""
+		eligible = [b for b in range(len(weights)) if b != prev_bowler and bowled[b] < 24]
+		if not eligible:
+			eligible = [b for b in range(len(weights)) if b != prev_bowler] or list(range(len(weights)))
+
+		w = [weights[b] for b in eligible]
+		if u is None:
+			if sum(w) > 0:
+				return random.choices(eligible, weights=w)[0]
+			return random.choice(eligible)
+
+		total = sum(w)
+		if total <= 0:
+			return eligible[min(int(u * len(eligible)), len(eligible) - 1)]
+		u *= total
+		for b, weight in zip(eligible, w):
+			u -= weight
+			if u < 0:
+				return b
+		return eligible[-1]
+
+
+class BowlerQuota:
+	"""
+	Balls bowled per bowler of one innings, updated once per over, with the
+	selection weights computed once. Picks like random_weighted_pick.
+	"""
+
+	def __init__(self, team, weight_col="Wickets"):
+		self.bowlers = list(team.bowler_list)
+		self.ids = {name: j for j, name in enumerate(self.bowlers)}
+		self.weights = bowler_weights(team, weight_col).tolist()
+		self.bowled = [0] * len(self.bowlers)
+		self.prev_bowler = -1
+
+	def pick(self, u=None):
+		"""
+		:param u: uniform draw to pick with, from the random module if None
+		:return: name of the next over's bowler
+		"""
+		return self.bowlers[AbstractSimulator.pick_bowler_id(self.weights, self.bowled, self.prev_bowler, u)]
+
+	def end_over(self, bowler, legal_balls):
+		j = self.ids[bowler]
+		self.bowled[j] += legal_balls
+		self.prev_bowler = j
 
 
 class SimplisticSimulator(AbstractSimulator):
 
-	def __init__(self, team_1, team_2):
+	# "result": totals only, "scorecard": adds per player scorecards,
+	# "full": adds ball by ball deliveries, needed for match reports
+	telemetry_levels = ("result", "scorecard", "full")
+
+	def __init__(self, team_1, team_2, telemetry="full", keep_deliveries=True, seed=None,
+				 instrumentation=None, head_to_head=None, on_ball=None):
+		"""
+		:param keep_deliveries: append every match's deliveries to self.deliveries,
+								turn off for long runs to keep memory bounded
+		:param seed: campaign seed, every match then draws from its own Philox
+					 stream keyed by (seed, match index) instead of the random module
+		:param instrumentation: Instrumentation recording phase timings and
+								match counters, off when None
+		:param head_to_head: HeadToHead blended into the ball probabilities,
+							 marginals alone when None
+		:param on_ball: on_ball(innings, balls, snapshot) called after every ball
+						within an over and after every over, balls being the legal
+						balls of the innings so far; snapshot(), called within
+						on_ball, returns the MatchState at that point. Needs
+						telemetry above "result"
+		"""
+		assert telemetry in SimplisticSimulator.telemetry_levels
 		self.team_1 = team_1
 		self.team_2 = team_2
+		self.telemetry = telemetry
+		self.keep_deliveries = keep_deliveries
+
+		self.deliveries = BallLog()
+
+		# Index of the next match in the campaign, set it to replay a match
+		self.seed = seed
+		self.next_match = 0
+		self.rand = random.random
+
+		self.table = {}
+		self.dismissal_table = {}
+		self.head_to_head = head_to_head
+		self.on_ball = on_ball
 
-		self.deliveries = []
+		if instrumentation is None:
+			instrumentation = Instrumentation(enabled=False)
+		self.instrumentation = instrumentation
+		self.innings_extras = 0
 
 
 
+	def toss(self, outcome=None):
+		if outcome is None:
+			outcome = self.rand()
 
-	def toss(self, outcome=random.random()):
 		if outcome < 0.25:
 			toss_statement = f"{self.team_1.name} has won the toss and chosen to bat first."
 			self.bat_first = self.team_1
@@ -74,98 +196,134 @@ class SimplisticSimulator(AbstractSimulator):
 
 
 
-	def play_match(self, to_file=False, out_folder=None):
-		self.match = Match(self.team_1, self.team_2)
-		toss_statement = self.toss()
-
-		self.table = {}
-		self.dismissal_table = {}
-
+	def play_match(self, to_file=False, out_folder=None, sink=None):
+		"""
+		:return: MatchResult
+		"""
+		if self.seed is not None:
+			self.rand = MatchRandom(self.seed, self.next_match).stream()
+		self.next_match += 1
 
-		self.assign_probabilities(self.team_1, self.team_2)
-		self.assign_probabilities(self.team_2, self.team_1)
+		inst = self.instrumentation
+		inst.begin_match()
 
-		deliveries = self.play_innings(self.bat_first, self.bat_second)
+		toss_statement = self.toss()
 
-		if to_file:
-			assert out_folder is not None
+		with inst.phase("setup"):
+			# Compiled once per team pair, rebuilt only when lineups or stats change
+			self.matchups = {self.team_1: compile_matchup(self.team_1, self.team_2, head_to_head=self.head_to_head),
+							 self.team_2: compile_matchup(self.team_2, self.team_1, head_to_head=self.head_to_head)}
+
+		if self.telemetry == "result":
+			assert not to_file, "match reports need telemetry='full'"
+			with inst.phase("innings"):
+				first = self.play_innings_result(self.bat_first, self.bat_second)
+				extras = self.innings_extras
+				second = self.play_innings_result(self.bat_second, self.bat_first, target=first[0] + 1)
+				extras += self.innings_extras
+			result = match_result(self.bat_first, self.bat_second, first, second)
+			inst.end_match(result, extras)
+			return result
+
+		with inst.phase("innings"):
+			self.match = Match(self.team_1, self.team_2)
+			# Set before the first ball so MatchState.from_match works at any point
 			self.match.set_toss_result(self.bat_first, self.bat_second, toss_statement)
-			self.match.write_to_file(out_folder, deliveries)
-
-
-
+			deliveries = self.play_innings(self.bat_first, self.bat_second)
 
+		first = self.match.summary[self.bat_first]
+		second = self.match.summary[self.bat_second]
+		result = match_result(self.bat_first, self.bat_second,
+							  (first["Runs"], first["Wickets"], first["Balls"]),
+							  (second["Runs"], second["Wickets"], second["Balls"]))
 
+		if to_file:
+			assert self.telemetry == "full", "match reports need telemetry='full'"
+			with inst.phase("report"):
+				if sink is not None:
+					sink.write(self.match, deliveries)
+				else:
+					assert out_folder is not None
+					self.match.write_to_file(out_folder, deliveries)
 
-	def play_matches(self, n, to_file=False, out_folder=None):
-
-		for i in range(n):
-			self.play_match(to_file, out_folder)
-
-
-	def assign_probabilities(self, team_1, team_2, eps = 1e-9):
-
+		if inst.enabled:
+			# Wides and no balls are the runs not off the bat
+			extras = sum(self.match.summary[team]["Runs"] -
+						 sum(card["Runs"] for card in self.match.scorecards[team]["Bat"].values())
+						 for team in (self.team_1, self.team_2))
+			inst.end_match(result, extras)
 
-		# Tables have (batsmen, bowler) pairs as keys and probabilities as values
-		for batsman_name in team_1.lineup:
-			for bowler_name in team_2.bowler_list:
-				bat_srs = team_1.players[batsman_name].batting_stats
-				bowl_srs = team_2.players[bowler_name].bowling_stats
+		return result
 
-				mat = np.zeros((len(Match.ball_choices),))
 
-				# P(dot ball) = P(batsman play defensive) or P(bowler bowls difficult ball) - overlap
 
-				for i in range(7):
-					# Run probability
-					bat_prob = bat_srs[i] / bat_srs["Balls Faced"]
-					bowl_prob = bowl_srs[i] / bowl_srs["Balls Bowled"]
-					mat[i] = bat_prob + bowl_prob - (bat_prob * bowl_prob)
 
 
-				bat_prob = bat_srs["Dismissals"] / bat_srs["Balls Faced"]
-				bowl_prob = bowl_srs["Wickets"] / bowl_srs["Balls Bowled"]
 
-				# Dismissal probability
-				mat[7] = bat_prob + bowl_prob - (bat_prob * bowl_prob)
+	def play_matches(self, n, to_file=False, out_folder=None, archive=None, aggregator=None, cache=None):
+		"""
+		:param archive: None for one report file per match, else a
+						ReportSink.archive_formats entry to write one archive
+		:param aggregator: OutcomeAggregator fed with every match as it is played,
+						   instead of collecting the results
+		:param cache: ResultCache consulted first when seeded and aggregating
+					  without reports, only matches it lacks are played
+		:return: list of MatchResult, or the aggregator if one was given
+		"""
+		if cache is not None and aggregator is not None and self.seed is not None and not to_file:
+			return aggregator.merge(self.play_cached(n, cache))
 
-				# No Ball probability
-				mat[8] = bowl_srs["No Balls"] / bowl_srs["Balls Bowled"]
+		sink = None
+		if to_file:
+			assert out_folder is not None
+			sink = ReportSink(out_folder, archive=archive)
 
-				# Wide probability
-				mat[9] = bowl_srs["Wides"] / bowl_srs["Balls Bowled"]
+		try:
+			if aggregator is None:
+				return [self.play_match(to_file, out_folder, sink=sink) for i in range(n)]
 
-				# Correction in case missing data
-				mat += eps
+			for i in range(n):
+				aggregator.add_result(self.play_match(to_file, out_folder, sink=sink))
+				if self.telemetry != "result":
+					aggregator.add_scorecards(self.match.scorecards)
+			return aggregator
+		finally:
+			if sink is not None:
+				sink.close()
 
-				# Normalization
-				mat /= np.sum(mat)
 
-				self.table[(batsman_name, bowler_name)] = mat
+	def play_cached(self, n, cache):
+		"""
+		:return: OutcomeAggregator of n matches from self.next_match on, read
+				 from cache where possible
+		"""
+		start = self.next_match
+		# Every telemetry level above "result" aggregates the same player counts
+		settings = {"engine": "scalar", "seed": self.seed, "start": start,
+					"players": self.telemetry != "result"}
 
-				dmat = np.zeros((len(Match.valid_dismissals),))
+		def play(done, count):
+			self.next_match = start + done
+			return self.play_matches(count, aggregator=OutcomeAggregator(self.team_1.name, self.team_2.name))
 
-				for i, d in enumerate(Match.valid_dismissals):
-					if d == "run out":
-						# Double because it relies on nonstriker's risk
-						dmat[i] = (bat_srs["run out"] / bat_srs["Dismissals"]) * 2
-					else:
-						bat_prob = bat_srs[d] / bat_srs["Dismissals"]
-						bowl_prob = bowl_srs[d] / bowl_srs["Wickets"]
-						dmat[i] = bat_prob + bowl_prob - (bat_prob * bowl_prob)
+		result = cache.aggregate(self.team_1, self.team_2, n, settings, play, self.head_to_head)
+		self.next_match = start + result.n
+		return result
 
-				# Correction zeros
-				dmat += eps
 
-				# Normalization
-				dmat /= np.sum(dmat)
+	def assign_probabilities(self, team_1, team_2, eps = 1e-9):
 
-				self.dismissal_table[(batsman_name, bowler_name)] = dmat
+		# Tables have (batsmen, bowler) pairs as keys and probabilities as values
+		with self.instrumentation.phase("assign_probabilities"):
+			table, dismissal_table = compile_matchup(team_1, team_2, eps, self.head_to_head).tables()
+		self.table.update(table)
+		self.dismissal_table.update(dismissal_table)
 
 
 	def play_innings(self, bat_team, bowl_team, innings=1,
 					 next_bat=AbstractSimulator.fixed_order,
-					 next_bowl=AbstractSimulator.random_weighted_pick):
+					 next_bowl=AbstractSimulator.random_weighted_pick,
+					 deliveries=None):
 
 		if innings == 2:
 			# Second Innings
@@ -181,7 +339,21 @@ class SimplisticSimulator(AbstractSimulator):
 		prev_bowler = None
 		curr_bowler = None
 
-		deliveries = []
+		# Default picks track quotas per over instead of rescanning scorecards
+		quota = None
+		if next_bowl is AbstractSimulator.random_weighted_pick:
+			quota = BowlerQuota(bowl_team)
+
+		matchup = self.matchups[bat_team]
+		over_phase = matchup.over_phase.tolist()
+		rand = self.rand
+		timed = self.instrumentation.enabled
+		on_ball = self.on_ball
+
+		record = self.telemetry == "full"
+		if deliveries is None and record:
+			# One log per match, sharing the simulator's name table
+			deliveries = BallLog(names=self.deliveries.names)
 
 		while self.match.summary[bat_team]["Balls"] < 120 and self.match.summary[bat_team]["Wickets"] < 10:
 
@@ -191,7 +363,16 @@ class SimplisticSimulator(AbstractSimulator):
 				break
 
 			# Pre Over processing
-			curr_bowler = next_bowl(self.match, bowl_team, prev_bowler)
+			if timed:
+				start = time.perf_counter()
+			if quota is not None:
+				curr_bowler = quota.pick(rand())
+			else:
+				curr_bowler = next_bowl(self.match, bowl_team, prev_bowler)
+			if timed:
+				self.instrumentation.add("bowler_selection", time.perf_counter() - start)
+			bowler_id = matchup.bowl_ids[curr_bowler]
+			phase = over_phase[self.match.summary[bat_team]["Balls"] // 6]
 			legal_balls = 0
 
 			while legal_balls < 6 and self.match.summary[bat_team]["Wickets"] < 10:
@@ -201,24 +382,21 @@ class SimplisticSimulator(AbstractSimulator):
 					break
 
 				# Delivery detail setting
-				delivery = copy.deepcopy(Match.template)
-				delivery["over"] = (self.match.summary[bat_team]["Balls"] // 6) + 1
-				delivery["ball"] = legal_balls + 1
-				delivery["batsman"] = striker
-				delivery["non_striker"] = non_striker
-				delivery["bowler"] = curr_bowler
-				delivery["batting_team"] = bat_team.name
-				delivery["bowling_team"] = bowl_team.name
-				delivery["match_id"] = self.match.match_id
-				delivery["inning"] = innings
-
-				ball = random.choices(np.arange(len(Match.ball_choices)),
-									  weights=self.table[(striker, curr_bowler)])[0]
+				over = (self.match.summary[bat_team]["Balls"] // 6) + 1
+				ball_no = legal_balls + 1
+				batsman, partner = striker, non_striker
+				runs_off_bat = 0
+				noball_runs = 0
+				wide_runs = 0
+				dismissal = -1
+				player_dismissed = None
+
+				ball = matchup.sample(matchup.bat_ids[striker], bowler_id, rand(), phase)
 				if ball <= 6:
 					# Runs
 					legal_balls += 1
 					self.match.summary[bat_team]["Runs"] += ball
-					delivery["batsman_runs"] += ball
+					runs_off_bat = ball
 
 					self.match.scorecards[bat_team]["Bat"][striker]["Runs"] += ball
 					self.match.scorecards[bat_team]["Bat"][striker]["Balls"] += 1
@@ -235,10 +413,9 @@ class SimplisticSimulator(AbstractSimulator):
 				elif Match.ball_choices[ball] == "Out":
 					# OUT
 					legal_balls += 1
-					dismissal_type = random.choices(Match.valid_dismissals,
-													weights=self.dismissal_table[(striker, curr_bowler)])[0]
-					delivery["player_dismissed"] = striker
-					delivery["dismissal_kind"] = dismissal_type
+					dismissal = matchup.sample_dismissal(matchup.bat_ids[striker], bowler_id, rand(), phase)
+					dismissal_type = Match.valid_dismissals[dismissal]
+					player_dismissed = striker
 
 					self.match.scorecards[bat_team]["Bat"][striker]["Balls"] += 1
 					self.match.scorecards[bat_team]["Bat"][striker]["Dismissal type"] = dismissal_type
@@ -258,38 +435,566 @@ class SimplisticSimulator(AbstractSimulator):
 					# No Ball
 					self.match.summary[bat_team]["Runs"] += 1
 					self.match.scorecards[bowl_team]["Bowl"][curr_bowler]["Runs"] += 1
-					delivery["noball_runs"] = 1
-					delivery["extra_runs"] = 1
+					noball_runs = 1
 
 				elif Match.ball_choices[ball] == "Wide":
 					# Wide
 					self.match.summary[bat_team]["Runs"] += 1
 					self.match.scorecards[bowl_team]["Bowl"][curr_bowler]["Runs"] += 1
-					delivery["wide_runs"] = 1
-					delivery["extra_runs"] = 1
+					wide_runs = 1
 
 
-				deliveries.append(delivery)
+				if record:
+					deliveries.append(self.match.match_id, innings, over, ball_no, bat_team.name,
+									  bowl_team.name, batsman, partner,
+									  curr_bowler, runs_off_bat, wide_runs, noball_runs, dismissal,
+									  player_dismissed)
+
+				if on_ball is not None and legal_balls < 6:
+					# A completed over is reported once its post over processing is done
+					on_ball(innings, self.match.summary[bat_team]["Balls"] + legal_balls,
+							lambda: MatchState.from_match(self.match, innings, batsmen_thus_far, striker,
+														  non_striker, curr_bowler, prev_bowler, legal_balls))
 
 			# Post over processing
 			striker, non_striker = non_striker, striker
+			if quota is not None:
+				quota.end_over(curr_bowler, legal_balls)
 			prev_bowler = curr_bowler
 			curr_bowler = None
 			self.match.summary[bat_team]["Balls"] += legal_balls
 
+			if on_ball is not None:
+				on_ball(innings, self.match.summary[bat_team]["Balls"],
+						lambda: MatchState.from_match(self.match, innings, batsmen_thus_far, striker,
+													  non_striker, None, prev_bowler))
+
 
 		if innings == 1:
 			# The deliveries from the second innings are getting appended to first innings deliveries
-			deliveries.extend(self.play_innings(bowl_team, bat_team, innings=2))
-			self.deliveries.extend(deliveries)
+			self.play_innings(bowl_team, bat_team, innings=2, deliveries=deliveries)
+			if record and self.keep_deliveries:
+				self.deliveries.extend(deliveries)
 
 		return deliveries
 
 
 
+	def play_innings_result(self, bat_team, bowl_team, target=None):
+		"""
+		Plays an innings keeping only totals in locals, in batting order with
+		weighted bowler picks like play_innings' defaults.
+
+		:return: (runs, wickets, balls)
+		"""
+		matchup = self.matchups[bat_team]
+		sample = matchup.sample
+		over_phase = matchup.over_phase.tolist()
+		rand = self.rand
+		weights = matchup.weights.tolist()
+		bowled = [0] * len(weights)
+
+		runs = wickets = balls = extras = 0
+		striker, non_striker, next_in = 0, 1, 2
+		prev_bowler = -1
+		timed = self.instrumentation.enabled
+
+		while balls < 120 and wickets < 10:
+			if target is not None and runs >= target:
+				# Target chased
+				break
+
+			if timed:
+				start = time.perf_counter()
+			bowler = AbstractSimulator.pick_bowler_id(weights, bowled, prev_bowler, rand())
+			if timed:
+				self.instrumentation.add("bowler_selection", time.perf_counter() - start)
+			phase = over_phase[balls // 6]
+			legal_balls = 0
+
+			while legal_balls < 6 and wickets < 10:
+				if target is not None and runs >= target:
+					break
+
+				ball = sample(striker, bowler, rand(), phase)
+				if ball <= 6:
+					legal_balls += 1
+					runs += ball
+					if ball % 2 == 1:
+						striker, non_striker = non_striker, striker
+				elif ball == 7:
+					legal_balls += 1
+					wickets += 1
+					# The dismissal kind is not kept, but its draw is, so every telemetry level plays the same match
+					rand()
+					if wickets < 10:
+						striker = next_in
+						next_in += 1
+				elif ball <= 9:
+					# No Ball or Wide
+					runs += 1
+					extras += 1
+
+			striker, non_striker = non_striker, striker
+			prev_bowler = bowler
+			bowled[bowler] += legal_balls
+			balls += legal_balls
+
+		self.innings_extras = extras
+		return runs, wickets, balls
+
 	def get_deliveries(self):
 		return self.deliveries
 
 
 
 
+
+
+
+def uniforms(rng, rows):
+	"""
+	:param rng: numpy Generator, or a LaneStream drawing per row
+	:return: one uniform per row
+	"""
+	if isinstance(rng, LaneStream):
+		return rng.random(rows)
+	return rng.random(len(rows))
+
+
+class InningsBatch:
+	"""
+	Structure-of-arrays state for n innings of the same fixture played in lockstep.
+	Batsmen are addressed by lineup position and bowlers by bowler_list position.
+	"""
+
+	def __init__(self, n, n_bowlers, target=None):
+		self.n = n
+		self.target = target
+
+		# Summary
+		self.runs = np.zeros(n, dtype=np.int32)
+		self.wickets = np.zeros(n, dtype=np.int32)
+		self.balls = np.zeros(n, dtype=np.int32)
+
+		# Crease and over state
+		self.striker = np.zeros(n, dtype=np.int32)
+		self.non_striker = np.ones(n, dtype=np.int32)
+		self.next_in = np.full(n, 2, dtype=np.int32)
+		self.bowler = np.full(n, -1, dtype=np.int32)
+		self.prev_bowler = np.full(n, -1, dtype=np.int32)
+
+		# Scorecards, dismissal types are indices into Match.valid_dismissals
+		self.bat_runs = np.zeros((n, 11), dtype=np.int32)
+		self.bat_balls = np.zeros((n, 11), dtype=np.int32)
+		self.bat_out = np.full((n, 11), -1, dtype=np.int8)
+
+		self.bowl_balls = np.zeros((n, n_bowlers), dtype=np.int32)
+		self.bowl_runs = np.zeros((n, n_bowlers), dtype=np.int32)
+		self.bowl_dots = np.zeros((n, n_bowlers), dtype=np.int32)
+		self.bowl_wkts = np.zeros((n, n_bowlers), dtype=np.int32)
+
+	arrays = ["runs", "wickets", "balls", "striker", "non_striker", "next_in",
+			  "bowler", "prev_bowler", "bat_runs", "bat_balls", "bat_out",
+			  "bowl_balls", "bowl_runs", "bowl_dots", "bowl_wkts"]
+
+	def active(self):
+		live = (self.balls < 120) & (self.wickets < 10)
+		if self.target is not None:
+			live &= self.runs < self.target
+		return live
+
+	def assign(self, rows, other):
+		"""
+		Copy every match of other into the given rows of this batch.
+		"""
+		for attr in InningsBatch.arrays:
+			getattr(self, attr)[rows] = getattr(other, attr)
+
+	@staticmethod
+	def from_state(state, bat_team, bowl_team, n):
+		"""
+		n copies of bat_team's innings as recorded in a MatchState. If bat_team is
+		batting in state, the crease and over in progress are carried over too.
+
+		:param state: MatchState
+		"""
+		target = state.target if bat_team.name == state.bat_second else None
+		batch = InningsBatch(n, len(bowl_team.bowler_list), target=target)
+
+		summary = state.summary[bat_team.name]
+		batch.runs[:] = summary["Runs"]
+		batch.wickets[:] = summary["Wickets"]
+		batch.balls[:] = summary["Balls"]
+
+		for j, player in enumerate(bat_team.lineup):
+			card = state.scorecards[bat_team.name]["Bat"][player]
+			batch.bat_runs[:, j] = card["Runs"]
+			batch.bat_balls[:, j] = card["Balls"]
+			if card["Dismissal type"] is not None:
+				batch.bat_out[:, j] = Match.valid_dismissals.index(card["Dismissal type"])
+
+		for j, bowler in enumerate(bowl_team.bowler_list):
+			card = state.scorecards[bowl_team.name]["Bowl"][bowler]
+			batch.bowl_balls[:, j] = card["Balls"]
+			batch.bowl_runs[:, j] = card["Runs"]
+			batch.bowl_dots[:, j] = card["Dots"]
+			batch.bowl_wkts[:, j] = card["Wickets"]
+
+		if bat_team.name == state.bat_team:
+			# Batch engine brings batsmen in by lineup position
+			assert state.batsmen == bat_team.lineup[:len(state.batsmen)], \
+				"batsmen must have come in in lineup order"
+			batch.striker[:] = bat_team.lineup.index(state.striker)
+			batch.non_striker[:] = bat_team.lineup.index(state.non_striker)
+			batch.next_in[:] = len(state.batsmen)
+
+			bowl_ids = {name: j for j, name in enumerate(bowl_team.bowler_list)}
+			if state.prev_bowler is not None:
+				batch.prev_bowler[:] = bowl_ids[state.prev_bowler]
+			if state.bowler is not None and state.balls_in_over > 0:
+				batch.bowler[:] = bowl_ids[state.bowler]
+
+		return batch
+
+	@staticmethod
+	def concatenate(batches):
+		"""
+		Joins batches of the same fixture end to end, in the given order.
+		"""
+		joined = InningsBatch(0, batches[0].bowl_balls.shape[1])
+		joined.n = sum(batch.n for batch in batches)
+		for attr in InningsBatch.arrays:
+			setattr(joined, attr, np.concatenate([getattr(batch, attr) for batch in batches]))
+		return joined
+
+	def take(self, rows):
+		"""
+		:param rows: match indices or a slice
+		:return: new batch holding only the given matches
+		"""
+		part = InningsBatch(0, self.bowl_balls.shape[1])
+		for attr in InningsBatch.arrays:
+			setattr(part, attr, getattr(self, attr)[rows])
+		part.n = len(part.runs)
+		if self.target is not None:
+			part.target = self.target[rows] if isinstance(self.target, np.ndarray) else self.target
+		return part
+
+
+class BatchResult:
+	"""
+	Results and scorecards of n simulated matches between team_1 and team_2.
+	"""
+
+	def __init__(self, team_1, team_2, team_1_bats_first, innings):
+		self.team_1 = team_1
+		self.team_2 = team_2
+		self.n = len(team_1_bats_first)
+		self.team_1_bats_first = team_1_bats_first
+
+		# Innings of each team indexed by match, regardless of batting order
+		self.innings = innings
+
+		runs_1 = innings[team_1].runs
+		runs_2 = innings[team_2].runs
+
+		# 0: team_1 won, 1: team_2 won, -1: tie
+		self.winner = np.where(runs_1 > runs_2, 0, np.where(runs_2 > runs_1, 1, -1)).astype(np.int8)
+
+		first = np.where(team_1_bats_first, runs_1, runs_2)
+		second = np.where(team_1_bats_first, runs_2, runs_1)
+		second_wkts = np.where(team_1_bats_first, innings[team_2].wickets, innings[team_1].wickets)
+
+		self.chased = second > first
+		# Runs margin when defended, wickets in hand when chased
+		self.margin = np.where(self.chased, 10 - second_wkts, first - second)
+		self.margin[self.winner == -1] = 0
+
+	def take(self, rows):
+		"""
+		:param rows: match indices or a slice
+		:return: BatchResult of only the given matches
+		"""
+		return BatchResult(self.team_1, self.team_2, self.team_1_bats_first[rows],
+						   {team: inn.take(rows) for team, inn in self.innings.items()})
+
+	def win_rates(self):
+		counts = np.bincount(self.winner + 1, minlength=3)
+		return {self.team_1.name: counts[1] / self.n,
+				self.team_2.name: counts[2] / self.n,
+				"Tie": counts[0] / self.n}
+
+	def summary(self, i):
+		"""
+		:param i: match index
+		:return: summary of match i in the same layout as Match.summary
+		"""
+		summary = {}
+		for team in (self.team_1, self.team_2):
+			inn = self.innings[team]
+			summary[team] = {"Runs": int(inn.runs[i]),
+							 "Wickets": int(inn.wickets[i]),
+							 "Balls": int(inn.balls[i])}
+		return summary
+
+	def scorecards(self, i):
+		"""
+		:param i: match index
+		:return: scorecards of match i in the same layout as Match.scorecards
+		"""
+		scorecards = {}
+		for team, opp in ((self.team_1, self.team_2), (self.team_2, self.team_1)):
+			bat = self.innings[team]
+			bowl = self.innings[opp]
+			scorecards[team] = {"Bat": {}, "Bowl": {}}
+
+			for j, player in enumerate(team.lineup):
+				out = bat.bat_out[i, j]
+				scorecards[team]["Bat"][player] = \
+					{"Runs": int(bat.bat_runs[i, j]),
+					 "Balls": int(bat.bat_balls[i, j]),
+					 "Dismissal type": Match.valid_dismissals[out] if out >= 0 else None}
+
+			for j, bowler in enumerate(team.bowler_list):
+				scorecards[team]["Bowl"][bowler] = \
+					{"Balls": int(bowl.bowl_balls[i, j]),
+					 "Dots": int(bowl.bowl_dots[i, j]),
+					 "Runs": int(bowl.bowl_runs[i, j]),
+					 "Wickets": int(bowl.bowl_wkts[i, j])}
+
+		return scorecards
+
+
+class BatchSimulator(SimplisticSimulator):
+	"""
+	Plays many matches at once with the SimplisticSimulator model. Every ball
+	position is drawn for all live matches in one vectorized step.
+	"""
+
+	run_out = Match.valid_dismissals.index("run out")
+
+	@staticmethod
+	def pick_bowlers(batch, rows, weights, rng):
+		n_bowlers = len(weights)
+		eligible = batch.bowl_balls[rows] < 24
+		eligible &= np.arange(n_bowlers) != batch.prev_bowler[rows][:, None]
+
+		# Relax the quota, then the consecutive overs rule, if nobody is left
+		stuck = ~eligible.any(axis=1)
+		if stuck.any():
+			eligible[stuck] = np.arange(n_bowlers) != batch.prev_bowler[rows[stuck]][:, None]
+			stuck = ~eligible.any(axis=1)
+			eligible[stuck] = True
+
+		w = eligible * weights
+		unweighted = w.sum(axis=1) == 0
+		w[unweighted] = eligible[unweighted]
+
+		cw = np.cumsum(w, axis=1)
+		u = uniforms(rng, rows) * cw[:, -1]
+		picks = (cw <= u[:, None]).sum(axis=1)
+		return np.minimum(picks, n_bowlers - 1)
+
+	@staticmethod
+	def play_innings_batch(batch, cdf, dcdf, weights, over_phase, rng):
+		"""
+		Plays every innings of batch to completion.
+
+		:param batch: InningsBatch, updated in place
+		:param cdf: cumulative ball outcome distribution from Matchup.cdf
+		:param dcdf: cumulative dismissal distribution from Matchup.dcdf
+		:param weights: bowler selection weights
+		:param over_phase: phase slice of cdf and dcdf for each over, Matchup.over_phase
+		:param rng: numpy Generator, or a LaneStream drawing per match
+		"""
+		n_choices = cdf.shape[-1]
+		live = batch.active()
+
+		while live.any():
+			rows = np.flatnonzero(live)
+
+			# Pre over processing
+			new_over = rows[batch.bowler[rows] < 0]
+			if len(new_over):
+				batch.bowler[new_over] = BatchSimulator.pick_bowlers(batch, new_over, weights, rng)
+
+			striker = batch.striker[rows]
+			bowler = batch.bowler[rows]
+			phase = over_phase[batch.balls[rows] // 6]
+
+			if isinstance(rng, LaneStream):
+				# One counter block per ball, the second half for a dismissal
+				u, dismissal_u = rng.random2(rows)
+			else:
+				u = rng.random(len(rows))
+			ball = (cdf[phase, striker, bowler] <= u[:, None]).sum(axis=1)
+			ball = np.minimum(ball, n_choices - 1)
+
+			# Runs
+			hit = ball <= 6
+			r, s, b, runs = rows[hit], striker[hit], bowler[hit], ball[hit]
+			batch.runs[r] += runs
+			batch.bat_runs[r, s] += runs
+			batch.bat_balls[r, s] += 1
+			batch.bowl_runs[r, b] += runs
+			batch.bowl_balls[r, b] += 1
+			batch.bowl_dots[r, b] += runs == 0
+
+			odd = r[runs % 2 == 1]
+			batch.striker[odd], batch.non_striker[odd] = batch.non_striker[odd], batch.striker[odd]
+
+			# OUT
+			out = ball == 7
+			if out.any():
+				r, s, b = rows[out], striker[out], bowler[out]
+				if isinstance(rng, LaneStream):
+					du = dismissal_u[out]
+				else:
+					du = rng.random(len(r))
+				kind = (dcdf[phase[out], s, b] <= du[:, None]).sum(axis=1)
+				kind = np.minimum(kind, dcdf.shape[-1] - 1)
+
+				batch.bat_balls[r, s] += 1
+				batch.bat_out[r, s] = kind
+				batch.bowl_balls[r, b] += 1
+				batch.bowl_dots[r, b] += 1
+				batch.bowl_wkts[r, b] += kind != BatchSimulator.run_out
+
+				batch.wickets[r] += 1
+				r = r[batch.wickets[r] < 10]
+				batch.striker[r] = batch.next_in[r]
+				batch.next_in[r] += 1
+
+			# No Ball or Wide
+			extra = (ball == 8) | (ball == 9)
+			r, b = rows[extra], bowler[extra]
+			batch.runs[r] += 1
+			batch.bowl_runs[r, b] += 1
+
+			# Post over processing
+			legal = rows[ball <= 7]
+			batch.balls[legal] += 1
+			over = legal[batch.balls[legal] % 6 == 0]
+			batch.striker[over], batch.non_striker[over] = batch.non_striker[over], batch.striker[over]
+			batch.prev_bowler[over] = batch.bowler[over]
+			batch.bowler[over] = -1
+
+			live[rows] = batch.active()[rows]
+
+		return batch
+
+	@staticmethod
+	def play_batch(setup_1, setup_2, n, rng):
+		"""
+		Plays n matches from compiled tables alone, without Team objects.
+
+		:param setup_1: (cdf, dcdf, weights, over_phase) of team_1 batting against team_2
+		:param setup_2: (cdf, dcdf, weights, over_phase) of team_2 batting against team_1
+		:param n: number of matches
+		:param rng: numpy Generator, or MatchStreams to give every match its own
+					counter-based stream, independent of how matches are batched
+		:return: (team_1_bats_first, team_1 InningsBatch, team_2 InningsBatch)
+		"""
+		# Same toss split as SimplisticSimulator.toss
+		toss = rng.random(n)
+		team_1_bats_first = (toss < 0.25) | (toss >= 0.75)
+
+		innings_1 = InningsBatch(n, len(setup_1[2]))
+		innings_2 = InningsBatch(n, len(setup_2[2]))
+
+		for rows, setup_first, setup_second, out_first, out_second in \
+				((np.flatnonzero(team_1_bats_first), setup_1, setup_2, innings_1, innings_2),
+				 (np.flatnonzero(~team_1_bats_first), setup_2, setup_1, innings_2, innings_1)):
+			if len(rows) == 0:
+				continue
+
+			rng_first = rng_second = rng
+			if isinstance(rng, MatchStreams):
+				rng_first, rng_second = rng.lane(1, rows), rng.lane(2, rows)
+
+			first = InningsBatch(len(rows), len(setup_first[2]))
+			BatchSimulator.play_innings_batch(first, *setup_first, rng_first)
+
+			second = InningsBatch(len(rows), len(setup_second[2]), target=first.runs + 1)
+			BatchSimulator.play_innings_batch(second, *setup_second, rng_second)
+
+			out_first.assign(rows, first)
+			out_second.assign(rows, second)
+
+		return team_1_bats_first, innings_1, innings_2
+
+	def setups(self):
+		"""
+		:return: (cdf, dcdf, weights, over_phase) of each team batting, from the compiled matchups
+		"""
+		setups = []
+		for bat_team, bowl_team in ((self.team_1, self.team_2), (self.team_2, self.team_1)):
+			matchup = compile_matchup(bat_team, bowl_team, head_to_head=self.head_to_head)
+			setups.append((matchup.cdf, matchup.dcdf, matchup.weights, matchup.over_phase))
+		return setups
+
+	def simulate_batch(self, n, seed=None, start=None):
+		"""
+		:param n: number of matches
+		:param seed: seed for the numpy Generator
+		:param start: campaign index of the first match, to draw from per match
+					  counter-based streams instead, so e.g. simulate_batch(1, seed, start=i)
+					  replays match i of simulate_batch(n, seed, start=0)
+		:return: BatchResult
+		"""
+		if start is None:
+			rng = np.random.default_rng(seed)
+		else:
+			rng = MatchStreams.for_range(seed, start, n)
+		setup_1, setup_2 = self.setups()
+
+		team_1_bats_first, innings_1, innings_2 = BatchSimulator.play_batch(setup_1, setup_2, n, rng)
+
+		return BatchResult(self.team_1, self.team_2, team_1_bats_first,
+						   {self.team_1: innings_1, self.team_2: innings_2})
+
+
+	def simulate_from(self, state, n, seed=None):
+		"""
+		Forks n continuations of a match in progress and plays each to the end.
+
+		:param state: MatchState between team_1 and team_2
+		:param n: number of continuations
+		:param seed: seed for the numpy Generator
+		:return: BatchResult, with the innings so far included in every match
+		"""
+		rng = np.random.default_rng(seed)
+		teams = {self.team_1.name: self.team_1, self.team_2.name: self.team_2}
+		bat_first, bat_second = teams[state.bat_first], teams[state.bat_second]
+		setups = dict(zip((self.team_1, self.team_2), self.setups()))
+
+		first = InningsBatch.from_state(state, bat_first, bat_second, n)
+		if state.innings == 1:
+			BatchSimulator.play_innings_batch(first, *setups[bat_first], rng)
+			second = InningsBatch(n, len(bat_first.bowler_list), target=first.runs + 1)
+		else:
+			second = InningsBatch.from_state(state, bat_second, bat_first, n)
+		BatchSimulator.play_innings_batch(second, *setups[bat_second], rng)
+
+		team_1_bats_first = np.full(n, bat_first is self.team_1)
+		return BatchResult(self.team_1, self.team_2, team_1_bats_first,
+						   {bat_first: first, bat_second: second})
+
+
+def simulate_batch(team_1, team_2, n, seed=None, start=None):
+	"""
+	Simulates n matches between team_1 and team_2 in one vectorized batch.
+
+	:return: BatchResult holding results and scorecards of every match
+	"""
+	return BatchSimulator(team_1, team_2).simulate_batch(n, seed, start)
+
+
+def simulate_from(team_1, team_2, state, n, seed=None):
+	"""
+	Simulates n continuations of a match between team_1 and team_2 from a MatchState.
+
+	:return: BatchResult holding results and scorecards of every continuation
+	"""
+	return BatchSimulator(team_1, team_2).simulate_from(state, n, seed)
@@ -0,0 +1,209 @@
+import pandas as pd
+from phase_stats import DEFAULT_CUTS, check_cuts, phase_of
+from stats_store import bowler_dismissals, dropped_bowler_columns
+
+
+def _plain_index(index):
+    # Categorical names from chunked reads become plain labels so blocks can be summed
+    if isinstance(index, pd.CategoricalIndex):
+        index = index.astype(index.categories.dtype)
+    return index
+
+
+def _label(value):
+    # numpy integer column labels (from int8 runs) become Python ints
+    return value.item() if hasattr(value, "item") else value
+
+
+def _distribution(deliveries_df, key, value):
+    """
+    Counts of every observed value per key in one pass, one column per value.
+    """
+    counts = deliveries_df.groupby([key, value], observed=True).size().unstack(fill_value=0)
+    counts.index = _plain_index(counts.index)
+    counts.columns = [_label(c) for c in counts.columns]
+    return counts[sorted(counts.columns, key=lambda c: (isinstance(c, str), c))]
+
+
+def batting_counts(deliveries_df):
+    """
+    :return: additive per batsman counts of a block of deliveries
+    """
+    extras = deliveries_df[["noball_runs", "wide_runs"]].gt(0)
+    batsmen = deliveries_df.assign(nb=extras["noball_runs"], wd=extras["wide_runs"]) \
+        .groupby("batsman", observed=True)
+
+    counts = pd.DataFrame({"Deliveries": batsmen.size(),
+                           "No Balls": batsmen["nb"].sum(),
+                           "Wides": batsmen["wd"].sum(),
+                           "Runs": batsmen["batsman_runs"].sum()})
+    counts.index = _plain_index(counts.index)
+
+    outs = deliveries_df[deliveries_df["dismissal_kind"].notna()]
+    counts = pd.concat([counts,
+                        _distribution(deliveries_df, "batsman", "batsman_runs"),
+                        _distribution(outs, "batsman", "dismissal_kind")], axis=1)
+
+    return counts.fillna(0).astype("int64")
+
+
+def dismissed_counts(deliveries_df):
+    """
+    :return: dismissals per player_dismissed, striker or not
+    """
+    dismissed = deliveries_df["player_dismissed"].value_counts()
+    dismissed.index = _plain_index(dismissed.index)
+    return dismissed.astype("int64")
+
+
+def bowling_counts(deliveries_df):
+    """
+    :return: additive per bowler counts of a block of deliveries
+    """
+    extras = deliveries_df[["noball_runs", "wide_runs"]].gt(0)
+    bowlers = deliveries_df.assign(nb=extras["noball_runs"], wd=extras["wide_runs"]) \
+        .groupby("bowler", observed=True)
+
+    # Total runs conceded = runs off bat + noballs + wides
+    counts = pd.DataFrame({"Deliveries": bowlers.size(),
+                           "No Balls": bowlers["nb"].sum(),
+                           "Wides": bowlers["wd"].sum(),
+                           "Runs Conceded": bowlers["batsman_runs"].sum() + bowlers["noball_runs"].sum() +
+                                            bowlers["wide_runs"].sum()})
+    counts.index = _plain_index(counts.index)
+
+    outs = deliveries_df[deliveries_df["dismissal_kind"].notna()]
+    counts = pd.concat([counts,
+                        _distribution(outs, "bowler", "dismissal_kind"),
+                        _distribution(deliveries_df, "bowler", "batsman_runs")], axis=1)
+
+    return counts.fillna(0).astype("int64")
+
+
+def appearances(deliveries_df, role):
+    """
+    :param role: "batsman" or "bowler"
+    :return: unique (Name, match_id) pairs of players in that role
+    """
+    pairs = deliveries_df[[role, "match_id"]].drop_duplicates()
+    pairs.columns = ["Name", "match_id"]
+    pairs["Name"] = pairs["Name"].astype(str)
+    return pairs.reset_index(drop=True)
+
+
+def played_pairs(deliveries_df):
+    """
+    :return: unique (Name, match_id) pairs of players who batted or bowled
+    """
+    return pd.concat([appearances(deliveries_df, "batsman"),
+                      appearances(deliveries_df, "bowler")]).drop_duplicates(ignore_index=True)
+
+
+def _ordered(counts, leading):
+    runs = sorted(c for c in counts.columns if not isinstance(c, str))
+    kinds = sorted(c for c in counts.columns if isinstance(c, str) and c not in leading
+                   and c != "Deliveries")
+    return leading, runs, kinds
+
+
+def finalize_batsmen(counts, dismissed, innings):
+    """
+    Turns accumulated batting counts into batsmen_df.
+
+    :param innings: matches batted in per player
+    """
+    counts = counts.sort_index()
+    names = counts.index
+
+    batsmen_df = pd.DataFrame(index=names)
+    batsmen_df["Innings"] = innings.reindex(names, fill_value=0)
+    batsmen_df["Runs"] = counts["Runs"]
+
+    # Balls Faced = Total balls on strike - no balls - wide balls
+    batsmen_df["Balls Faced"] = counts["Deliveries"] - counts["No Balls"] - counts["Wides"]
+    batsmen_df["Dismissals"] = dismissed.reindex(names, fill_value=0)
+
+    _, runs, kinds = _ordered(counts, ["Runs", "No Balls", "Wides"])
+    batsmen_df = pd.concat([batsmen_df, counts[runs], counts[kinds]], axis=1)
+    batsmen_df = batsmen_df.fillna(0).astype(int)
+
+    # Renaming
+    batsmen_df.index.name = "Name"
+    batsmen_df.reset_index(inplace=True)
+
+    # Additional Columns
+    batsmen_df["Average"] = batsmen_df["Runs"] / batsmen_df["Dismissals"]
+    batsmen_df["Strike Rate"] = 100 * batsmen_df["Runs"] / batsmen_df["Balls Faced"]
+
+    return batsmen_df
+
+
+def finalize_bowlers(counts, matches):
+    """
+    Turns accumulated bowling counts into bowlers_df.
+
+    :param matches: matches per player, those a player bowled in or batted in
+    """
+    counts = counts.sort_index()
+    names = counts.index
+
+    _, runs, kinds = _ordered(counts, ["Runs Conceded", "No Balls", "Wides"])
+
+    bowlers_df = pd.DataFrame(index=names)
+    bowlers_df["Matches"] = matches.reindex(names, fill_value=0)
+    bowlers_df["Wickets"] = counts[[d for d in bowler_dismissals if d in kinds]].sum(axis=1)
+
+    # Num balls = balls bowled - no balls - wides
+    bowlers_df["Balls Bowled"] = counts["Deliveries"] - counts["No Balls"] - counts["Wides"]
+    bowlers_df["Runs Conceded"] = counts["Runs Conceded"]
+    bowlers_df["No Balls"] = counts["No Balls"]
+    bowlers_df["Wides"] = counts["Wides"]
+
+    bowlers_df = pd.concat([bowlers_df, counts[kinds], counts[runs]], axis=1)
+    bowlers_df = bowlers_df.fillna(0).astype(int)
+
+    # Renaming
+    bowlers_df.index.name = "Name"
+    bowlers_df.reset_index(inplace=True)
+
+    # Additional Columns
+    bowlers_df["Average"] = bowlers_df["Runs Conceded"] / bowlers_df["Wickets"]
+    bowlers_df["Strike Rate"] = bowlers_df["Balls Bowled"] / bowlers_df["Wickets"]
+    bowlers_df["Economy"] = 6 * bowlers_df["Runs Conceded"] / bowlers_df["Balls Bowled"]
+
+    bowlers_df = bowlers_df.drop(dropped_bowler_columns, axis=1, errors="ignore")
+
+    return bowlers_df
+
+
+def build_batsmen_df(deliveries_df):
+    return finalize_batsmen(batting_counts(deliveries_df), dismissed_counts(deliveries_df),
+                            appearances(deliveries_df, "batsman").groupby("Name").size())
+
+
+def build_bowlers_df(deliveries_df):
+    return finalize_bowlers(bowling_counts(deliveries_df), played_pairs(deliveries_df).groupby("Name").size())
+
+
+def build_player_stats(deliveries_df):
+    """
+    Aggregates ball by ball deliveries into the batsmen and bowlers tables
+    consumed by Player, using a fixed number of groupby passes.
+
+    :param deliveries_df: deliveries.csv as a DataFrame
+    :return: (batsmen_df, bowlers_df)
+    """
+    return build_batsmen_df(deliveries_df), build_bowlers_df(deliveries_df)
+
+
+def build_phase_stats(deliveries_df, cuts=DEFAULT_CUTS):
+    """
+    Player stats of every phase of the innings, split on the over of each
+    delivery, with the same columns as build_player_stats.
+
+    :param cuts: last over of every phase but the last, the default giving
+                 powerplay, middle and death overs
+    :return: list of (batsmen_df, bowlers_df), one per phase
+    """
+    phase = phase_of(deliveries_df["over"].to_numpy(), check_cuts(cuts))
+    return [build_player_stats(deliveries_df[phase == p]) for p in range(len(cuts) + 1)]
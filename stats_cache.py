@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+import numpy as np
+from stats_store import PlayerStatsStore, StatsTable
+
+
+# Bump whenever the layout of the cache or of the stats tables changes
+SCHEMA_VERSION = 1
+
+MANIFEST = "manifest.json"
+
+
+def file_hash(path, block_size=1 << 20):
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def read_manifest(cache_dir):
+    try:
+        with open(os.path.join(cache_dir, MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def source_fingerprint(path, recorded=None):
+    """
+    :param recorded: fingerprint recorded in cache metadata
+    :return: (size, mtime_ns, sha256) of path. The recorded hash is reused when
+             size and mtime are unchanged.
+    """
+    st = os.stat(path)
+    if recorded is not None and recorded.get("source_size") == st.st_size and \
+            recorded.get("source_mtime_ns") == st.st_mtime_ns:
+        return st.st_size, st.st_mtime_ns, recorded["source_sha256"]
+    return st.st_size, st.st_mtime_ns, file_hash(path)
+
+
+def source_fingerprints(sources, meta=None):
+    """
+    :param sources: dict of source name -> path, missing files are left out
+    :param meta: cache metadata whose recorded fingerprints may be reused
+    :return: dict of source name -> fingerprint, as recorded in cache metadata
+    """
+    recorded = (meta or {}).get("sources", {})
+    fingerprints = {}
+    for name, path in sources.items():
+        if path is None or not os.path.exists(path):
+            continue
+        size, mtime_ns, sha = source_fingerprint(path, recorded.get(name))
+        fingerprints[name] = {"source_size": size, "source_mtime_ns": mtime_ns, "source_sha256": sha}
+    return fingerprints
+
+
+def is_fresh(meta, fingerprints, version):
+    """
+    :param meta: cache metadata, None if there is no readable cache
+    :param fingerprints: source_fingerprints of the files the cache must have been built from.
+                         Missing files have nothing to compare against, the cache is trusted.
+    :param version: format version the cache must carry
+    """
+    if meta is None or meta.get("version") != version:
+        return False
+    recorded = meta.get("sources", {})
+    return all(recorded.get(name, {}).get("source_sha256") == fingerprint["source_sha256"]
+               for name, fingerprint in fingerprints.items())
+
+
+def load_or_rebuild(path, sources, version, read_meta, load, build, save=None):
+    """
+    Loads the cache at path, or rebuilds and saves it when it is missing, of
+    another version, or was built from different source files.
+
+    :param path: cache file or directory
+    :param sources: dict of source name -> path the cache is built from
+    :param version: format version the cache must carry
+    :param read_meta: callable(path) -> cache metadata, None if unreadable
+    :param load: callable(path) -> cached object
+    :param build: callable() -> rebuilt object, imports pandas itself if needed
+    :param save: callable(obj, path, fingerprints), obj.save(path, fingerprints) by default
+    :return: the cached or rebuilt object
+    """
+    meta = read_meta(path)
+    fingerprints = source_fingerprints(sources, meta)
+    if is_fresh(meta, fingerprints, version):
+        return load(path)
+
+    obj = build()
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    if save is None:
+        obj.save(path, fingerprints)
+    else:
+        save(obj, path, fingerprints)
+    return obj
+
+
+def write_stats_cache(store, cache_dir, sources=None):
+    """
+    Writes every column of store as its own typed .npy file, then the manifest.
+
+    :param store: PlayerStatsStore
+    :param cache_dir: output directory
+    :param sources: dict of source name -> fingerprint the stats were built from
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+
+    manifest = {"version": SCHEMA_VERSION, "sources": sources or {}, "tables": {}}
+    for table_name, table in (("batting", store.batting_table), ("bowling", store.bowling_table)):
+        columns = []
+        for i, (key, values) in enumerate(table.columns.items()):
+            filename = f"{table_name}_{i:03d}.npy"
+            np.save(os.path.join(cache_dir, filename), np.ascontiguousarray(values))
+            # JSON keys are strings, run columns are ints
+            columns.append({"key": key, "key_type": type(key).__name__, "file": filename})
+        manifest["tables"][table_name] = {"rows": len(table), "columns": columns}
+
+    # Written last and atomically, a readable manifest marks a complete cache
+    tmp = os.path.join(cache_dir, MANIFEST + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=1)
+    os.replace(tmp, os.path.join(cache_dir, MANIFEST))
+
+    return manifest
+
+
+def read_stats_cache(cache_dir, manifest=None):
+    """
+    :return: PlayerStatsStore whose columns are memory-mapped, read-only .npy files
+    """
+    if manifest is None:
+        manifest = read_manifest(cache_dir)
+
+    tables = []
+    for table_name in ("batting", "bowling"):
+        columns = {}
+        for column in manifest["tables"][table_name]["columns"]:
+            key = int(column["key"]) if column["key_type"] == "int" else column["key"]
+            columns[key] = np.load(os.path.join(cache_dir, column["file"]), mmap_mode="r")
+        tables.append(StatsTable(columns["Name"].tolist(), columns))
+
+    return PlayerStatsStore(*tables)
+
+
+def build_stats(deliveries_path):
+    """
+    :return: PlayerStatsStore built from deliveries_path
+    """
+    # Only pay for pandas when the cache has to be rebuilt
+    from ingest import ingest_csv
+
+    return PlayerStatsStore.from_frames(*ingest_csv(deliveries_path).to_frames())
+
+
+def load_stats(deliveries_path, cache_dir="stats_cache"):
+    """
+    Loads player stats from the columnar cache, rebuilding the cache from
+    deliveries_path first if it is missing, of an older schema, or was built
+    from a different deliveries file.
+
+    :return: PlayerStatsStore
+    """
+    return load_or_rebuild(cache_dir, {"deliveries": deliveries_path}, SCHEMA_VERSION, read_manifest,
+                           read_stats_cache, lambda: build_stats(deliveries_path), write_stats_cache)
@@ -0,0 +1,175 @@
+import weakref
+from collections.abc import Mapping
+import numpy as np
+
+
+bowler_dismissals = ['bowled', 'caught', 'caught and bowled', 'lbw', 'stumped']
+
+# Dismissal kinds left out of bowlers_df, as in the original preprocessing
+dropped_bowler_columns = ["retired hurt", "hit wicket", "obstructing the field", "run out"]
+
+
+class StatsTable:
+    """
+    One stats table (batting or bowling) held as one contiguous NumPy array
+    per column, with players addressed by integer ID.
+    """
+
+    def __init__(self, names, columns):
+        """
+        :param names: player names, row i of every column belongs to names[i]
+        :param columns: dict of column key -> 1-D array, in display order
+        """
+        self.names = list(names)
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        self.columns = columns
+
+    @staticmethod
+    def from_frame(df):
+        columns = {}
+        for key in df.columns:
+            values = df[key].to_numpy()
+            if values.dtype == object or not np.issubdtype(values.dtype, np.number):
+                values = np.asarray(values, dtype=str)
+            columns[key] = np.ascontiguousarray(values)
+        return StatsTable(df["Name"], columns)
+
+    def __len__(self):
+        return len(self.names)
+
+    def row(self, name):
+        """
+        :return: StatsRow of name, reading 0 for every column if name is unknown
+        """
+        return StatsRow(self, self.ids.get(name, -1))
+
+
+class StatsRow(Mapping):
+    """
+    Read-only, dict-like view of one player's row in a StatsTable.
+    """
+
+    __slots__ = ("table", "row")
+
+    def __init__(self, table, row):
+        self.table = table
+        self.row = row
+
+    def __getitem__(self, key):
+        column = self.table.columns[key]
+        if self.row < 0:
+            # Player missing from the table, as in the original DataFrame lookup
+            return 0
+        return column[self.row].item()
+
+    def __iter__(self):
+        return iter(self.table.columns)
+
+    def __len__(self):
+        return len(self.table.columns)
+
+    def __repr__(self):
+        return repr(dict(self))
+
+
+class PlayerStatsStore:
+    """
+    Batting and bowling stats of every player, indexed by name or integer ID.
+    """
+
+    # Stores built from DataFrames, keyed by the ids of the frames
+    _from_frames = {}
+
+    def __init__(self, batting, bowling):
+        """
+        :param batting: StatsTable built from batsmen_df
+        :param bowling: StatsTable built from bowlers_df
+        """
+        self.batting_table = batting
+        self.bowling_table = bowling
+
+    @staticmethod
+    def from_frames(batsmen_df, bowlers_df):
+        return PlayerStatsStore(StatsTable.from_frame(batsmen_df), StatsTable.from_frame(bowlers_df))
+
+    @staticmethod
+    def for_frames(batsmen_df, bowlers_df):
+        """
+        Returns the store of the given frames, building it on first use only.
+        The frames are treated as read-only afterwards.
+        """
+        key = (id(batsmen_df), id(bowlers_df))
+        cached = PlayerStatsStore._from_frames.get(key)
+        if cached is not None and cached[0]() is batsmen_df and cached[1]() is bowlers_df:
+            return cached[2]
+
+        store = PlayerStatsStore.from_frames(batsmen_df, bowlers_df)
+        drop = lambda _: PlayerStatsStore._from_frames.pop(key, None)
+        PlayerStatsStore._from_frames[key] = (weakref.ref(batsmen_df, drop),
+                                              weakref.ref(bowlers_df, drop), store)
+        return store
+
+    def batting(self, player):
+        """
+        :param player: name or batting ID
+        """
+        if isinstance(player, str):
+            return self.batting_table.row(player)
+        return StatsRow(self.batting_table, player)
+
+    def bowling(self, player):
+        """
+        :param player: name or bowling ID
+        """
+        if isinstance(player, str):
+            return self.bowling_table.row(player)
+        return StatsRow(self.bowling_table, player)
+
+    def batting_id(self, name):
+        return self.batting_table.ids.get(name, -1)
+
+    def bowling_id(self, name):
+        return self.bowling_table.ids.get(name, -1)
+
+
+def shrink_table(table, career, balls_key, strength, keep=("Name", "Average", "Strike Rate", "Economy")):
+    """
+    Counts of a slice of the stats (a venue, a season, a phase of the innings)
+    for every player of career, shrunk towards the player's career rates as
+    if strength more balls had been played at them:
+    count + strength * career count / career balls. Players missing from the
+    slice read their career rates alone.
+
+    :param table: StatsTable of the slice
+    :param career: StatsTable over every context
+    :param balls_key: column of legal balls, "Balls Faced" or "Balls Bowled"
+    :param keep: columns taken from table as they are
+    :return: StatsTable with the rows of career
+    """
+    rows = np.array([table.ids.get(name, -1) for name in career.names], dtype=np.int64)
+    known = rows >= 0
+    balls = np.asarray(career.columns[balls_key], dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        weight = np.where(balls > 0, strength / balls, 0.0)
+
+    columns = {}
+    for key, values in career.columns.items():
+        if key == "Name":
+            columns[key] = values
+            continue
+        counts = np.zeros(len(career), dtype=np.float64)
+        if key in table.columns:
+            counts[known] = table.columns[key][rows[known]]
+        if key not in keep:
+            counts += weight * values
+        columns[key] = counts
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if balls_key == "Balls Faced":
+            columns["Average"] = columns["Runs"] / columns["Dismissals"]
+            columns["Strike Rate"] = 100 * columns["Runs"] / columns["Balls Faced"]
+        else:
+            columns["Average"] = columns["Runs Conceded"] / columns["Wickets"]
+            columns["Strike Rate"] = columns["Balls Bowled"] / columns["Wickets"]
+            columns["Economy"] = 6 * columns["Runs Conceded"] / columns["Balls Bowled"]
+    return StatsTable(career.names, columns)
@@ -0,0 +1,142 @@
+import hashlib
+import json
+import os
+import numpy as np
+from game_tools import Team
+from matchups import Matchup, compile_matchup, seed_matchup
+from stats_cache import SCHEMA_VERSION, is_fresh, load_stats, read_manifest, read_stats_cache, source_fingerprints
+from stats_store import PlayerStatsStore, StatsTable
+
+
+# Bump whenever the bundle layout or the compiled tables change
+BUNDLE_VERSION = 2
+
+
+def read_lineups(path):
+    """
+    Reads team definitions from a JSON or TOML file of the form
+
+        {"teams": [{"name": ..., "abbrev": ..., "captain": ..., "wk": ...,
+                    "lineup": [11 player names]}, ...]}
+
+    :return: list of team dicts
+    """
+    if path.endswith(".toml"):
+        import tomllib
+        with open(path, "rb") as f:
+            spec = tomllib.load(f)
+    else:
+        with open(path) as f:
+            spec = json.load(f)
+    return spec["teams"]
+
+
+def bundle_key(lineup_path, manifest):
+    """
+    :return: hash of the lineup file, the stats it resolves against and the bundle layout
+    """
+    sha = hashlib.sha256()
+    with open(lineup_path, "rb") as f:
+        sha.update(f.read())
+    # Source hashes only, touching the deliveries file keeps the bundle
+    shas = {name: source["source_sha256"] for name, source in manifest.get("sources", {}).items()}
+    stats = json.dumps(shas or manifest["tables"], sort_keys=True)
+    sha.update(f"{stats}:{SCHEMA_VERSION}:{BUNDLE_VERSION}".encode())
+    return sha.hexdigest()[:16]
+
+
+def subset_table(table, players):
+    """
+    :return: StatsTable holding only the rows of players found in table
+    """
+    names = [p for p in players if p in table.ids]
+    rows = [table.ids[p] for p in names]
+    return StatsTable(names, {key: np.asarray(values)[rows] for key, values in table.columns.items()})
+
+
+def make_teams(specs, store):
+    teams = {}
+    for spec in specs:
+        team = Team(spec["name"], list(spec["lineup"]), abbrev=spec.get("abbrev"),
+                    captain=spec.get("captain"), wk=spec.get("wk"))
+        team.generate_team(store)
+        teams[team.name] = team
+    return teams
+
+
+def write_bundle(specs, store, path):
+    """
+    Resolves the stats of every listed player and compiles the matchup tables
+    of every ordered pair of teams into one .npz file.
+    """
+    players = sorted({p for spec in specs for p in spec["lineup"]})
+    store = PlayerStatsStore(subset_table(store.batting_table, players),
+                             subset_table(store.bowling_table, players))
+    teams = make_teams(specs, store)
+
+    arrays = {}
+    meta = {"teams": specs, "tables": {}, "pairs": []}
+    for table_name, table in (("batting", store.batting_table), ("bowling", store.bowling_table)):
+        columns = []
+        for i, (key, values) in enumerate(table.columns.items()):
+            arrays[f"{table_name}_{i:03d}"] = np.ascontiguousarray(values)
+            columns.append({"key": key, "key_type": type(key).__name__})
+        meta["tables"][table_name] = columns
+
+    for k, (bat_name, bowl_name) in enumerate((a, b) for a in teams for b in teams if a != b):
+        matchup = compile_matchup(teams[bat_name], teams[bowl_name])
+        for name in Matchup.array_names:
+            arrays[f"pair_{k:03d}_{name}"] = getattr(matchup, name)
+        meta["pairs"].append([bat_name, bowl_name])
+
+    arrays["meta"] = np.array(json.dumps(meta))
+    tmp = path + ".tmp.npz"
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+    return teams
+
+
+def read_bundle(path):
+    """
+    :return: dict of team name to Team, with their compiled matchups already cached
+    """
+    with np.load(path) as data:
+        meta = json.loads(data["meta"].item())
+
+        tables = []
+        for table_name in ("batting", "bowling"):
+            columns = {}
+            for i, column in enumerate(meta["tables"][table_name]):
+                key = int(column["key"]) if column["key_type"] == "int" else column["key"]
+                columns[key] = data[f"{table_name}_{i:03d}"]
+            tables.append(StatsTable(columns["Name"].tolist(), columns))
+
+        teams = make_teams(meta["teams"], PlayerStatsStore(*tables))
+
+        for k, (bat_name, bowl_name) in enumerate(meta["pairs"]):
+            arrays = {name: data[f"pair_{k:03d}_{name}"] for name in Matchup.array_names}
+            bat_team, bowl_team = teams[bat_name], teams[bowl_name]
+            seed_matchup(bat_team, bowl_team, Matchup.from_arrays(bat_team, bowl_team, arrays))
+
+    return teams
+
+
+def load_teams(lineup_path, deliveries_path="data/deliveries.csv", cache_dir="stats_cache"):
+    """
+    Loads the teams of a lineup file from its cached bundle, building the
+    bundle (and the stats cache, if stale) only when the lineup file or the
+    stats changed.
+
+    :return: dict of team name to Team
+    """
+    manifest = read_manifest(cache_dir)
+    if not is_fresh(manifest, source_fingerprints({"deliveries": deliveries_path}, manifest), SCHEMA_VERSION):
+        load_stats(deliveries_path, cache_dir)
+        manifest = read_manifest(cache_dir)
+
+    path = os.path.join(cache_dir, "bundles", bundle_key(lineup_path, manifest) + ".npz")
+    if os.path.exists(path):
+        return read_bundle(path)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return write_bundle(read_lineups(lineup_path), read_stats_cache(cache_dir, manifest), path)
@@ -0,0 +1,95 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+# The modules live at the top of the repo, run the tests from anywhere
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.synthetic import synthetic_deliveries
+from game_tools import Match, Team
+
+
+# 0 to 6 runs per legal ball faced, roughly as in the IPL
+RUN_WEIGHTS = [0.36, 0.35, 0.07, 0.01, 0.12, 0.005, 0.05]
+
+
+def synthetic_stats(n_players=40, seed=0):
+    """
+    batsmen_df and bowlers_df with random career counts for players named
+    "Player 0000" onwards. Players at even positions of every block of
+    11 bowl, the others barely do.
+
+    :return: (batsmen_df, bowlers_df)
+    """
+    rng = np.random.default_rng(seed)
+    names = [f"Player {i:04d}" for i in range(n_players)]
+    kinds = Match.valid_dismissals
+
+    batting = []
+    for name in names:
+        balls = int(rng.integers(300, 2000))
+        runs = rng.multinomial(balls, rng.dirichlet(np.array(RUN_WEIGHTS) * 200))
+        dismissals = int(rng.binomial(balls, rng.uniform(0.03, 0.07)))
+        row = {"Name": name, "Innings": balls // 20, "Runs": int(np.dot(np.arange(7), runs)),
+               "Balls Faced": balls, "Dismissals": dismissals}
+        row.update({r: int(c) for r, c in enumerate(runs)})
+        row.update(zip(kinds, rng.multinomial(dismissals, [0.15, 0.6, 0.02, 0.07, 0.03, 0.13]).tolist()))
+        batting.append(row)
+
+    bowling = []
+    for i, name in enumerate(names):
+        balls = int(rng.integers(400, 2500)) if i % 11 % 2 == 0 else int(rng.integers(0, 40))
+        runs = rng.multinomial(balls, rng.dirichlet(np.array(RUN_WEIGHTS) * 200))
+        wickets = rng.multinomial(int(rng.binomial(balls, rng.uniform(0.03, 0.06))),
+                                  [0.15, 0.6, 0.02, 0.07, 0.03]).tolist()
+        no_balls, wides = (int(x) for x in rng.binomial(balls, [0.005, 0.03]))
+        row = {"Name": name, "Matches": max(balls // 24, 1), "Wickets": sum(wickets), "Balls Bowled": balls,
+               "Runs Conceded": int(np.dot(np.arange(7), runs)) + no_balls + wides,
+               "No Balls": no_balls, "Wides": wides}
+        row.update(zip(kinds[:-1], wickets))
+        row.update({r: int(c) for r, c in enumerate(runs)})
+        bowling.append(row)
+
+    batsmen_df = pd.DataFrame(batting)
+    batsmen_df["Average"] = batsmen_df["Runs"] / batsmen_df["Dismissals"]
+    batsmen_df["Strike Rate"] = 100 * batsmen_df["Runs"] / batsmen_df["Balls Faced"]
+    bowlers_df = pd.DataFrame(bowling)
+    bowlers_df["Average"] = bowlers_df["Runs Conceded"] / bowlers_df["Wickets"]
+    bowlers_df["Strike Rate"] = bowlers_df["Balls Bowled"] / bowlers_df["Wickets"]
+    bowlers_df["Economy"] = 6 * bowlers_df["Runs Conceded"] / bowlers_df["Balls Bowled"]
+    return batsmen_df, bowlers_df
+
+
+def synthetic_team(name, players, batsmen_df, bowlers_df):
+    """
+    :param players: indices of the 11 players, in batting order
+    """
+    lineup = [f"Player {i:04d}" for i in players]
+    team = Team(name, lineup, abbrev=name[:3].upper())
+    team.generate_team(batsmen_df, bowlers_df)
+    return team
+
+
+@pytest.fixture(scope="session")
+def stats():
+    return synthetic_stats()
+
+
+@pytest.fixture(scope="session")
+def teams(stats):
+    """
+    Two teams of six bowlers each
+    """
+    return (synthetic_team("Synthetic XI", range(0, 11), *stats),
+            synthetic_team("Random XI", range(11, 22), *stats))
+
+
+@pytest.fixture(scope="session")
+def deliveries():
+    """
+    Small synthetic deliveries.csv frame, match ids 1 to 200
+    """
+    return synthetic_deliveries(200, n_players=60)
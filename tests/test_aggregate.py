@@ -0,0 +1,78 @@
+import random
+import numpy as np
+import pytest
+from aggregate import Histogram, OutcomeAggregator, wilson_interval
+from simulators import SimplisticSimulator, simulate_batch
+
+
+def state(agg):
+    """
+    Everything an aggregator counts, comparable with ==
+    """
+    hists = lambda table: {k: h.counts.tolist() for k, h in table.items()}
+    return (agg.n, agg.wins, agg.ties, agg.bat_first_wins, agg.first_innings.counts.tolist(),
+            agg.second_innings.counts.tolist(), hists(agg.scores), agg.runs_margin.counts.tolist(),
+            agg.wickets_margin.counts.tolist(), hists(agg.player_runs), hists(agg.player_wickets))
+
+
+def aggregator(teams):
+    return OutcomeAggregator(teams[0].name, teams[1].name)
+
+
+def test_merged_batches_equal_one_aggregate(teams):
+    batches = [simulate_batch(*teams, 500, seed=seed) for seed in (1, 2, 3)]
+    whole = aggregator(teams)
+    for batch in batches:
+        whole.add_batch(batch)
+
+    shards = []
+    for batch in batches:
+        shards.append(aggregator(teams))
+        shards[-1].add_batch(batch)
+    merged = shards[0]
+    for shard in shards[1:]:
+        merged.merge(shard)
+    assert state(merged) == state(whole)
+    assert merged.summary() == whole.summary()
+
+
+def test_batch_counts(teams):
+    batch = simulate_batch(*teams, 500, seed=1)
+    agg = aggregator(teams)
+    agg.add_batch(batch)
+    runs = batch.innings[teams[0]].runs
+    assert agg.n == 500 and agg.scores[teams[0].name].counts.sum() == 500
+    assert agg.scores[teams[0].name].mean() == pytest.approx(runs.mean())
+    assert agg.wins[teams[0].name] + agg.wins[teams[1].name] + agg.ties == 500
+    assert agg.win_rate(teams[0].name)[0] == pytest.approx(batch.win_rates()[teams[0].name])
+    player = teams[0].lineup[0]
+    assert agg.player_runs[player].mean() == pytest.approx(batch.innings[teams[0]].bat_runs[:, 0].mean())
+
+
+def test_merged_matches_equal_one_aggregate(teams):
+    random.seed(3)
+    sim = SimplisticSimulator(*teams, telemetry="scorecard")
+    whole, shards = aggregator(teams), [aggregator(teams), aggregator(teams)]
+    for i in range(40):
+        result = sim.play_match()
+        for agg in (whole, shards[i % 2]):
+            agg.add_result(result)
+            agg.add_scorecards(sim.match.scorecards)
+    assert state(shards[0].merge(shards[1])) == state(whole)
+    assert whole.first_innings.n == 40
+
+
+def test_histogram():
+    hist = Histogram(5)
+    hist.add([0, 1, 1, 2, 9, -1])
+    hist.add_one(3)
+    assert hist.counts.tolist() == [2, 2, 1, 1, 1]
+    assert hist.quantile(0.5) == 1 and hist.quantile(1.0) == 4
+    assert np.isnan(Histogram(3).mean())
+
+
+def test_wilson_interval():
+    low, high = wilson_interval(50, 100)
+    assert low < 0.5 < high and high - low == pytest.approx(0.19, abs=0.01)
+    assert wilson_interval(0, 0) == (0.0, 1.0)
+    assert wilson_interval(0, 10)[0] == 0.0
@@ -0,0 +1,83 @@
+import copy
+import random
+import pytest
+from ball_log import BallLog
+from game_tools import Match
+from simulators import SimplisticSimulator
+
+
+def legacy_delivery(match_id, inning, over, ball, batting_team, bowling_team, batsman, non_striker, bowler,
+                    batsman_runs=0, wide_runs=0, noball_runs=0, dismissal=-1, player_dismissed=None):
+    """
+    One delivery as play_innings logged it before BallLog, a filled in copy of Match.template
+    """
+    delivery = copy.deepcopy(Match.template)
+    delivery.update(match_id=match_id, inning=inning, over=over, ball=ball, batting_team=batting_team,
+                    bowling_team=bowling_team, batsman=batsman, non_striker=non_striker, bowler=bowler,
+                    batsman_runs=batsman_runs, wide_runs=wide_runs, noball_runs=noball_runs,
+                    extra_runs=wide_runs + noball_runs, total_runs=batsman_runs + wide_runs + noball_runs)
+    if dismissal >= 0:
+        delivery.update(player_dismissed=player_dismissed, dismissal_kind=Match.valid_dismissals[dismissal])
+    return delivery
+
+
+def random_deliveries(n, seed=0):
+    rng = random.Random(seed)
+    rows = []
+    for i in range(n):
+        match_id, inning = 1 + i // 60, 1 + i % 60 // 30
+        kind = rng.choice(["runs", "wide", "no ball", "out"])
+        row = [match_id, inning, 1 + i % 30 // 6, 1 + i % 6, f"Team {inning}", f"Team {3 - inning}",
+               f"Batsman {rng.randrange(11)}", f"Batsman {rng.randrange(11)}", f"Bowler {rng.randrange(6)}",
+               rng.randrange(7) if kind == "runs" else 0, int(kind == "wide"), int(kind == "no ball")]
+        if kind == "out":
+            row += [rng.randrange(len(Match.valid_dismissals)), row[6]]
+        rows.append(row)
+    return rows
+
+
+def test_rows_read_back_as_the_old_dicts():
+    rows = random_deliveries(500)
+    log = BallLog(capacity=4)
+    for row in rows:
+        log.append(*row)
+    assert len(log) == 500
+    assert [dict(row) for row in log] == [legacy_delivery(*row) for row in rows]
+    assert dict(log[-1]) == legacy_delivery(*rows[-1])
+    with pytest.raises(IndexError):
+        log[500]
+
+
+def test_views_and_extend():
+    rows = random_deliveries(300)
+    log = BallLog()
+    for row in rows:
+        log.append(*row)
+
+    match = log.match(3)
+    assert [dict(row) for row in match] == [legacy_delivery(*row) for row in rows if row[0] == 3]
+    second = log.innings(3, 2)
+    assert all(row["inning"] == 2 for row in second) and len(second) == 30
+    assert log.index(second[0]) == 150
+
+    # Names are remapped into the other log's table
+    other = BallLog()
+    other.append(*random_deliveries(1, seed=1)[0])
+    other.extend(match)
+    assert other.names is not log.names
+    assert [dict(row) for row in other[1:]] == [dict(row) for row in match]
+
+
+def test_match_log_writes_the_same_commentary(teams):
+    random.seed(0)
+    sim = SimplisticSimulator(*teams)
+    sim.play_match()
+    log = sim.deliveries.match(sim.match.match_id)
+    legacy = [dict(row) for row in log]
+    assert [row["total_runs"] for row in legacy if row["inning"] == 1] and \
+        sum(row["total_runs"] for row in legacy if row["inning"] == 1) == sim.match.summary[sim.bat_first]["Runs"]
+
+    target = sim.match.summary[sim.bat_first]["Runs"] + 1
+    for innings, bat_team, bowl_team in ((1, sim.bat_first, sim.bat_second), (2, sim.bat_second, sim.bat_first)):
+        assert Match.write_deliveries(log, bat_team, bowl_team, innings, target) == \
+            Match.write_deliveries(legacy, bat_team, bowl_team, innings, target)
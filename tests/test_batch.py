@@ -0,0 +1,86 @@
+import random
+import numpy as np
+import pytest
+from simulators import BatchSimulator, InningsBatch, SimplisticSimulator, simulate_batch
+
+
+N_SCALAR = 300
+N_BATCH = 4000
+
+
+@pytest.fixture(scope="module")
+def batch(teams):
+    return simulate_batch(*teams, N_BATCH, seed=1)
+
+
+def scalar_first_innings(teams, n, seed=0):
+    """
+    :return: (team batting first, first innings runs and wickets of n scalar matches)
+    """
+    random.seed(seed)
+    sim = SimplisticSimulator(*teams)
+    totals = []
+    for i in range(n):
+        sim.play_match()
+        summary = sim.match.summary[sim.bat_first]
+        totals.append((summary["Runs"], summary["Wickets"]))
+    return sim.bat_first, np.array(totals)
+
+
+def test_same_seed_same_matches(teams, batch):
+    again = simulate_batch(*teams, N_BATCH, seed=1)
+    np.testing.assert_array_equal(again.team_1_bats_first, batch.team_1_bats_first)
+    for team in teams:
+        for name in InningsBatch.arrays:
+            np.testing.assert_array_equal(getattr(again.innings[team], name), getattr(batch.innings[team], name))
+
+
+def test_scorecards_add_up(teams, batch):
+    for team, opp in (teams, teams[::-1]):
+        bat, bowl = batch.innings[team], batch.innings[opp]
+        assert (bat.balls <= 120).all() and (bat.wickets <= 10).all()
+        assert (bat.bowl_runs.sum(axis=1) == bat.runs).all()
+        assert (bat.bowl_balls.sum(axis=1) == bat.balls).all()
+        assert (bat.bat_balls.sum(axis=1) == bat.balls).all()
+        assert (bat.bat_runs.sum(axis=1) <= bat.runs).all()
+        assert ((bat.bat_out >= 0).sum(axis=1) == bat.wickets).all()
+        run_outs = (bat.bat_out == BatchSimulator.run_out).sum(axis=1)
+        assert (bat.bowl_wkts.sum(axis=1) + run_outs == bat.wickets).all()
+        assert (bat.bowl_balls <= 24).all()
+        # Lineup positions come in order
+        assert ((bat.bat_balls > 0).sum(axis=1) <= np.minimum(bat.wickets + 2, 11)).all()
+        assert bowl is not bat
+
+
+def test_results_follow_the_runs(teams, batch):
+    runs_1, runs_2 = batch.innings[teams[0]].runs, batch.innings[teams[1]].runs
+    np.testing.assert_array_equal(batch.winner == 0, runs_1 > runs_2)
+    np.testing.assert_array_equal(batch.winner == 1, runs_2 > runs_1)
+    second = np.where(batch.team_1_bats_first, runs_2, runs_1)
+    first = np.where(batch.team_1_bats_first, runs_1, runs_2)
+    # The chase stops at the target
+    assert (second <= first + 7).all()
+    assert sum(batch.win_rates().values()) == pytest.approx(1.0)
+
+    summary, scorecards = batch.summary(7), batch.scorecards(7)
+    for team in teams:
+        assert summary[team]["Runs"] == int(batch.innings[team].runs[7])
+        assert sum(card["Balls"] for card in scorecards[team]["Bat"].values()) == summary[team]["Balls"]
+
+
+def test_matches_scalar_simulator(teams, batch):
+    bat_first, scalar = scalar_first_innings(teams, N_SCALAR)
+    rows = batch.team_1_bats_first if bat_first is teams[0] else ~batch.team_1_bats_first
+    runs = batch.innings[bat_first].runs[rows]
+    wickets = batch.innings[bat_first].wickets[rows]
+
+    se = np.sqrt(scalar[:, 0].var() / N_SCALAR + runs.var() / len(runs))
+    assert abs(scalar[:, 0].mean() - runs.mean()) < 4 * se
+    se = np.sqrt(scalar[:, 1].var() / N_SCALAR + wickets.var() / len(wickets))
+    assert abs(scalar[:, 1].mean() - wickets.mean()) < 4 * se
+
+    # Two sample Kolmogorov-Smirnov distance, within its 0.1% critical value
+    grid = np.arange(max(scalar[:, 0].max(), runs.max()) + 1)
+    ks = np.abs(np.searchsorted(np.sort(scalar[:, 0]), grid, side="right") / N_SCALAR -
+                np.searchsorted(np.sort(runs), grid, side="right") / len(runs)).max()
+    assert ks < 1.95 * np.sqrt((N_SCALAR + len(runs)) / (N_SCALAR * len(runs)))
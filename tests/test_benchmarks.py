@@ -0,0 +1,45 @@
+import pytest
+from benchmarks import run_all
+from simulators import SimplisticSimulator
+from stats_builder import build_player_stats
+from stats_store import PlayerStatsStore
+
+
+@pytest.fixture(scope="module")
+def store(deliveries):
+    return PlayerStatsStore.from_frames(*build_player_stats(deliveries))
+
+
+@pytest.fixture(scope="module")
+def bench_teams(store):
+    return run_all.synthetic_teams(store)
+
+
+def test_synthetic_teams_can_bowl_their_overs(bench_teams):
+    team_1, team_2 = bench_teams
+    assert not set(team_1.lineup) & set(team_2.lineup)
+    for team in bench_teams:
+        assert len(team.bowler_list) >= 5
+        assert team.captain == team.lineup[0] and team.wk == team.lineup[1]
+
+
+def test_bench_matches(bench_teams):
+    result = run_all.bench_matches(*bench_teams, 5)
+    assert set(result) == set(SimplisticSimulator.telemetry_levels) | {"batch"}
+    assert result["batch"]["matches"] == 100
+    for row in result.values():
+        assert row["matches_per_sec"] > 0 and row["balls_per_sec"] > row["matches_per_sec"]
+
+
+def test_bench_setup_and_reports(bench_teams, store):
+    assert all(seconds > 0 for seconds in run_all.bench_setup(*bench_teams, store, repeat=1).values())
+    reports = run_all.bench_reports(*bench_teams, 3)
+    assert reports.pop("reports") == 3
+    assert {"write_to_file", "sink_files"} <= set(reports)
+    assert all(rate > 0 for rate in reports.values())
+
+
+def test_memory_probe():
+    result = run_all.probe("result", 5)
+    assert set(result) == {"peak_rss_mb", "rss_growth_mb_per_1k_matches", "traced_peak_mb_per_1k_matches"}
+    assert result["peak_rss_mb"] > 0 and result["traced_peak_mb_per_1k_matches"] > 0
@@ -0,0 +1,41 @@
+import random
+from simulators import BowlerQuota, SimplisticSimulator
+
+
+def test_quota_picks(teams):
+    random.seed(0)
+    quota = BowlerQuota(teams[1])
+    names = quota.bowlers
+    assert len(names) == 6
+
+    for over in range(3):
+        bowler = quota.pick()
+        assert bowler != (names[quota.prev_bowler] if quota.prev_bowler >= 0 else None)
+        quota.end_over(bowler, 6)
+
+    # Four overs bowled, or the previous over, rule a bowler out
+    quota.bowled = [24, 24, 24, 24, 6, 0]
+    quota.prev_bowler = 4
+    assert {quota.pick() for i in range(20)} == {names[5]}
+
+    # With nobody left the quota gives way before the consecutive overs rule
+    quota.bowled = [24] * 6
+    assert names[4] not in {quota.pick() for i in range(50)}
+
+
+def test_scalar_matches_keep_quotas(teams):
+    random.seed(2)
+    sim = SimplisticSimulator(*teams, telemetry="full")
+    for i in range(40):
+        sim.play_match()
+        for team in teams:
+            assert all(card["Balls"] <= 24 for card in sim.match.scorecards[team]["Bowl"].values())
+
+        # Nobody bowls two overs in a row
+        log = sim.deliveries.match(sim.match.match_id)
+        overs = [(row["inning"], row["over"], row["bowler"]) for row in log]
+        bowlers = [bowler for k, (inning, over, bowler) in enumerate(overs)
+                    if k == 0 or overs[k - 1][:2] != (inning, over)]
+        inning_starts = [k == 0 or overs[k - 1][0] != overs[k][0] for k in range(len(overs))
+                         if k == 0 or overs[k - 1][:2] != overs[k][:2]]
+        assert all(a != b or new for a, b, new in zip(bowlers, bowlers[1:], inning_starts[1:]))
@@ -0,0 +1,97 @@
+import csv
+import json
+import os
+import pytest
+import ipl_sim
+import team_bundle
+
+
+NAMES = ["Alpha Kings", "Bravo Riders", "Charlie Chargers", "Delta Daredevils"]
+
+
+@pytest.fixture(scope="module")
+def paths(tmp_path_factory, deliveries):
+    """
+    deliveries.csv, a lineup file of four teams, a season 2020 matches.csv and
+    an empty cache directory
+    """
+    folder = tmp_path_factory.mktemp("cli")
+    deliveries_path = str(folder / "deliveries.csv")
+    deliveries.to_csv(deliveries_path, index=False)
+
+    teams = [{"name": name, "abbrev": name[:3].upper(),
+              "lineup": [f"Player {11 * t + i:04d}" for i in range(11)]} for t, name in enumerate(NAMES)]
+    lineups_path = str(folder / "lineups.json")
+    with open(lineups_path, "w") as f:
+        json.dump({"teams": teams}, f)
+
+    matches_path = str(folder / "matches.csv")
+    league = [(a, b) for a in NAMES for b in NAMES if a != b]
+    with open(matches_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "season", "date", "team1", "team2"])
+        for k, (a, b) in enumerate(league + league[:4]):
+            writer.writerow([k + 1, 2020, f"2020-04-{k + 1:02d}", a, b])
+
+    return {"deliveries": deliveries_path, "lineups": lineups_path, "matches": matches_path,
+            "cache": str(folder / "cache")}
+
+
+def run(capsys, paths, *argv):
+    ipl_sim.main(["--deliveries", paths["deliveries"], "--cache", paths["cache"], "--json", *argv])
+    return json.loads(capsys.readouterr().out)
+
+
+def test_build_stats(capsys, paths):
+    result = run(capsys, paths, "build-stats")
+    assert result["batsmen"] == result["bowlers"] == 60
+    assert os.path.exists(os.path.join(paths["cache"], "manifest.json"))
+
+
+@pytest.mark.parametrize("engine", ["batch", "scalar"])
+def test_fixture(capsys, paths, engine):
+    result = run(capsys, paths, "fixture", paths["lineups"], NAMES[0], NAMES[1], "-n", "30", "--engine", engine)
+    assert result["matches"] == 30
+    assert set(result["win_rates"]) == {NAMES[0], NAMES[1], "Tie"}
+    assert sum(rate for rate, low, high in result["win_rates"].values()) == pytest.approx(1.0)
+    assert 50 < result["first_innings_mean"] < 300
+
+
+def test_bundle_reused(capsys, paths, monkeypatch):
+    run(capsys, paths, "fixture", paths["lineups"], NAMES[0], NAMES[1], "-n", "5")
+    bundles = os.listdir(os.path.join(paths["cache"], "bundles"))
+    assert len(bundles) == 1
+
+    def rebuilt(*args):
+        raise AssertionError("bundle rebuilt")
+
+    monkeypatch.setattr(team_bundle, "write_bundle", rebuilt)
+    monkeypatch.setattr(team_bundle, "load_stats", rebuilt)
+    first = run(capsys, paths, "fixture", paths["lineups"], NAMES[2], NAMES[3], "-n", "20", "--seed", "4")
+    again = run(capsys, paths, "fixture", paths["lineups"], NAMES[2], NAMES[3], "-n", "20", "--seed", "4")
+    assert first["win_rates"] == again["win_rates"]
+
+    # Bundled teams play like teams built from the stats
+    teams = team_bundle.read_bundle(os.path.join(paths["cache"], "bundles", bundles[0]))
+    store = team_bundle.read_stats_cache(paths["cache"])
+    built = team_bundle.make_teams(team_bundle.read_lineups(paths["lineups"]), store)
+    for name in NAMES:
+        assert teams[name].bowler_list == built[name].bowler_list
+
+
+def test_reports(capsys, paths, tmp_path):
+    folder = str(tmp_path / "reports") + "/"
+    os.makedirs(folder)
+    run(capsys, paths, "fixture", paths["lineups"], NAMES[0], NAMES[1], "-n", "3", "--engine", "scalar",
+        "--reports", folder)
+    assert len(os.listdir(folder)) == 3
+    with pytest.raises(AssertionError):
+        run(capsys, paths, "fixture", paths["lineups"], NAMES[0], NAMES[1], "--reports", folder)
+
+
+def test_season(capsys, paths):
+    result = run(capsys, paths, "season", paths["lineups"], "--season", "2020", "--matches", paths["matches"],
+                 "-n", "8", "--workers", "1")
+    assert result["seasons"] == 8
+    assert sorted(row["Team"] for row in result["table"]) == NAMES
+    assert sum(row["Title"] for row in result["table"]) == pytest.approx(1.0)
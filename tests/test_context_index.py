@@ -0,0 +1,126 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+import context_index
+from context_index import ContextIndex, build_context_index, load_context_index
+from game_tools import Team
+from matchups import compile_matchup
+from stats_builder import build_player_stats
+from stats_store import PlayerStatsStore
+
+
+MATCHES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "matches.csv")
+
+# Two matches of the synthetic ids, most players never appear there
+THIN = {"venues": ["Barabati Stadium"], "seasons": [2010]}
+
+
+@pytest.fixture(scope="module")
+def matches():
+    return pd.read_csv(MATCHES, usecols=["id", "season", "city", "venue"])
+
+
+@pytest.fixture(scope="module")
+def store(deliveries):
+    return PlayerStatsStore.from_frames(*build_player_stats(deliveries))
+
+
+@pytest.fixture(scope="module")
+def index(deliveries, matches):
+    return build_context_index(deliveries, matches)
+
+
+def assert_same_stats(store, expected):
+    """
+    Same players and columns as expected, in the same order; extra columns
+    of store, e.g. run counts no player of the slice scored, must be zero
+    """
+    for table in ("batting_table", "bowling_table"):
+        got, want = getattr(store, table), getattr(expected, table)
+        assert got.names == want.names
+        assert [key for key in got.columns if key in want.columns] == list(want.columns)
+        for key, values in want.columns.items():
+            if values.dtype.kind == "f":
+                np.testing.assert_allclose(got.columns[key], values, equal_nan=True, err_msg=str(key))
+            else:
+                np.testing.assert_array_equal(got.columns[key], values, err_msg=str(key))
+        for key in set(got.columns) - set(want.columns):
+            assert (got.columns[key] == 0).all(), key
+
+
+def direct(deliveries, ids):
+    return PlayerStatsStore.from_frames(*build_player_stats(deliveries[deliveries["match_id"].isin(ids)]))
+
+
+def test_every_context_matches_groupby(index, deliveries, store):
+    assert_same_stats(index.store(), store)
+
+
+@pytest.mark.parametrize("context", [{"seasons": [2008, 2009]},
+                                     {"cities": ["Mumbai"]},
+                                     {"venues": ["Eden Gardens"], "seasons": range(2008, 2018)},
+                                     THIN])
+def test_slice_matches_groupby(index, deliveries, matches, context):
+    keep = np.ones(len(matches), dtype=bool)
+    if "seasons" in context:
+        keep &= matches["season"].isin(context["seasons"])
+    if "cities" in context:
+        keep &= matches["city"].isin(context["cities"])
+    if "venues" in context:
+        keep &= matches["venue"].isin(context["venues"])
+    assert_same_stats(index.store(strength=0, **context), direct(deliveries, matches["id"][keep]))
+
+
+def test_players_filter(index):
+    players = ["Player 0003", "Player 0017", "Nobody"]
+    store = index.store(players=players, seasons=[2017], strength=0)
+    full = index.store(seasons=[2017], strength=0)
+    for name in players[:2]:
+        assert dict(store.batting(name)) == dict(full.batting(name))
+        assert dict(store.bowling(name)) == dict(full.bowling(name))
+    assert "Nobody" not in store.batting_table.names
+
+
+def test_save_and_load(index, tmp_path):
+    path = str(tmp_path / "context_index.npz")
+    index.save(path)
+    assert_same_stats(ContextIndex.load(path).store(**THIN), index.store(**THIN))
+
+
+def test_thin_slice_keeps_career_rates(index, teams):
+    career = index.store()
+    shrunk = index.store(**THIN)
+    raw = index.store(strength=0, **THIN)
+    absent = [p for p in career.batting_table.names if p not in raw.batting_table.names]
+    assert absent
+    for name in absent:
+        assert shrunk.batting(name)["Strike Rate"] == pytest.approx(career.batting(name)["Strike Rate"])
+
+    local = []
+    for team in teams:
+        everywhere = Team(team.name, team.lineup)
+        everywhere.generate_team(index)
+        local.append(Team(team.name, team.lineup))
+        local[-1].generate_team(index, context=THIN)
+        assert local[-1].bowler_list == everywhere.bowler_list
+    assert np.isfinite(compile_matchup(*local).probs).all()
+
+
+def test_cached_until_sources_change(deliveries, tmp_path, monkeypatch):
+    deliveries_path = str(tmp_path / "deliveries.csv")
+    matches_path = str(tmp_path / "matches.csv")
+    deliveries[deliveries["match_id"] <= 50].to_csv(deliveries_path, index=False)
+    pd.read_csv(MATCHES).to_csv(matches_path, index=False)
+    built = load_context_index(deliveries_path, matches_path, str(tmp_path))
+
+    def rebuilt(*args):
+        raise AssertionError("index rebuilt")
+
+    monkeypatch.setattr(context_index, "build_context_index", rebuilt)
+    assert_same_stats(load_context_index(deliveries_path, matches_path, str(tmp_path)).store(), built.store())
+
+    monkeypatch.undo()
+    deliveries[deliveries["match_id"] <= 60].to_csv(deliveries_path, index=False)
+    assert load_context_index(deliveries_path, matches_path, str(tmp_path)).store().batting(
+        "Player 0001")["Balls Faced"] > built.store().batting("Player 0001")["Balls Faced"]
@@ -0,0 +1,83 @@
+import random
+import numpy as np
+import pytest
+from dp_engine import InningsDP, chase_probabilities, default_plan, innings_distribution, match_probabilities
+from game_tools import Match
+from matchups import compile_matchup
+from simulators import SimplisticSimulator
+
+
+N = 3000
+
+
+def planned_totals(bat_team, bowl_team, plan, n, seed=3):
+    """
+    First innings totals of n seeded scalar matches with bowl_team bowling to plan
+    """
+    random.seed(seed)
+    sim = SimplisticSimulator(bat_team, bowl_team, telemetry="scorecard", keep_deliveries=False)
+    sim.matchups = {bat_team: compile_matchup(bat_team, bowl_team),
+                    bowl_team: compile_matchup(bowl_team, bat_team)}
+
+    def next_bowl(match, team, prev_bowler):
+        return team.bowler_list[plan[match.summary[bat_team]["Balls"] // 6]]
+
+    totals = np.empty(n, dtype=np.int64)
+    for i in range(n):
+        sim.match = Match(bat_team, bowl_team)
+        sim.match.set_toss_result(bat_team, bowl_team, "")
+        sim.play_innings(bat_team, bowl_team, next_bowl=next_bowl)
+        totals[i] = sim.match.summary[bat_team]["Runs"]
+    return totals
+
+
+@pytest.fixture(scope="module")
+def plan(teams):
+    return default_plan(teams[1], compile_matchup(*teams).weights)
+
+
+@pytest.fixture(scope="module")
+def exact(teams, plan):
+    return innings_distribution(*teams, plan=plan)
+
+
+def test_distribution_is_normalised(exact):
+    assert exact.min() >= 0
+    assert exact.sum() == pytest.approx(1.0)
+
+
+def test_monte_carlo_agrees(teams, plan, exact):
+    totals = planned_totals(*teams, plan, N)
+    mean = np.dot(np.arange(len(exact)), exact)
+    assert abs(totals.mean() - mean) < 4 * totals.std() / np.sqrt(N)
+
+    # Kolmogorov-Smirnov distance, well inside its 0.1% critical value
+    empirical = np.bincount(totals, minlength=len(exact)).cumsum() / N
+    assert np.abs(empirical - exact.cumsum()).max() < 1.95 / np.sqrt(N)
+
+
+def test_resume_from_checkpoint(teams, plan, exact):
+    dp = InningsDP(compile_matchup(*teams).probs)
+    checkpoints = []
+    np.testing.assert_allclose(dp.score_distribution(plan, checkpoints=checkpoints), exact)
+
+    # A plan sharing the first 12 overs resumes from the checkpoint before over 13
+    other = plan[:12] + plan[13:] + plan[12:13]
+    resumed = dp.score_distribution(other, start=12, state=checkpoints[12])
+    np.testing.assert_allclose(resumed, dp.score_distribution(other), atol=1e-15)
+
+
+def test_chase_probabilities_by_enumeration():
+    rng = np.random.default_rng(0)
+    first, second = rng.random(40), rng.random(40)
+    first /= first.sum()
+    second /= second.sum()
+
+    chase = sum(first[a] * second[b] for a in range(40) for b in range(40) if b > a)
+    tie = sum(first[a] * second[a] for a in range(40))
+    assert chase_probabilities(first, second) == pytest.approx((chase, tie, 1 - chase - tie))
+
+
+def test_match_probabilities_sum_to_one(teams):
+    result = match_probabilities(*teams)
+    assert result[teams[0].name] + result[teams[1].name] + result["Tie"] == pytest.approx(1.0)
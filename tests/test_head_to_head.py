@@ -0,0 +1,166 @@
+import numpy as np
+import pytest
+from game_tools import Match
+import head_to_head
+from head_to_head import OUTCOMES, HeadToHead, build_head_to_head, load_head_to_head
+from matchups import Matchup, ball_probabilities, compile_matchup, seed_matchup
+
+
+@pytest.fixture(scope="module")
+def run_outs(deliveries):
+    """
+    The synthetic deliveries with some run outs of the non striker, which
+    count as balls but not as dismissals of the pair
+    """
+    df = deliveries.copy()
+    moved = (df["dismissal_kind"] == "run out") & (df["non_striker"] != df["batsman"])
+    moved &= np.arange(len(df)) % 2 == 0
+    df.loc[moved, "player_dismissed"] = df.loc[moved, "non_striker"]
+    return df
+
+
+@pytest.fixture(scope="module")
+def h2h(run_outs):
+    return build_head_to_head(run_outs)
+
+
+@pytest.fixture(scope="module")
+def dense(run_outs, h2h):
+    """
+    (batsmen, bowlers, OUTCOMES) and (batsmen, bowlers, dismissal kinds)
+    count matrices over h2h.names, straight from a groupby
+    """
+    df = run_outs
+    striker_out = (df["player_dismissed"] == df["batsman"]) & df["dismissal_kind"].notna()
+    outcome = df["batsman_runs"].clip(upper=6).where(~striker_out, 7)
+    outcome = outcome.where(df["noball_runs"] == 0, 8).where(df["wide_runs"] == 0, 9)
+
+    n = len(h2h.names)
+    counts = np.zeros((n, n, OUTCOMES), dtype=np.int64)
+    for (batsman, bowler, k), size in df.groupby([df["batsman"], df["bowler"], outcome]).size().items():
+        counts[h2h.ids[batsman], h2h.ids[bowler], k] = size
+
+    dcounts = np.zeros((n, n, len(Match.valid_dismissals)), dtype=np.int64)
+    outs = df[striker_out]
+    for (batsman, bowler, kind), size in outs.groupby(["batsman", "bowler", "dismissal_kind"]).size().items():
+        if kind in Match.valid_dismissals:
+            dcounts[h2h.ids[batsman], h2h.ids[bowler], Match.valid_dismissals.index(kind)] = size
+    return counts, dcounts
+
+
+def test_pairs_match_dense(h2h, dense):
+    counts, dcounts = dense
+    for i, batsman in enumerate(h2h.names):
+        for j, bowler in enumerate(h2h.names):
+            c, d = h2h.pair(batsman, bowler)
+            np.testing.assert_array_equal(c, counts[i, j])
+            np.testing.assert_array_equal(d, dcounts[i, j])
+            assert (h2h.block(batsman, bowler) >= 0) == (counts[i, j].sum() > 0)
+
+
+def test_rows_and_columns_match_dense(h2h, dense):
+    counts = dense[0]
+    met = counts.sum(axis=-1) > 0
+    for i, name in enumerate(h2h.names):
+        bowlers, row = h2h.row(name)
+        assert bowlers == [h2h.names[j] for j in np.flatnonzero(met[i])]
+        np.testing.assert_array_equal(row, counts[i, met[i]])
+
+        batsmen, column = h2h.column(name)
+        assert batsmen == [h2h.names[j] for j in np.flatnonzero(met[:, i])]
+        np.testing.assert_array_equal(column, counts[met[:, i], i])
+
+
+def test_pair_counts_match_dense(h2h, dense, teams):
+    counts, dcounts = dense
+    batsmen = teams[0].lineup + ["Nobody"]
+    bowlers = ["Nobody"] + teams[1].bowler_list
+    got, dgot = h2h.pair_counts(batsmen, bowlers)
+    rows = [h2h.ids.get(b, -1) for b in batsmen]
+    cols = [h2h.ids.get(b, -1) for b in bowlers]
+    for a, i in enumerate(rows):
+        for b, j in enumerate(cols):
+            want = (counts[i, j], dcounts[i, j]) if i >= 0 and j >= 0 else (0, 0)
+            np.testing.assert_array_equal(got[a, b], want[0])
+            np.testing.assert_array_equal(dgot[a, b], want[1])
+
+
+def test_unknown_players(h2h):
+    assert h2h.pair("Nobody", h2h.names[0])[0].sum() == 0
+    assert h2h.row("Nobody")[0] == [] and h2h.column("Nobody")[0] == []
+
+
+def test_blend(h2h, teams):
+    probs, dprobs = ball_probabilities(*teams)
+    blended, dblended = ball_probabilities(*teams, head_to_head=h2h)
+    np.testing.assert_allclose(blended.sum(axis=-1), 1)
+    np.testing.assert_allclose(dblended.sum(axis=-1), 1)
+    assert not np.allclose(blended, probs)
+
+    # A huge prior keeps the marginals, a tiny one the pair frequencies
+    np.testing.assert_allclose(ball_probabilities(*teams, head_to_head=h2h.with_strength(1e12))[0], probs, atol=1e-9)
+    counts, _ = h2h.pair_counts(teams[0].lineup, teams[1].bowler_list)
+    met = counts.sum(axis=-1) > 0
+    frequencies = counts[met] / counts[met].sum(axis=-1, keepdims=True)
+    tiny = ball_probabilities(*teams, head_to_head=h2h.with_strength(1e-9))[0]
+    np.testing.assert_allclose(tiny[met][..., :OUTCOMES], frequencies, atol=1e-6)
+
+
+def test_blend_without_prior_keeps_marginals_of_unseen_pairs(run_outs, teams):
+    # A few matches, most pairs never met
+    thin = build_head_to_head(run_outs[run_outs["match_id"] <= 5], strength=0)
+    probs, dprobs = ball_probabilities(*teams)
+    blended, dblended = ball_probabilities(*teams, head_to_head=thin)
+    assert np.isfinite(blended).all() and np.isfinite(dblended).all()
+
+    counts, dcounts = thin.pair_counts(teams[0].lineup, teams[1].bowler_list)
+    unseen = counts.sum(axis=-1) == 0
+    assert unseen.any()
+    np.testing.assert_array_equal(blended[unseen], probs[unseen])
+    no_outs = dcounts.sum(axis=-1) == 0
+    np.testing.assert_array_equal(dblended[no_outs], dprobs[no_outs])
+    np.testing.assert_allclose(dblended.sum(axis=-1), 1)
+
+
+def test_seeded_matchups_keyed_by_blend(h2h, teams):
+    bat_team, bowl_team = teams
+    plain = compile_matchup(bat_team, bowl_team)
+    arrays = {name: getattr(plain, name) for name in Matchup.array_names}
+    restored = Matchup.from_arrays(bat_team, bowl_team, arrays)
+    assert restored.key == plain.key
+
+    blended = compile_matchup(bat_team, bowl_team, head_to_head=h2h)
+    restored = Matchup.from_arrays(bat_team, bowl_team, {name: getattr(blended, name) for name in Matchup.array_names},
+                                   head_to_head=h2h)
+    assert restored.key == blended.key != plain.key
+
+    # Arrays saved without the blend are not mistaken for blended ones
+    seed_matchup(bat_team, bowl_team, Matchup.from_arrays(bat_team, bowl_team, arrays))
+    assert compile_matchup(bat_team, bowl_team, head_to_head=h2h).key == blended.key
+
+
+def test_save_and_load(h2h, dense, tmp_path):
+    path = str(tmp_path / "head_to_head.npz")
+    h2h.save(path)
+    loaded = HeadToHead.load(path, strength=5.0)
+    assert loaded.strength == 5.0 and loaded.names == h2h.names
+    for batsman, bowler in ((h2h.names[0], h2h.names[1]), (h2h.names[7], h2h.names[3])):
+        np.testing.assert_array_equal(loaded.pair(batsman, bowler)[0], h2h.pair(batsman, bowler)[0])
+
+
+def test_cached_until_deliveries_change(run_outs, tmp_path, monkeypatch):
+    deliveries_path = str(tmp_path / "deliveries.csv")
+    run_outs[run_outs["match_id"] <= 50].to_csv(deliveries_path, index=False)
+    built = load_head_to_head(deliveries_path, str(tmp_path))
+
+    def rebuilt(*args):
+        raise AssertionError("matrix rebuilt")
+
+    monkeypatch.setattr(head_to_head, "build_head_to_head", rebuilt)
+    loaded = load_head_to_head(deliveries_path, str(tmp_path), strength=5.0)
+    assert loaded.strength == 5.0
+    np.testing.assert_array_equal(loaded.counts, built.counts)
+
+    monkeypatch.undo()
+    run_outs[run_outs["match_id"] <= 60].to_csv(deliveries_path, index=False)
+    assert load_head_to_head(deliveries_path, str(tmp_path)).counts.sum() > built.counts.sum()
@@ -0,0 +1,68 @@
+import pandas as pd
+import pytest
+from ingest import StatsAccumulator, delivery_dtypes, ingest_csv
+from stats_builder import build_player_stats
+
+
+@pytest.fixture(scope="module")
+def deliveries_csv(tmp_path_factory, deliveries):
+    path = tmp_path_factory.mktemp("ingest") / "deliveries.csv"
+    deliveries.to_csv(path, index=False)
+    return str(path)
+
+
+@pytest.fixture(scope="module")
+def full(deliveries_csv):
+    """
+    Stats rebuilt from the whole file in one frame
+    """
+    return build_player_stats(pd.read_csv(deliveries_csv, usecols=list(delivery_dtypes), dtype=delivery_dtypes))
+
+
+def assert_same_stats(frames, expected):
+    for df, expected_df in zip(frames, expected):
+        pd.testing.assert_frame_equal(df.reset_index(drop=True), expected_df.reset_index(drop=True),
+                                      check_dtype=False)
+
+
+@pytest.mark.parametrize("chunksize", [37, 5000, 10 ** 6])
+def test_chunked_equals_full_rebuild(deliveries_csv, deliveries, full, chunksize):
+    if chunksize == 37:
+        # Tiny chunks split nearly every match, on a few matches to keep it quick
+        head = deliveries_csv.replace(".csv", "_head.csv")
+        deliveries[deliveries["match_id"] <= 8].to_csv(head, index=False)
+        expected = build_player_stats(pd.read_csv(head, usecols=list(delivery_dtypes), dtype=delivery_dtypes))
+        assert_same_stats(ingest_csv(head, chunksize=chunksize).to_frames(), expected)
+    else:
+        assert_same_stats(ingest_csv(deliveries_csv, chunksize=chunksize).to_frames(), full)
+
+
+def test_new_season_equals_full_rebuild(tmp_path, deliveries_csv, deliveries, full):
+    old = tmp_path / "old.csv"
+    deliveries[deliveries["match_id"] <= 150].to_csv(old, index=False)
+    snapshot = tmp_path / "snapshot.pkl"
+    ingest_csv(str(old), chunksize=5000).save(snapshot)
+
+    accumulator = ingest_csv(deliveries_csv, StatsAccumulator.load(snapshot), chunksize=5000, new_matches_only=True)
+    assert_same_stats(accumulator.to_frames(), full)
+
+    accumulator = StatsAccumulator.load(snapshot)
+    assert accumulator.apply_new_matches(deliveries[deliveries["match_id"] <= 170]) == 20
+    assert accumulator.apply_new_matches(deliveries) == 30
+    assert accumulator.apply_new_matches(deliveries) == 0
+    assert_same_stats(accumulator.to_frames(), full)
+    assert accumulator.has_matches([1, 200, 201]).tolist() == [True, True, False]
+
+
+def test_out_of_order_deliveries_rejected(deliveries):
+    first, second = (deliveries[deliveries["match_id"] == i] for i in (1, 2))
+    with pytest.raises(ValueError, match="not ordered"):
+        StatsAccumulator().fold(pd.concat([second, first]))
+
+    accumulator = StatsAccumulator().fold(first).fold(second)
+    with pytest.raises(ValueError, match="match 1 was already folded in"):
+        accumulator.fold(first)
+
+    # A block may carry on with the match the previous one ended in
+    accumulator = StatsAccumulator().fold(first.iloc[:50]).fold(first.iloc[50:]).fold(second)
+    assert_same_stats(accumulator.to_frames(), build_player_stats(pd.concat([first, second])))
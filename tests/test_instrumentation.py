@@ -0,0 +1,65 @@
+import json
+import pytest
+from instrumentation import Instrumentation
+from simulators import SimplisticSimulator
+
+
+N = 12
+
+
+def play(teams, telemetry, instrumentation=None):
+    sim = SimplisticSimulator(*teams, telemetry=telemetry, keep_deliveries=False, seed=3,
+                              instrumentation=instrumentation)
+    return sim.play_matches(N)
+
+
+@pytest.mark.parametrize("telemetry", SimplisticSimulator.telemetry_levels)
+def test_results_identical_with_instrumentation(teams, telemetry):
+    inst = Instrumentation()
+    assert play(teams, telemetry, inst) == play(teams, telemetry)
+
+    summary = inst.summary()
+    assert summary["matches"] == N
+    assert summary["phases"]["setup"]["calls"] == summary["phases"]["innings"]["calls"] == N
+    # Every over picks a bowler
+    assert summary["phases"]["bowler_selection"]["calls"] >= summary["counters"]["balls"] / 6 - 1
+
+
+def test_counters_follow_the_results(teams):
+    extras = {}
+    for telemetry in ("result", "full"):
+        inst = Instrumentation()
+        results = play(teams, telemetry, inst)
+        counters = inst.summary()["counters"]
+        assert counters["runs"] == sum(r.first_runs + r.second_runs for r in results)
+        assert counters["wickets"] == sum(r.first_wickets + r.second_wickets for r in results)
+        assert counters["balls"] == sum(r.first_balls + r.second_balls for r in results)
+        assert 0 <= counters["extras"] < counters["runs"]
+        extras[telemetry] = counters["extras"]
+    # Extras come from the ball loop or the scorecards, both count the same runs
+    assert extras["result"] == extras["full"]
+
+
+def test_disabled_records_nothing():
+    inst = Instrumentation(enabled=False)
+    with inst.phase("innings"):
+        pass
+    inst.begin_match()
+    inst.end_match(None)
+    assert inst.summary() == {"matches": 0, "phases": {}, "counters": {}, "per_match": {}, "memory": []}
+    assert inst.phase("a") is inst.phase("b")
+
+
+def test_exports(teams, tmp_path):
+    inst = Instrumentation(trace_memory=True, memory_every=4, max_events=20)
+    play(teams, "full", inst)
+    inst.close()
+    assert [sample["match"] for sample in inst.memory] == [4, 8, 12]
+
+    inst.to_json(tmp_path / "summary.json")
+    assert json.loads((tmp_path / "summary.json").read_text())["matches"] == N
+
+    inst.to_chrome_trace(tmp_path / "trace.json")
+    trace = json.loads((tmp_path / "trace.json").read_text())
+    assert len(trace["traceEvents"]) == 20
+    assert {event["ph"] for event in trace["traceEvents"]} <= {"X", "C"}
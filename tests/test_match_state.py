@@ -0,0 +1,64 @@
+import random
+import pytest
+from match_state import MatchState
+from simulators import InningsBatch, SimplisticSimulator, simulate_from
+
+
+@pytest.fixture(scope="module")
+def played(teams):
+    """
+    One seeded match with a snapshot after every ball and every over
+    """
+    snapshots = []
+    random.seed(4)
+    sim = SimplisticSimulator(*teams, telemetry="scorecard",
+                              on_ball=lambda innings, balls, snapshot: snapshots.append(snapshot()))
+    sim.play_match()
+    return sim.match, snapshots
+
+
+def test_snapshots_follow_the_match(played):
+    match, snapshots = played
+    assert snapshots[0].innings == 1 and snapshots[-1].innings == 2
+    for before, after in zip(snapshots, snapshots[1:]):
+        if before.innings == after.innings:
+            assert after.summary[after.bat_team]["Balls"] >= before.summary[before.bat_team]["Balls"]
+    last = snapshots[-1]
+    assert last.summary == {team.name: dict(stats) for team, stats in match.summary.items()}
+    assert MatchState.from_json(snapshots[40].to_json()).to_dict() == snapshots[40].to_dict()
+
+
+def test_rest_of_the_first_innings_is_reproduced(teams, played):
+    match, snapshots = played
+    state = MatchState.from_json([s for s in snapshots if s.innings == 1][-1].to_json())
+    result = simulate_from(*teams, state, 50, seed=1)
+    first = result.innings[match.bat_first]
+    assert (first.runs == match.summary[match.bat_first]["Runs"]).all()
+    assert (first.wickets == match.summary[match.bat_first]["Wickets"]).all()
+    assert (first.balls == match.summary[match.bat_first]["Balls"]).all()
+    for i in (0, 49):
+        cards = result.scorecards(i)
+        assert cards[match.bat_first]["Bat"] == match.scorecards[match.bat_first]["Bat"]
+        assert cards[match.bat_second]["Bowl"] == match.scorecards[match.bat_second]["Bowl"]
+
+
+def test_finished_match_is_reproduced(teams, played):
+    match, snapshots = played
+    result = simulate_from(*teams, snapshots[-1], 5, seed=1)
+    for i in range(5):
+        assert result.summary(i) == match.summary
+        assert result.scorecards(i) == match.scorecards
+
+
+def test_continuations_start_from_the_snapshot(teams, played):
+    match, snapshots = played
+    state = snapshots[len(snapshots) // 4]
+    bat_first = match.bat_first
+    so_far = state.summary[state.bat_team]
+    result = simulate_from(*teams, state, 200, seed=2)
+    innings = result.innings[bat_first]
+    assert (innings.runs >= so_far["Runs"]).all() and (innings.wickets >= so_far["Wickets"]).all()
+    assert innings.runs.std() > 0
+
+    batch = InningsBatch.from_state(state, bat_first, match.bat_second, 3)
+    assert (batch.runs == so_far["Runs"]).all() and (batch.balls == so_far["Balls"]).all()
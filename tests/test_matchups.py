@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+from conftest import synthetic_team
+from game_tools import Match
+from matchups import Matchup, alias_tables, compile_matchup
+
+
+def reference_tables(bat_team, bowl_team, eps=1e-9):
+    """
+    Ball and dismissal distributions of every pair, one pair at a time as
+    assign_probabilities used to build them
+    """
+    table, dismissal_table = {}, {}
+    for batsman in bat_team.lineup:
+        for bowler in bowl_team.bowler_list:
+            bat = bat_team.players[batsman].batting_stats
+            bowl = bowl_team.players[bowler].bowling_stats
+
+            mat = np.zeros(len(Match.ball_choices))
+            for i in range(7):
+                p, q = bat[i] / bat["Balls Faced"], bowl[i] / bowl["Balls Bowled"]
+                mat[i] = p + q - p * q
+            p, q = bat["Dismissals"] / bat["Balls Faced"], bowl["Wickets"] / bowl["Balls Bowled"]
+            mat[7] = p + q - p * q
+            mat[8] = bowl["No Balls"] / bowl["Balls Bowled"]
+            mat[9] = bowl["Wides"] / bowl["Balls Bowled"]
+            mat += eps
+            table[(batsman, bowler)] = mat / mat.sum()
+
+            dmat = np.zeros(len(Match.valid_dismissals))
+            for i, d in enumerate(Match.valid_dismissals):
+                if d == "run out":
+                    dmat[i] = bat[d] / bat["Dismissals"] * 2
+                else:
+                    p, q = bat[d] / bat["Dismissals"], bowl[d] / bowl["Wickets"]
+                    dmat[i] = p + q - p * q
+            dmat += eps
+            dismissal_table[(batsman, bowler)] = dmat / dmat.sum()
+    return table, dismissal_table
+
+
+def alias_distribution(accept, alias):
+    """
+    :return: exact outcome probabilities of alias sampling
+    """
+    k = accept.shape[-1]
+    flat_accept, flat_alias = accept.reshape(-1, k), alias.reshape(-1, k)
+    probs = flat_accept / k
+    for row in range(len(probs)):
+        np.add.at(probs[row], flat_alias[row], (1 - flat_accept[row]) / k)
+    return probs.reshape(accept.shape)
+
+
+def test_tables_match_pairwise_formula(teams):
+    for bat_team, bowl_team in (teams, teams[::-1]):
+        table, dismissal_table = compile_matchup(bat_team, bowl_team).tables()
+        expected, dexpected = reference_tables(bat_team, bowl_team)
+        assert table.keys() == expected.keys()
+        for pair in expected:
+            np.testing.assert_allclose(table[pair], expected[pair], rtol=1e-12)
+            np.testing.assert_allclose(dismissal_table[pair], dexpected[pair], rtol=1e-12)
+
+
+def test_alias_tables_are_exact():
+    rng = np.random.default_rng(0)
+    probs = rng.dirichlet(np.full(10, 0.3), size=(4, 5))
+    probs[0, 0] = np.eye(10)[3]
+    accept, alias = alias_tables(probs)
+    np.testing.assert_allclose(alias_distribution(accept, alias), probs, atol=1e-12)
+
+
+def test_alias_sampling_matches_cdf_sampling(teams):
+    matchup = compile_matchup(*teams)
+    # An even grid of uniforms gives frequencies within a few 1/M of the probabilities
+    m = 20000
+    u = (np.arange(m) + 0.5) / m
+    k = matchup.probs.shape[-1]
+    for batsman, bowler in ((0, 0), (3, 2), (10, 5)):
+        alias = np.bincount([matchup.sample(batsman, bowler, x) for x in u], minlength=k) / m
+        cdf = (matchup.cdf[0, batsman, bowler][None, :] <= u[:, None]).sum(axis=1)
+        cdf = np.bincount(np.minimum(cdf, k - 1), minlength=k) / m
+        np.testing.assert_allclose(alias, matchup.probs[0, batsman, bowler], atol=20 / m)
+        np.testing.assert_allclose(cdf, matchup.probs[0, batsman, bowler], atol=2 / m)
+
+        kinds = [matchup.sample_dismissal(batsman, bowler, x) for x in u]
+        kinds = np.bincount(kinds, minlength=matchup.dprobs.shape[-1]) / m
+        np.testing.assert_allclose(kinds, matchup.dprobs[0, batsman, bowler], atol=20 / m)
+
+
+def test_compiled_once_per_pair(stats):
+    bat_team = synthetic_team("Bat XI", range(0, 11), *stats)
+    bowl_team = synthetic_team("Bowl XI", range(11, 22), *stats)
+    matchup = compile_matchup(bat_team, bowl_team)
+    assert compile_matchup(bat_team, bowl_team) is matchup
+    assert matchup.key == Matchup.key_for(bat_team, bowl_team)
+
+    # Reloading stats or changing the bowlers rebuilds it
+    bowl_team.generate_team(*stats)
+    rebuilt = compile_matchup(bat_team, bowl_team)
+    assert rebuilt is not matchup
+    bowl_team.bowler_list = bowl_team.bowler_list[:-1]
+    assert compile_matchup(bat_team, bowl_team).probs.shape[2] == rebuilt.probs.shape[2] - 1
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from dp_engine import default_plan, innings_distribution
+from matchups import compile_matchup
+from optimizers import BattingOrderOptimizer, BowlingPlanOptimizer
+
+
+def test_identical_orders_score_identically(teams):
+    team, opponent = teams
+    reversed_order = team.lineup[::-1]
+    optimizer = BattingOrderOptimizer(team, opponent, seed=3,
+                                      orders=[list(team.lineup), reversed_order, list(team.lineup)])
+    wins = optimizer.evaluate(optimizer.orders, 400)
+    assert wins[0] == wins[2]
+    np.testing.assert_array_equal(optimizer.evaluate(optimizer.orders, 400), wins)
+    assert not np.array_equal(optimizer.evaluate(optimizer.orders, 400, stage=1), wins)
+
+
+def test_optimize_ranks_survivors(teams):
+    team, opponent = teams
+    optimizer = BattingOrderOptimizer(team, opponent, budget=4000, candidates=8, seed=1)
+    assert len({tuple(order) for order in optimizer.orders}) == 8
+    best = optimizer.optimize(top=3)
+    assert len(best) == 3
+    for order, rate, low, high in best:
+        assert sorted(order) == sorted(team.lineup)
+        assert 0 <= low <= rate <= high <= 1
+
+
+def test_bowling_plan_beats_default_plan(teams):
+    opponent, team = teams
+    start = default_plan(team, compile_matchup(opponent, team).weights)
+    expected = np.dot(np.arange(301), innings_distribution(opponent, team, plan=start, max_runs=300))
+
+    optimizer = BowlingPlanOptimizer(team, opponent, budget=60, seed=2)
+    plan, runs = optimizer.optimize()
+    assert len(plan) == 20 and runs <= expected + 1e-9
+    positions = [team.bowler_list.index(name) for name in plan]
+    assert BowlingPlanOptimizer.valid(positions, len(team.bowler_list))
+    assert runs == pytest.approx(np.dot(np.arange(301), innings_distribution(opponent, team, plan=positions,
+                                                                              max_runs=300)))
+
+
+def test_plan_validity():
+    assert BowlingPlanOptimizer.valid([0, 1] * 4 + [2, 3] * 4 + [4, 5] * 2, 6)
+    assert not BowlingPlanOptimizer.valid([0, 1] * 5 + [2, 3] * 5, 6)
+    assert not BowlingPlanOptimizer.valid([0, 0] + [1, 2, 3, 4, 5] * 3 + [1, 2, 3], 6)
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+from conftest import synthetic_team
+from parallel import ParallelRunner
+from simulators import BatchResult, InningsBatch
+
+
+def assert_same_matches(a, b):
+    np.testing.assert_array_equal(a.team_1_bats_first, b.team_1_bats_first)
+    for team_a, team_b in ((a.team_1, b.team_1), (a.team_2, b.team_2)):
+        for name in InningsBatch.arrays:
+            np.testing.assert_array_equal(getattr(a.innings[team_a], name), getattr(b.innings[team_b], name),
+                                          err_msg=name)
+
+
+@pytest.fixture(scope="module")
+def reference(teams):
+    return ParallelRunner(workers=1, chunk_size=64).run(*teams, 300, seed=11)
+
+
+@pytest.mark.parametrize("workers, chunk_size", [(1, 7), (1, 1000), (2, 64), (3, 97)])
+def test_results_independent_of_workers_and_chunks(teams, reference, workers, chunk_size):
+    with ParallelRunner(workers=workers, chunk_size=chunk_size) as runner:
+        assert_same_matches(runner.run(*teams, 300, seed=11), reference)
+
+
+def test_continued_campaign_matches_one_run(teams, reference):
+    runner = ParallelRunner(workers=1, chunk_size=50)
+    first = runner.run_campaign([teams], 120, seed=11)[0]
+    rest = runner.run_campaign([teams], 180, seed=11, start=120)[0]
+    assert_same_matches(rows_of_result(reference, 0, 120), first)
+    assert_same_matches(rows_of_result(reference, 120, 180), rest)
+
+
+def test_fixtures_keyed_by_teams_not_position(teams, reference):
+    team_1, team_2 = teams
+    runner = ParallelRunner(workers=1, chunk_size=64)
+    both = runner.run_campaign([(team_2, team_1), (team_1, team_2)], 300, seed=11)
+    assert_same_matches(both[1], reference)
+    assert_same_matches(both[0], runner.run(team_2, team_1, 300, seed=11))
+
+    # A repeated pairing gets streams of its own
+    twice = runner.run_campaign([(team_1, team_2), (team_1, team_2)], 300, seed=11)
+    assert_same_matches(twice[0], reference)
+    assert not np.array_equal(twice[1].innings[team_1].runs, reference.innings[team_1].runs)
+
+
+def test_pool_and_tables_are_reused(stats, reference):
+    team_1 = synthetic_team("Synthetic XI", range(0, 11), *stats)
+    team_2 = synthetic_team("Random XI", range(11, 22), *stats)
+    with ParallelRunner(workers=2, chunk_size=64) as runner:
+        assert_same_matches(runner.run(team_1, team_2, 300, seed=11), reference)
+        pool, tables = runner.executor, dict(runner.tables)
+        assert_same_matches(runner.run(team_1, team_2, 300, seed=11), reference)
+        assert runner.executor is pool
+        assert all(runner.tables[f][1] is tables[f][1] for f in tables)
+
+        # New stats pack the fixture again
+        team_1.generate_team(*stats)
+        runner.run(team_1, team_2, 10, seed=11)
+        assert all(runner.tables[f][1] is not tables[f][1] for f in tables)
+    assert runner.executor is None and not runner.tables
+
+
+def rows_of(innings, start, n):
+    part = InningsBatch(n, innings.bowl_balls.shape[1])
+    for name in InningsBatch.arrays:
+        setattr(part, name, getattr(innings, name)[start:start + n])
+    return part
+
+
+def rows_of_result(result, start, n):
+    return BatchResult(result.team_1, result.team_2, result.team_1_bats_first[start:start + n],
+                       {team: rows_of(innings, start, n) for team, innings in result.innings.items()})
+
+
+def test_concatenate(teams, reference):
+    innings = reference.innings[teams[0]]
+    parts = [InningsBatch(k, innings.bowl_balls.shape[1]) for k in (100, 1, 199)]
+    start = 0
+    for part in parts:
+        part.assign(np.arange(part.n), rows_of(innings, start, part.n))
+        start += part.n
+    joined = InningsBatch.concatenate(parts)
+    assert joined.n == innings.n
+    for name in InningsBatch.arrays:
+        np.testing.assert_array_equal(getattr(joined, name), getattr(innings, name))
+
+
+def test_seed_changes_results(teams, reference):
+    result = ParallelRunner(workers=1, chunk_size=64).run(*teams, 300, seed=12)
+    assert not np.array_equal(result.innings[teams[0]].runs, reference.innings[teams[0]].runs)
@@ -0,0 +1,137 @@
+import numpy as np
+import pytest
+import phase_stats
+from game_tools import Team
+from matchups import compile_matchup
+from phase_stats import PhaseStats, check_cuts, load_phase_stats, over_phases
+from simulators import SimplisticSimulator, simulate_batch
+from stats_builder import build_phase_stats, build_player_stats
+from stats_store import PlayerStatsStore, StatsTable
+
+
+@pytest.fixture(scope="module")
+def career(deliveries):
+    return PlayerStatsStore.from_frames(*build_player_stats(deliveries))
+
+
+@pytest.fixture(scope="module")
+def raw(deliveries):
+    return [PlayerStatsStore.from_frames(*frames) for frames in build_phase_stats(deliveries)]
+
+
+def test_cuts():
+    np.testing.assert_array_equal(over_phases(), [0] * 6 + [1] * 9 + [2] * 5)
+    np.testing.assert_array_equal(over_phases((10,)), [0] * 10 + [1] * 10)
+    assert check_cuts(["6", "15"]) == (6, 15)
+    for cuts in ((15, 6), (6, 6), (0, 10), (10, 20)):
+        with pytest.raises(AssertionError):
+            check_cuts(cuts)
+
+
+def test_phases_add_up_to_career(deliveries, career, raw):
+    assert len(raw) == 3
+    for table, keys in (("batting_table", ["Runs", "Balls Faced", "Dismissals", 4, 6]),
+                        ("bowling_table", ["Balls Bowled", "Runs Conceded", "Wickets", "Wides"])):
+        for name in getattr(career, table).names[:20]:
+            want = getattr(career, table).row(name)
+            for key in keys:
+                got = sum(getattr(p, table).row(name)[key] for p in raw if name in getattr(p, table).ids)
+                assert got == want[key], (name, key)
+
+    # Only overs 16 to 20 in the death phase
+    death = build_phase_stats(deliveries[deliveries["over"] >= 16], (6, 15))
+    assert death[0][0].empty and death[1][0].empty
+    np.testing.assert_array_equal(death[2][0]["Runs"], raw[2].batting_table.columns["Runs"])
+
+
+def test_shrinkage(career, raw):
+    phases = PhaseStats.shrunk(career, raw, (6, 15), strength=0)
+    name = raw[0].batting_table.names[0]
+    assert phases.batting(0, name)["Runs"] == raw[0].batting(name)["Runs"]
+
+    # A huge prior gives the career rates in every phase
+    phases = PhaseStats.shrunk(career, raw, (6, 15), strength=1e9)
+    for p in range(3):
+        assert phases.batting(p, name)["Strike Rate"] == pytest.approx(career.batting(name)["Strike Rate"], rel=1e-5)
+        assert phases.bowling(p, name)["Economy"] == pytest.approx(career.bowling(name)["Economy"], rel=1e-5)
+
+    # Players missing from a phase read their career rates alone
+    thin = list(raw)
+    thin[2] = PlayerStatsStore(without(raw[2].batting_table, name), without(raw[2].bowling_table, name))
+    phases = PhaseStats.shrunk(career, thin, (6, 15))
+    assert phases.batting(2, name)["Strike Rate"] == pytest.approx(career.batting(name)["Strike Rate"])
+    assert phases.batting(2, name)["Balls Faced"] == pytest.approx(60)
+    assert np.isfinite(phases.bowling(2, name)["Economy"])
+
+
+def without(table, name):
+    keep = [i for i, other in enumerate(table.names) if other != name]
+    return StatsTable([table.names[i] for i in keep], {key: np.asarray(values)[keep]
+                                                        for key, values in table.columns.items()})
+
+
+def test_matchup_phase_slices(teams, career):
+    bat_team, bowl_team = (Team(team.name, team.lineup) for team in teams)
+    for team in (bat_team, bowl_team):
+        team.generate_team(career)
+    single = compile_matchup(bat_team, bowl_team)
+    assert single.probs.shape[0] == 1 and (single.over_phase == 0).all()
+
+    # Every phase on the career stats gives the single table in every slice
+    bat_team.set_phases(PhaseStats((6, 15), [career] * 3))
+    phased = compile_matchup(bat_team, bowl_team)
+    assert phased is not single and phased.probs.shape[0] == 3
+    np.testing.assert_array_equal(phased.over_phase, over_phases())
+    for p in range(3):
+        np.testing.assert_allclose(phased.probs[p], single.probs[0])
+
+
+def by_name(result):
+    return result._replace(bat_first=result.bat_first.name, bat_second=result.bat_second.name,
+                           winner=result.winner and result.winner.name)
+
+
+def test_identical_phases_play_identical_matches(teams, career):
+    plain = [Team(team.name, team.lineup) for team in teams]
+    phased = [Team(team.name, team.lineup) for team in teams]
+    for team in plain:
+        team.generate_team(career)
+    for team in phased:
+        team.generate_team(career, phases=PhaseStats((6, 15), [career] * 3))
+
+    for telemetry in ("result", "full"):
+        expected = SimplisticSimulator(*plain, telemetry=telemetry, keep_deliveries=False, seed=4).play_matches(20)
+        got = SimplisticSimulator(*phased, telemetry=telemetry, keep_deliveries=False, seed=4).play_matches(20)
+        assert [by_name(r) for r in got] == [by_name(r) for r in expected]
+
+    expected, got = simulate_batch(*plain, 200, seed=4), simulate_batch(*phased, 200, seed=4)
+    for a, b in zip(plain, phased):
+        np.testing.assert_array_equal(got.innings[b].runs, expected.innings[a].runs)
+
+
+def test_cached_until_deliveries_change(deliveries, tmp_path, monkeypatch):
+    deliveries_path = str(tmp_path / "deliveries.csv")
+    deliveries[deliveries["match_id"] <= 30].to_csv(deliveries_path, index=False)
+    built = load_phase_stats(deliveries_path, str(tmp_path), cuts=(10,))
+    assert len(built) == 2
+
+    import stats_builder
+
+    def rebuilt(*args):
+        raise AssertionError("phase tables rebuilt")
+
+    monkeypatch.setattr(stats_builder, "build_phase_stats", rebuilt)
+    loaded = load_phase_stats(deliveries_path, str(tmp_path), cuts=(10,))
+    name = built.stores[0].batting_table.names[0]
+    assert loaded.batting(0, name) == built.batting(0, name)
+
+    # Other cut points are cached apart
+    with pytest.raises(AssertionError, match="rebuilt"):
+        load_phase_stats(deliveries_path, str(tmp_path), cuts=(6, 15))
+
+    monkeypatch.undo()
+    deliveries[deliveries["match_id"] <= 40].to_csv(deliveries_path, index=False)
+    again = load_phase_stats(deliveries_path, str(tmp_path), cuts=(10,))
+    assert again.batting(0, name)["Balls Faced"] > built.batting(0, name)["Balls Faced"]
+    assert phase_stats.PHASE_VERSION == PhaseStats.read_meta(
+        str(tmp_path / "phase_stats_10.npz"))["version"]
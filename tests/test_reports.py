@@ -0,0 +1,68 @@
+import gzip
+import os
+import random
+import tarfile
+import zipfile
+import pytest
+from reports import ReportSink
+from simulators import SimplisticSimulator
+
+
+def read_archive(path, archive):
+    if archive == "zip":
+        with zipfile.ZipFile(path) as f:
+            return {name: f.read(name).decode() for name in f.namelist()}
+    if archive == "tar.gz":
+        with tarfile.open(path) as f:
+            return {m.name: f.extractfile(m).read().decode() for m in f.getmembers()}
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        parts = f.read().split("=== ")[1:]
+    return dict(part.split("\n", 1) for part in parts)
+
+
+def write_matches(teams, sink, n=3, seed=0):
+    random.seed(seed)
+    sim = SimplisticSimulator(*teams)
+    reports = {}
+    for i in range(n):
+        sim.play_match()
+        sim.match.set_toss_result(sim.bat_first, sim.bat_second, "toss")
+        deliveries = sim.deliveries.match(sim.match.match_id)
+        reports[sink.write(sim.match, deliveries)] = (sim.match, deliveries)
+    return reports
+
+
+def test_files_match_write_to_file(tmp_path, teams):
+    prefix, legacy = str(tmp_path / "sink") + "/", str(tmp_path / "legacy") + "/"
+    os.makedirs(legacy)
+    with ReportSink(prefix) as sink:
+        reports = write_matches(teams, sink)
+    assert sorted(os.listdir(prefix)) == sorted(reports)
+    for name, (match, deliveries) in reports.items():
+        match.write_to_file(legacy, deliveries)
+        with open(prefix + name) as f, open(legacy + name) as g:
+            assert f.read() == g.read()
+
+    # Names taken before the sink opened are skipped, as write_to_file does
+    with ReportSink(prefix) as sink:
+        match, deliveries = next(iter(reports.values()))
+        assert sink.write(match, deliveries) not in reports
+    assert len(os.listdir(prefix)) == len(reports) + 1
+
+
+@pytest.mark.parametrize("archive", ReportSink.archive_formats)
+def test_archives_hold_every_report(tmp_path, teams, archive):
+    with ReportSink(str(tmp_path), archive=archive) as sink:
+        reports = write_matches(teams, sink)
+        assert sink.written == 3
+    stored = read_archive(sink.path, archive)
+    assert stored == {name: match.render(deliveries) for name, (match, deliveries) in reports.items()}
+
+
+def test_zip_is_appended_to(tmp_path, teams):
+    with ReportSink(str(tmp_path), archive="zip") as sink:
+        first = write_matches(teams, sink)
+    with ReportSink(str(tmp_path), archive="zip") as sink:
+        second = write_matches(teams, sink)
+    assert not set(first) & set(second)
+    assert set(read_archive(sink.path, "zip")) == set(first) | set(second)
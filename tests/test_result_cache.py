@@ -0,0 +1,102 @@
+import os
+import pytest
+from aggregate import OutcomeAggregator
+from conftest import synthetic_stats, synthetic_team
+from parallel import ParallelRunner
+from result_cache import ResultCache, fixture_key
+from simulators import SimplisticSimulator
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResultCache(str(tmp_path / "results"))
+
+
+@pytest.fixture(scope="module")
+def runner():
+    return ParallelRunner(workers=1, chunk_size=64)
+
+
+def counting(runner, teams, seed=5):
+    """
+    :return: (play function of a batch campaign, list of its (done, count) calls)
+    """
+    calls = []
+
+    def play(done, count):
+        calls.append((done, count))
+        aggregator = OutcomeAggregator(teams[0].name, teams[1].name)
+        aggregator.add_batch(runner.run_campaign([teams], count, seed, start=done)[0])
+        return aggregator
+
+    return play, calls
+
+
+def test_top_up_and_exact_n(cache, runner, teams):
+    fresh = {n: runner.aggregate(*teams, n, seed=5).summary() for n in (30, 50, 120)}
+    play, calls = counting(runner, teams)
+    settings = {"engine": "batch", "seed": 5}
+
+    assert cache.aggregate(*teams, 50, settings, play).summary() == fresh[50]
+    # Only the missing matches are played
+    assert cache.aggregate(*teams, 120, settings, play).summary() == fresh[120]
+    assert calls == [(0, 50), (50, 70)]
+    assert len(cache.get(fixture_key(*teams, settings))) == 2
+
+    # Fewer matches than cached gives exactly those, not the whole entry
+    assert cache.aggregate(*teams, 50, settings, play).summary() == fresh[50]
+    assert cache.aggregate(*teams, 30, settings, play).summary() == fresh[30]
+    assert calls == [(0, 50), (50, 70), (0, 30)]
+    assert cache.aggregate(*teams, 0, settings, play).n == 0
+
+
+def test_scalar_runs_continue_after_cached_matches(cache, teams):
+    def run(n, first=0):
+        sim = SimplisticSimulator(*teams, telemetry="result", keep_deliveries=False, seed=2)
+        sim.next_match = first
+        aggregator = sim.play_matches(n, aggregator=OutcomeAggregator(teams[0].name, teams[1].name), cache=cache)
+        return sim, aggregator
+
+    sim, cached = run(20)
+    assert (cached.n, sim.next_match) == (20, 20)
+    sim, again = run(12)
+    assert (again.n, sim.next_match) == (12, 12)
+    assert again.summary() == run(12, 0)[1].summary()
+
+    # Another start is another campaign
+    assert fixture_key(*teams, {"engine": "scalar", "seed": 2, "start": 0}) != \
+        fixture_key(*teams, {"engine": "scalar", "seed": 2, "start": 5})
+
+
+def test_key_follows_teams_and_stats(stats):
+    team_1 = synthetic_team("Synthetic XI", range(0, 11), *stats)
+    team_2 = synthetic_team("Random XI", range(11, 22), *stats)
+    key = fixture_key(team_1, team_2, {"seed": 1})
+    assert fixture_key(team_1, team_2, {"seed": 2}) != key
+    assert fixture_key(team_2, team_1, {"seed": 1}) != key
+
+    other = synthetic_team("Synthetic XI", range(0, 11), *stats)
+    assert fixture_key(other, team_2, {"seed": 1}) == key
+    other.bowler_list = other.bowler_list[:-1]
+    assert fixture_key(other, team_2, {"seed": 1}) != key
+    # Same lineups on another stats snapshot
+    other = synthetic_team("Synthetic XI", range(0, 11), *synthetic_stats(seed=1))
+    assert fixture_key(other, team_2, {"seed": 1}) != key
+
+
+def test_least_recently_used_evicted(cache, runner, teams):
+    play = counting(runner, teams)[0]
+    for seed in range(3):
+        cache.aggregate(*teams, 10, {"seed": seed}, play)
+    paths = {seed: cache.path(fixture_key(*teams, {"seed": seed})) for seed in range(3)}
+    for seed, path in paths.items():
+        os.utime(path, (1000 + seed, 1000 + seed))
+    size = os.path.getsize(paths[0])
+
+    # Reading seed 0 makes seed 1 the least recently used
+    assert cache.get(fixture_key(*teams, {"seed": 0})) is not None
+    cache.max_bytes = 3.5 * size
+    cache.aggregate(*teams, 10, {"seed": 3}, play)
+    assert not os.path.exists(paths[1])
+    assert all(os.path.exists(paths[seed]) for seed in (0, 2))
+    assert cache.get(fixture_key(*teams, {"seed": 1})) is None
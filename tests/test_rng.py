@@ -0,0 +1,73 @@
+import numpy as np
+import pytest
+from rng import MatchRandom, MatchStreams, philox4x32
+from simulators import BatchSimulator, InningsBatch
+
+
+# Random123 known-answer vectors of Philox4x32-10: counter, key, output
+KNOWN_ANSWERS = [((0, 0, 0, 0), (0, 0),
+                  (0x6627e8d5, 0xe169c58d, 0xbc57ac4c, 0x9b00dbd8)),
+                 ((0xffffffff,) * 4, (0xffffffff,) * 2,
+                  (0x408f276d, 0x41c83b0e, 0xa20bc7c6, 0x6d5451fd)),
+                 ((0x243f6a88, 0x85a308d3, 0x13198a2e, 0x03707344), (0xa4093822, 0x299f31d0),
+                  (0xd16cfe09, 0x94fdcceb, 0x5001e420, 0x24126ea1))]
+
+
+@pytest.mark.parametrize("counter, key, expected", KNOWN_ANSWERS)
+def test_philox_known_answers(counter, key, expected):
+    assert tuple(int(x) for x in philox4x32(counter, key)) == expected
+
+
+def draws(streams, lane, rounds):
+    stream = streams.lane(lane)
+    rows = np.arange(len(streams.matches))
+    return np.stack([stream.random(rows) for r in range(rounds)], axis=1)
+
+
+def test_match_streams_do_not_depend_on_partition():
+    whole = draws(MatchStreams.for_range(9, 0, 100, 2), 1, 5)
+    for start, n in ((0, 1), (0, 37), (37, 63), (99, 1)):
+        np.testing.assert_array_equal(draws(MatchStreams.for_range(9, start, n, 2), 1, 5), whole[start:start + n])
+
+
+def test_lane_rows_advance_independently():
+    streams = MatchStreams.for_range(9, 0, 10)
+    whole = draws(streams, 1, 4)
+
+    stream = streams.lane(1)
+    # Only rows 2 and 5 draw, then row 5 skips one draw
+    stream.random(np.array([2, 5]))
+    stream.advance(np.array([5]), 1)
+    np.testing.assert_array_equal(stream.random(np.arange(10)), [whole[2, 1] if r == 2 else
+                                                                 whole[5, 2] if r == 5 else
+                                                                 whole[r, 0] for r in range(10)])
+
+
+def test_lanes_and_paths_differ():
+    whole = draws(MatchStreams.for_range(9, 0, 50), 1, 3)
+    assert not np.isin(draws(MatchStreams.for_range(9, 0, 50), 2, 3), whole).any()
+    assert not np.isin(draws(MatchStreams.for_range(9, 0, 50, 1), 1, 3), whole).any()
+
+
+def test_match_random_seeks():
+    uniforms = MatchRandom(4, 17, block=8).uniforms()
+    first = [next(uniforms) for i in range(40)]
+    for start in (0, 5, 8, 31):
+        seek = MatchRandom(4, 17, block=8).uniforms(start)
+        assert [next(seek) for i in range(40 - start)] == first[start:]
+    # The block size only decides how many are drawn at once
+    stream = MatchRandom(4, 17).stream()
+    assert [stream() for i in range(40)] == first
+    assert MatchRandom(4, 18).stream()() != first[0]
+
+
+def test_batch_replays_any_match(teams):
+    sim = BatchSimulator(*teams)
+    whole = sim.simulate_batch(40, seed=8, start=0)
+    for i in (0, 13, 39):
+        one = sim.simulate_batch(1, seed=8, start=i)
+        assert one.team_1_bats_first[0] == whole.team_1_bats_first[i]
+        for team in teams:
+            for name in InningsBatch.arrays:
+                np.testing.assert_array_equal(getattr(one.innings[team], name)[0],
+                                              getattr(whole.innings[team], name)[i], err_msg=name)
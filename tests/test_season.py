@@ -0,0 +1,127 @@
+import csv
+from collections import Counter
+import numpy as np
+import pandas as pd
+import pytest
+from conftest import synthetic_stats
+from season import SeasonSimulator, playoff_matches, season_fixtures, season_keepers, season_teams
+
+
+NAMES = ["Alpha Kings", "Bravo Riders", "Charlie Chargers", "Delta Daredevils"]
+
+
+@pytest.fixture(scope="module")
+def squads():
+    return {name: [f"Player {11 * t + i:04d}" for i in range(11)] for t, name in enumerate(NAMES)}
+
+
+@pytest.fixture(scope="module")
+def matches_csv(tmp_path_factory):
+    """
+    Season 2020: a double round robin of the four teams, then 4 playoff matches
+    """
+    path = tmp_path_factory.mktemp("season") / "matches.csv"
+    league = [(a, b) for a in NAMES for b in NAMES if a != b]
+    rows = [{"id": 100 + k, "season": 2020, "date": f"2020-04-{k + 1:02d}", "team1": a, "team2": b}
+            for k, (a, b) in enumerate(league + league[:4])]
+    # A match of another season, and two on one day ordered by id
+    rows.append({"id": 1, "season": 2019, "date": "2019-04-01", "team1": NAMES[0], "team2": NAMES[1]})
+    rows[1]["date"] = rows[0]["date"]
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, ["id", "season", "date", "team1", "team2"])
+        writer.writeheader()
+        writer.writerows(rows[::-1])
+    return str(path)
+
+
+@pytest.fixture(scope="module")
+def season_deliveries(squads, matches_csv):
+    """
+    Two overs a side per league match: batsmen come in in lineup order, the
+    fourth player keeps wicket for Alpha Kings and Bravo Riders
+    """
+    fixtures, match_ids = season_fixtures(2020, matches_csv)
+    rows = []
+    for match_id, (a, b) in zip(match_ids, fixtures):
+        for bat, bowl in ((a, b), (b, a)):
+            for k, batsman in enumerate(squads[bat]):
+                stumped = bowl in NAMES[:2] and k == 0
+                rows.append({"match_id": match_id, "batting_team": bat, "bowling_team": bowl, "over": k + 1,
+                             "batsman": batsman, "non_striker": squads[bat][(k + 1) % 11],
+                             "bowler": squads[bowl][2 * (k % 5)],
+                             "player_dismissed": batsman if stumped else None,
+                             "dismissal_kind": "stumped" if stumped else None,
+                             "fielder": squads[bowl][3] if stumped else None})
+    return pd.DataFrame(rows)
+
+
+def test_fixtures(matches_csv):
+    fixtures, match_ids = season_fixtures(2020, matches_csv)
+    assert len(match_ids) == 16 and 1 not in match_ids
+    assert len(fixtures) == 16 - playoff_matches.get(2020, 4) == 12
+    assert match_ids[:2] == [100, 101]
+    assert Counter(team for fixture in fixtures for team in fixture) == {name: 6 for name in NAMES}
+    with pytest.raises(AssertionError):
+        season_fixtures(2030, matches_csv)
+
+
+def test_fixtures_of_the_real_seasons():
+    for season in (2008, 2017):
+        fixtures, match_ids = season_fixtures(season)
+        assert len(fixtures) == len(match_ids) - playoff_matches.get(season, 4)
+        assert max(Counter(team for fixture in fixtures for team in fixture).values()) == 14
+
+
+def test_teams(squads, matches_csv, season_deliveries):
+    teams = season_teams(2020, synthetic_stats(44), season_deliveries, matches_csv)
+    assert sorted(teams) == NAMES
+    for name, team in teams.items():
+        assert team.lineup == squads[name]
+        assert team.captain is None
+    assert teams[NAMES[0]].wk == squads[NAMES[0]][3]
+    assert teams[NAMES[2]].wk is None
+    assert season_keepers(season_deliveries.drop(columns="fielder"), [100], squads) == dict.fromkeys(squads)
+
+
+@pytest.fixture(scope="module")
+def simulator(matches_csv, season_deliveries):
+    teams = season_teams(2020, synthetic_stats(44), season_deliveries, matches_csv)
+    return SeasonSimulator.from_matches(2020, teams, matches_csv, workers=1, chunk_size=64, block=40)
+
+
+def test_league_and_playoffs(simulator):
+    result = simulator.simulate(40, seed=1)
+    assert result.n == 40
+    # Two points a match, shared on a tie
+    assert (result.points.sum(axis=1) == 2 * len(simulator.fixtures)).all()
+
+    rows = np.arange(result.n)
+    points = result.points[rows[:, None], result.standings]
+    assert (np.diff(points, axis=1) <= 0).all()
+
+    q1, q2 = result.finalists[:, 0], result.finalists[:, 1]
+    assert ((q1 == result.standings[:, 0]) | (q1 == result.standings[:, 1])).all()
+    assert (q2 != q1).all()
+    assert ((result.champion == q1) | (result.champion == q2)).all()
+    assert sum(result.title_odds().values()) == pytest.approx(1.0)
+    assert [row["Team"] for row in result.points_table()][0] in NAMES
+
+
+@pytest.mark.parametrize("workers, chunk_size, block", [(1, 1000, 5), (2, 4, 1000)])
+def test_season_does_not_depend_on_workers_or_blocks(simulator, workers, chunk_size, block):
+    reference = simulator.simulate(12, seed=2)
+    other = SeasonSimulator(simulator.teams, simulator.fixtures, workers=workers, chunk_size=chunk_size, block=block)
+    result = other.simulate(12, seed=2)
+    other.runner.close()
+    for name in ("points", "nrr", "wins", "standings", "finalists", "champion"):
+        np.testing.assert_array_equal(getattr(result, name), getattr(reference, name), err_msg=name)
+
+
+@pytest.mark.parametrize("first_wins, champion", [(True, 0), (False, 3)])
+def test_playoff_bracket(simulator, monkeypatch, first_wins, champion):
+    # Qualifier 1 winner straight to the final, its loser gets a second chance in Qualifier 2
+    monkeypatch.setattr(simulator, "play", lambda a, b, rng: a if first_wins else b)
+    result = simulator.simulate(20, seed=1)
+    assert (result.champion == result.standings[:, champion]).all()
+    expected = (0, 1) if first_wins else (1, 3)
+    np.testing.assert_array_equal(result.finalists, result.standings[:, list(expected)])
@@ -0,0 +1,89 @@
+import asyncio
+import pytest
+import sim_service
+from aggregate import OutcomeAggregator
+from sim_service import SimulationService
+from simulators import simulate_batch
+
+
+@pytest.fixture
+def service(teams):
+    # No executor, batches run on a thread of this process
+    service = SimulationService({team.name: team for team in teams}, seed=3, window=0.01, chunk_size=40)
+    yield service
+    service.close()
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_requests_coalesce(service, teams):
+    names = [team.name for team in teams]
+
+    async def requests():
+        return await asyncio.gather(service.simulate(names[0], names[1], 100),
+                                    service.simulate(names[1], names[0], 60),
+                                    service.simulate(names[0], names[1], 100))
+
+    first, smaller, same = run(requests())
+    metrics = service.metrics.summary()
+    assert (metrics["runs"], metrics["matches"], metrics["coalesced"]) == (1, 100, 2)
+    assert first == same and first["matches"] == 100 and smaller["matches"] == 60
+
+    # A finished batch answers smaller requests, larger ones and fresh service streams run again
+    run(service.simulate(names[0], names[1], 50))
+    assert service.metrics.runs == 1
+    run(service.simulate(names[0], names[1], 150))
+    assert service.metrics.runs == 2
+
+
+def test_seeded_request_matches_simulate_batch(service, teams):
+    team_1, team_2 = sorted(teams, key=lambda team: team.name)
+    summary = run(service.simulate(team_2.name, team_1.name, 90, seed=7))
+
+    aggregator = OutcomeAggregator(team_1.name, team_2.name)
+    aggregator.add_batch(simulate_batch(team_1, team_2, 90, seed=7, start=0))
+    assert summary == aggregator.summary()
+
+
+def test_errors(service, teams, monkeypatch):
+    names = [team.name for team in teams]
+    route = lambda target: run(service.route("GET", target, b""))
+
+    assert route("/teams") == (200, sorted(names))
+    assert route("/nowhere")[0] == 404
+    assert route(f"/simulate?team_1={names[0]}&team_2=Nobody")[0] == 404
+    assert route(f"/simulate?team_1={names[0]}")[0] == 404
+    assert route(f"/simulate?team_1={names[0]}&team_2={names[0]}")[0] == 400
+    assert route(f"/simulate?team_1={names[0]}&team_2={names[1]}&n=0")[0] == 400
+    assert route(f"/simulate?team_1={names[0]}&team_2={names[1]}&n=ten")[0] == 400
+    assert run(service.route("DELETE", "/simulate", b""))[0] == 405
+    assert service.metrics.errors == 5
+
+    # Errors raised by the workers are the service's, not the request's
+    def broken(*args):
+        raise KeyError("worker state lost")
+
+    monkeypatch.setattr(sim_service, "_run_chunk", broken)
+    status, payload = route(f"/simulate?team_1={names[0]}&team_2={names[1]}&n=10")
+    assert status == 500 and "KeyError" in payload["error"]
+    assert not service.running and not service.pending
+
+    monkeypatch.undo()
+    body = b'{"team_1": "%s", "team_2": "%s", "n": 10}' % (names[0].encode(), names[1].encode())
+    status, payload = run(service.route("POST", "/simulate", body))
+    assert status == 200 and payload["matches"] == 10
+
+
+def test_finished_batches_evicted(service, teams):
+    names = [team.name for team in teams]
+    service.max_held = 100
+    for seed in range(3):
+        run(service.simulate(names[0], names[1], 60, seed=seed))
+    # Only the newest batch fits
+    assert [key[1] for key in service.finished] == [2]
+
+    service.max_age = 0
+    service.evict()
+    assert not service.finished
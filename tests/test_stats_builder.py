@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+from stats_builder import build_player_stats
+
+
+def ball(match_id, batsman, bowler, runs=0, wide=0, noball=0, out=None):
+    return {"match_id": match_id, "batsman": batsman, "non_striker": "N", "bowler": bowler,
+            "batsman_runs": runs, "wide_runs": wide, "noball_runs": noball,
+            "extra_runs": wide + noball, "total_runs": runs + wide + noball,
+            "player_dismissed": None if out is None else out[0], "dismissal_kind": None if out is None else out[1]}
+
+
+@pytest.fixture(scope="module")
+def small():
+    """
+    Two matches counted by hand in the tests below
+    """
+    return pd.DataFrame([ball(1, "A", "X", 4), ball(1, "A", "X", 1), ball(1, "B", "X", wide=1),
+                         ball(1, "B", "X", out=("B", "bowled")), ball(1, "A", "Y", 6),
+                         ball(1, "A", "Y", noball=1, runs=2), ball(1, "A", "Y", out=("A", "run out")),
+                         ball(2, "X", "A", 0), ball(2, "X", "A", out=("X", "caught"))])
+
+
+def test_batting_counts(small):
+    batsmen_df, _ = build_player_stats(small)
+    a = batsmen_df.set_index("Name").loc["A"]
+    assert (a["Innings"], a["Runs"], a["Balls Faced"], a["Dismissals"]) == (1, 13, 4, 1)
+    assert (a[1], a[2], a[4], a[6], a["run out"]) == (1, 1, 1, 1, 1)
+    assert a["Strike Rate"] == pytest.approx(100 * 13 / 4)
+    b = batsmen_df.set_index("Name").loc["B"]
+    assert (b["Balls Faced"], b["Dismissals"], b["bowled"]) == (1, 1, 1)
+
+
+def test_bowling_counts(small):
+    _, bowlers_df = build_player_stats(small)
+    bowlers = bowlers_df.set_index("Name")
+    x, y, a = bowlers.loc["X"], bowlers.loc["Y"], bowlers.loc["A"]
+    # X bowled in match 1 and batted in match 2
+    assert (x["Matches"], x["Balls Bowled"], x["Runs Conceded"], x["Wides"], x["Wickets"]) == (2, 3, 6, 1, 1)
+    # Run outs are no bowler's wicket
+    assert (y["Balls Bowled"], y["Runs Conceded"], y["No Balls"], y["Wickets"]) == (2, 9, 1, 0)
+    assert "run out" not in bowlers.columns
+    assert (a["Matches"], a["Wickets"], a["caught"], a["Economy"]) == (2, 1, 1, 0)
+
+
+def test_totals_match_deliveries(deliveries):
+    batsmen_df, bowlers_df = build_player_stats(deliveries)
+    legal = ((deliveries["wide_runs"] == 0) & (deliveries["noball_runs"] == 0)).sum()
+    assert batsmen_df["Balls Faced"].sum() == legal == bowlers_df["Balls Bowled"].sum()
+    assert batsmen_df["Runs"].sum() == deliveries["batsman_runs"].sum()
+    assert bowlers_df["Runs Conceded"].sum() == deliveries["total_runs"].sum()
+    assert batsmen_df["Dismissals"].sum() == deliveries["player_dismissed"].notna().sum()
+    assert batsmen_df[list(range(7))].sum(axis=1).tolist() == \
+        deliveries.groupby("batsman").size().sort_index().tolist()
+    assert np.isfinite(bowlers_df["Economy"]).all()
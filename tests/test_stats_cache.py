@@ -0,0 +1,69 @@
+import os
+import sys
+import numpy as np
+import pytest
+import stats_cache
+from stats_cache import SCHEMA_VERSION, load_or_rebuild, load_stats, read_manifest
+
+
+@pytest.fixture()
+def deliveries_csv(tmp_path, deliveries):
+    path = tmp_path / "deliveries.csv"
+    deliveries[deliveries["match_id"] <= 20].to_csv(path, index=False)
+    return str(path)
+
+
+def test_round_trip_and_reuse(tmp_path, deliveries_csv, monkeypatch):
+    cache_dir = str(tmp_path / "cache")
+    built = load_stats(deliveries_csv, cache_dir)
+    assert read_manifest(cache_dir)["version"] == SCHEMA_VERSION
+
+    def no_rebuild(path):
+        raise AssertionError("rebuilt a fresh cache")
+
+    monkeypatch.setattr(stats_cache, "build_stats", no_rebuild)
+    cached = load_stats(deliveries_csv, cache_dir)
+    for table, expected in ((cached.batting_table, built.batting_table), (cached.bowling_table, built.bowling_table)):
+        assert table.names == expected.names
+        assert list(table.columns) == list(expected.columns)
+        for key, values in table.columns.items():
+            assert isinstance(values, np.memmap)
+            np.testing.assert_array_equal(values, expected.columns[key])
+
+    # Missing source files have nothing to compare against
+    assert load_stats(str(tmp_path / "missing.csv"), cache_dir).batting_table.names == built.batting_table.names
+
+
+def test_rebuilt_when_stale(tmp_path, deliveries_csv, deliveries):
+    cache_dir = str(tmp_path / "cache")
+    first = load_stats(deliveries_csv, cache_dir)
+    deliveries[deliveries["match_id"] <= 10].to_csv(deliveries_csv, index=False)
+    runs = load_stats(deliveries_csv, cache_dir).batting_table.columns["Runs"]
+    assert runs.sum() < first.batting_table.columns["Runs"].sum()
+
+
+def test_load_or_rebuild(tmp_path):
+    source = tmp_path / "source.txt"
+    source.write_text("a")
+    path = str(tmp_path / "cache" / "value.json")
+    saved = {}
+
+    def save(obj, path, fingerprints):
+        saved[path] = {"version": 2, "sources": fingerprints, "value": obj}
+
+    def run(version=2):
+        return load_or_rebuild(path, {"source": str(source)}, version, saved.get,
+                               lambda path: ("loaded", saved[path]["value"]), lambda: source.read_text(), save)
+
+    assert run() == "a" and run() == ("loaded", "a")
+    assert os.path.isdir(tmp_path / "cache")
+    assert run(version=3) == "a"
+    source.write_text("b")
+    assert run(version=3) == "b"
+
+
+def test_modules_import_without_pandas():
+    import subprocess
+    code = ("import sys, game_tools, simulators, stats_cache; "
+            "assert 'pandas' not in sys.modules and 'matplotlib' not in sys.modules")
+    subprocess.run([sys.executable, "-c", code], check=True, cwd=os.path.dirname(os.path.dirname(__file__)) or ".")
@@ -0,0 +1,40 @@
+import pytest
+from game_tools import Player, Team
+from stats_store import PlayerStatsStore
+
+
+def legacy_stats(name, df):
+    """
+    Stats dict of name as Player built it from the DataFrame before the store
+    """
+    stats = df[df["Name"] == name].to_dict()
+    return {k: list(v.values())[0] if v != {} else 0 for k, v in stats.items()}
+
+
+@pytest.mark.parametrize("name", ["Player 0000", "Player 0005", "Player 0039", "Nobody"])
+def test_rows_match_the_frames(stats, name):
+    batsmen_df, bowlers_df = stats
+    player = Player(name, batsmen_df, bowlers_df)
+    assert dict(player.batting_stats) == legacy_stats(name, batsmen_df)
+    assert dict(player.bowling_stats) == legacy_stats(name, bowlers_df)
+
+
+def test_lookup_by_name_or_id(stats):
+    store = PlayerStatsStore.from_frames(*stats)
+    i = store.bowling_id("Player 0011")
+    assert store.bowling(i) == store.bowling("Player 0011")
+    assert store.bowling(i)["Balls Bowled"] == stats[1]["Balls Bowled"][11]
+    assert store.batting_id("Nobody") == -1 and store.batting("Nobody")["Runs"] == 0
+    with pytest.raises(TypeError):
+        store.batting("Player 0000")["Runs"] = 0
+
+
+def test_store_built_once_per_frames(stats):
+    store = PlayerStatsStore.for_frames(*stats)
+    assert PlayerStatsStore.for_frames(*stats) is store
+    assert PlayerStatsStore.for_frames(stats[0].copy(), stats[1]) is not store
+
+    team = Team("Store XI", [f"Player {i:04d}" for i in range(11)])
+    team.generate_team(store)
+    assert team.players["Player 0003"].batting_stats.table is store.batting_table
+    assert len(team.bowler_list) == 6
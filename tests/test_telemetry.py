@@ -0,0 +1,54 @@
+import pytest
+from simulators import SimplisticSimulator
+
+
+N = 60
+
+
+def play(teams, telemetry, seed=5, n=N):
+    sim = SimplisticSimulator(*teams, telemetry=telemetry, keep_deliveries=False, seed=seed)
+    return sim.play_matches(n)
+
+
+@pytest.fixture(scope="module")
+def reference(teams):
+    return play(teams, "full")
+
+
+@pytest.mark.parametrize("telemetry", ["result", "scorecard"])
+def test_every_telemetry_level_plays_the_same_matches(teams, reference, telemetry):
+    assert play(teams, telemetry) == reference
+
+
+def test_scorecards_do_not_depend_on_deliveries(teams):
+    cards = {}
+    for telemetry in ("scorecard", "full"):
+        sim = SimplisticSimulator(*teams, telemetry=telemetry, seed=5)
+        cards[telemetry] = []
+        for i in range(10):
+            sim.play_match()
+            cards[telemetry].append(sim.match.scorecards)
+    assert cards["scorecard"] == cards["full"]
+    assert len(sim.deliveries) > 0
+
+
+@pytest.mark.parametrize("telemetry", SimplisticSimulator.telemetry_levels)
+def test_seeded_replay(teams, reference, telemetry):
+    sim = SimplisticSimulator(*teams, telemetry=telemetry, keep_deliveries=False, seed=5)
+    for i in (37, 3, 37, N - 1):
+        sim.next_match = i
+        assert sim.play_match() == reference[i]
+
+
+def test_results_follow_the_runs(reference):
+    for result in reference:
+        if result.second_runs > result.first_runs:
+            assert (result.winner, result.margin) == (result.bat_second, 10 - result.second_wickets)
+        elif result.second_runs < result.first_runs:
+            assert (result.winner, result.margin) == (result.bat_first, result.first_runs - result.second_runs)
+        else:
+            assert result.winner is None
+
+
+def test_seed_changes_matches(teams, reference):
+    assert play(teams, "result", seed=6) != reference